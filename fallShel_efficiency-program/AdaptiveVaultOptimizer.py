@@ -1,8 +1,72 @@
 import json
 import os
-import numpy as np
 from datetime import datetime
 from collections import defaultdict
+from performance_store import PerformanceStore, SERIES
+
+# Running statistics other instances update through the config file; never cached in self.config
+SHARED_STATS = ('trend_stats', 'bandit_stats')
+
+
+class TrendWindow:
+    """
+    Means and least-squares slopes of each series over the last `size` cycles, in O(1) per cycle.
+
+    With x the position in the window (0 = oldest), it keeps sum(y) and sum(x*y) per series plus the
+    window's values (to know which one drops out). Sliding the window by one cycle turns sum(x*y)
+    into sum(x*y) - (sum(y) - y_out) + (n-1) * y_in. The sums are rebuilt from the values every
+    `size` cycles so float drift cannot build up.
+    """
+
+    def __init__(self, size, values=None, updates=0):
+        self.size = size
+        self.values = {name: list((values or {}).get(name, []))[-size:] for name in SERIES}
+        self.updates = updates
+        self._rebuild()
+
+    def _rebuild(self):
+        self.sum_y = {name: float(sum(v)) for name, v in self.values.items()}
+        self.sum_xy = {name: float(sum(i * y for i, y in enumerate(v))) for name, v in self.values.items()}
+
+    @property
+    def count(self):
+        return len(self.values[SERIES[0]])
+
+    def push(self, sample):
+        """sample: {series name: value} for one cycle"""
+        full = self.count == self.size
+        for name in SERIES:
+            y = float(sample[name])
+            values = self.values[name]
+            if full:
+                y_out = values.pop(0)
+                self.sum_xy[name] += len(values) * y - (self.sum_y[name] - y_out)
+                self.sum_y[name] += y - y_out
+            else:
+                self.sum_xy[name] += len(values) * y
+                self.sum_y[name] += y
+            values.append(y)
+        self.updates += 1
+        if self.updates % self.size == 0:
+            self._rebuild()
+
+    def mean(self, name):
+        return self.sum_y[name] / self.count
+
+    def slope(self, name):
+        """Least-squares slope per cycle (same as np.polyfit(range(n), values, 1)[0])"""
+        n = self.count
+        sum_x = n * (n - 1) / 2
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6
+        return (n * self.sum_xy[name] - sum_x * self.sum_y[name]) / (n * sum_xx - sum_x * sum_x)
+
+    def to_dict(self):
+        return {'size': self.size, 'values': self.values, 'updates': self.updates}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['size'], data.get('values'), data.get('updates', 0))
+
 
 class AdaptiveVaultOptimizer:
     """
@@ -17,7 +81,6 @@ class AdaptiveVaultOptimizer:
         self.manual_settings_file = f"{vault_name}_manual_settings.json"
         self.manual_mode = manual_mode
         self.config = self._load_config()
-        self.history_file = f"{vault_name}_performance_history.json"
     
     def set_manual_mode(self, enabled):
         """Switch between manual and adaptive modes"""
@@ -81,24 +144,79 @@ class AdaptiveVaultOptimizer:
             'learning_rate': 0.1,
             'performance_window': 10,
             'target_improvement': 0.05,
+            'bandit_arms': 0,  # parameter arms param_bandit evaluates per cycle (0 = off)
         }
         
+        loaded = self._read_config_file()
+        for key in SHARED_STATS:
+            loaded.pop(key, None)
+        default_config.update(loaded)
+        
+        return default_config
+    
+    def _read_config_file(self):
         if os.path.exists(self.config_file):
             try:
                 with open(self.config_file, 'r') as f:
-                    loaded = json.load(f)
-                    default_config.update(loaded)
+                    return json.load(f)
             except:
                 pass
-        
-        return default_config
+        return {}
+    
+    def _write_config_file(self, config):
+        tmp_file = self.config_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(config, f, indent=2)
+        os.replace(tmp_file, self.config_file)
     
     def _save_config(self):
         """Save updated configuration (only in adaptive mode)"""
         if not self.manual_mode:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
+            config = dict(self.config)
+            stored = self._read_config_file()
+            for key in SHARED_STATS:
+                if key in stored:
+                    config[key] = stored[key]
+            self._write_config_file(config)
+    
+    def _trend_window(self):
+        """
+        The persisted trend window; rebuilt from the last performance_window cycles of the history
+        only when there is none yet or the window size changed.
+        """
+        size = int(self.config.get('performance_window', 10))
+        stored = self._read_config_file().get('trend_stats')
+        if stored:
+            try:
+                window = TrendWindow.from_dict(stored)
+                if window.size == size:
+                    return window
+            except (KeyError, TypeError, ValueError):
+                pass
+        history = PerformanceStore(self.vault_name).last(size)
+        return TrendWindow(size, {name: history[name] for name in SERIES})
     
+    def observe_cycle(self, initial_avg, before_balance_avg, after_balance_avg, with_outfits_avg):
+        """
+        Fold one finished cycle into the trend window and persist it in the optimizer config
+        (call before the cycle is added to the performance history).
+        """
+        window = self._trend_window()
+        window.push({'initial': initial_avg, 'before_balance': before_balance_avg,
+                     'after_balance': after_balance_avg, 'with_outfits': with_outfits_avg})
+        config = self._read_config_file()
+        config['trend_stats'] = window.to_dict()
+        self._write_config_file(config)
+    
+    def bandit_stats(self):
+        """Per-arm statistics kept by param_bandit ({} if there are none yet)"""
+        return self._read_config_file().get('bandit_stats') or {}
+
+    def save_bandit_stats(self, stats):
+        config = self._read_config_file()
+        config['bandit_stats'] = stats
+        self._write_config_file(config)
+
     def apply_adjustments(self, auto_apply=False):
         """Apply suggested adjustments to configuration (only in adaptive mode)"""
         if self.manual_mode:
@@ -125,6 +243,15 @@ class AdaptiveVaultOptimizer:
         print("\n✓ Adjustments applied and saved!")
         return True
     
+    def adopt_params(self, params):
+        """Take a full set of optimizer params (e.g. from param_tuner) as the adaptive config"""
+        from param_tuner import CONFIG_KEYS
+        for param, key in CONFIG_KEYS.items():
+            if param in params:
+                self.config[key] = params[param]
+        self._save_config()
+        print(f"✓ Tuned parameters saved to {self.config_file}")
+    
     def get_optimization_params(self):
         """Get current optimization parameters for use in placementCalc"""
         params = {
@@ -141,46 +268,25 @@ class AdaptiveVaultOptimizer:
 
     def analyze_performance(self):
         """Analyze recent performance history and return metrics and trends"""
-        if not os.path.exists(self.history_file):
-            return None
-
         try:
-            with open(self.history_file, 'r') as f:
-                history = json.load(f)
+            # Running window statistics kept by observe_cycle; the history itself is not read
+            trend = self._trend_window()
         except Exception:
             return None
 
-        # Ensure expected keys exist
-        for key in ('initial', 'before_balance', 'after_balance', 'with_outfits', 'timestamps'):
-            if key not in history or not isinstance(history[key], list):
-                return None
-
-        window = min(self.config.get('performance_window', 10), len(history['initial']))
+        window = trend.count
         if window < 2:
             return None
 
-        # Take the last `window` samples
-        idx_start = -window
-        init_arr = np.array(history['initial'][idx_start:])
-        before_arr = np.array(history['before_balance'][idx_start:])
-        after_arr = np.array(history['after_balance'][idx_start:])
-        with_arr = np.array(history['with_outfits'][idx_start:])
-
         # Averages
-        initial_avg = float(np.mean(init_arr))
-        before_balance_avg = float(np.mean(before_arr))
-        after_balance_avg = float(np.mean(after_arr))
-        with_outfits_avg = float(np.mean(with_arr))
+        initial_avg = trend.mean('initial')
+        before_balance_avg = trend.mean('before_balance')
+        after_balance_avg = trend.mean('after_balance')
+        with_outfits_avg = trend.mean('with_outfits')
 
-        # Trends (slope per cycle using linear fit)
-        x = np.arange(window)
-        try:
-            initial_trend = float(np.polyfit(x, init_arr, 1)[0])
-            with_trend = float(np.polyfit(x, with_arr, 1)[0])
-        except Exception:
-            # fallback simple diff
-            initial_trend = float((init_arr[-1] - init_arr[0]) / max(1, window - 1))
-            with_trend = float((with_arr[-1] - with_arr[0]) / max(1, window - 1))
+        # Trends (slope per cycle of a linear fit)
+        initial_trend = trend.slope('initial')
+        with_trend = trend.slope('with_outfits')
 
         # Goal checks
         outfit_beats_initial = with_outfits_avg < initial_avg
@@ -3,23 +3,35 @@ import time
 import os
 import json
 import sqlite3
-from typing import Collection
-import pyodbc
+import logging
+from collections import Counter
+
+import vault_log
+import save_diff
+import stat_history
+from special_stats import SPECIAL
+
+log = vault_log.get_logger(__name__)
+
+ROOM_TABLES = ["ProductionRoom", "TrainingRoom", "CraftingRoom", "Non_ProductionRoom", "ConsumableRoom"]
+
+TABLE_MAP = {
+    "Production": "ProductionRoom",
+    "Consumable": "ProductionRoom",
+    "Crafting": "CraftingRoom",
+    "Training": "TrainingRoom"
+}
 
 
 def print_section(title, char="="):
     """Print a formatted section header"""
     width = 80
-    print(f"\n{char * width}")
-    print(f"{title.center(width)}")
-    print(f"{char * width}\n")
+    log.info("\n%s\n%s\n%s\n", char * width, title.center(width), char * width)
 
 
 def print_subsection(title):
     """Print a formatted subsection header"""
-    print(f"\n{'-' * 80}")
-    print(f"  {title}")
-    print(f"{'-' * 80}")
+    log.info("\n%s\n  %s\n%s", '-' * 80, title, '-' * 80)
 
 
 def create_database_schema(conn):
@@ -127,22 +139,159 @@ def create_database_schema(conn):
         )
     """)
     
+    # Digest of the parsed save the working tables hold (see save_diff)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SaveState (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+    
     conn.commit()
-    print("✓ Database schema created/verified")
+    stat_history.create_schema(conn)
+    log.info("✓ Database schema created/verified")
+
+
+def stored_digest(conn):
+    row = conn.execute("SELECT value FROM SaveState WHERE key = 'digest'").fetchone()
+    return row[0] if row else None
+
+
+def outfits_of(parsed):
+    """Equipped outfits in dweller order, then stored ones - the same list a full run returns"""
+    outfits = [d['outfit'] for d in parsed['dwellers'].values() if d['outfit']]
+    outfits.extend(item_id for item_type, item_id in parsed['inventory'] if item_type == "Outfit")
+    return outfits
+
+
+def room_row(room, names_by_id):
+    """Room table values for a parsed room (dwellers missing from the dwellers table are named, not listed)"""
+    names = []
+    dwellerid = []
+    for dweller_id in room['dwellers']:
+        name = names_by_id.get(dweller_id)
+        if name is not None:
+            names.append(name)
+            dwellerid.append(dweller_id)
+        else:
+            names.append(f"ID {dweller_id} (missing)")
+    return (room['id'], room['type'], room['class'], room['row'], room['col'], room['level'],
+            room['mergeLevel'], ", ".join(names), ", ".join(map(str, dwellerid)))
+
+
+def apply_changes(conn, changes):
+    """
+    Bring the working tables from the previous save to the new one using only the change set,
+    in one transaction. Rows that stay are updated in place, so the tables keep the order a
+    full run gives them.
+    """
+    new_dwellers = changes.parsed['dwellers']
+    old_dwellers = changes.previous['dwellers']
+    # Dwellers only have a row in the dwellers table (and a name in room rows) while assigned
+    names_by_id = {d['id']: d['name'] for d in new_dwellers.values() if d['room']}
+    renamed = set()
+
+    with conn:
+        for key, d in changes.dwellers['removed'].items():
+            conn.execute("DELETE FROM dwellers WHERE dweller_id = ?", (d['id'],))
+            conn.execute("DELETE FROM Stats WHERE dweller_id = ?", (d['id'],))
+            renamed.add(d['id'])
+
+        for key, d in list(changes.dwellers['added'].items()) + list(changes.dwellers['modified'].items()):
+            old = old_dwellers.get(key)
+            row = (d['name'], d['health'], d['maxHealth'], d['level'], d['outfit'], d['room'],
+                   "F" if d['gender'] == 1 else "M")
+            if old is None:
+                conn.executemany("INSERT OR REPLACE INTO Stats (dweller_id, StatName, Value, Mod, Exp) VALUES (?, ?, ?, ?, ?)",
+                                 [(d['id'], name, *d['stats'][i]) for i, name in enumerate(SPECIAL)])
+            elif old['stats'][:len(SPECIAL)] != d['stats'][:len(SPECIAL)]:
+                conn.executemany("UPDATE Stats SET Value = ?, Mod = ?, Exp = ? WHERE dweller_id = ? AND StatName = ?",
+                                 [(*d['stats'][i], d['id'], name) for i, name in enumerate(SPECIAL)])
+
+            if not d['room']:
+                conn.execute("DELETE FROM dwellers WHERE dweller_id = ?", (d['id'],))
+            elif old is None or not old['room']:
+                conn.execute("INSERT OR REPLACE INTO dwellers (dweller_id, Fullname, CurrentHealth, MaxHealth, [Level], "
+                             "Outfit, CurrentRoom, Gender) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (d['id'],) + row)
+            else:
+                conn.execute("UPDATE dwellers SET Fullname = ?, CurrentHealth = ?, MaxHealth = ?, [Level] = ?, Outfit = ?, "
+                             "CurrentRoom = ?, Gender = ? WHERE dweller_id = ?", row + (d['id'],))
+            if old is None or bool(old['room']) != bool(d['room']) or old['name'] != d['name']:
+                renamed.add(d['id'])
+
+        # Rooms whose row changes: the changed ones and those listing a dweller whose name / presence changed
+        rewrite = dict(changes.rooms['added'])
+        rewrite.update(changes.rooms['modified'])
+        if renamed:
+            rewrite.update((key, room) for key, room in changes.parsed['rooms'].items()
+                           if renamed.intersection(room['dwellers']))
+
+        old_rooms = changes.previous['rooms']
+        for key, room in changes.rooms['removed'].items():
+            for table in ROOM_TABLES:
+                conn.execute(f"DELETE FROM {table} WHERE Room_id = ?", (room['id'],))
+        for key, room in rewrite.items():
+            table_name = TABLE_MAP.get(room['class'], "Non_ProductionRoom")
+            values = room_row(room, names_by_id)
+            old = old_rooms.get(key)
+            if old is not None and TABLE_MAP.get(old['class'], "Non_ProductionRoom") == table_name:
+                conn.execute(f"UPDATE {table_name} SET Room_id = ?, RoomName = ?, RoomClass = ?, Row = ?, Column = ?, "
+                             f"RoomLevel = ?, MergeLevel = ?, DwellerAssigned = ?, dweller_id = ? WHERE Room_id = ?",
+                             values + (room['id'],))
+            else:
+                for table in ROOM_TABLES:
+                    conn.execute(f"DELETE FROM {table} WHERE Room_id = ?", (room['id'],))
+                conn.execute(f"INSERT OR REPLACE INTO {table_name} (Room_id, RoomName, RoomClass, Row, Column, RoomLevel, "
+                             f"MergeLevel, DwellerAssigned, dweller_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+
+        conn.execute("INSERT OR REPLACE INTO SaveState (key, value) VALUES ('digest', ?)", (changes.digest,))
+
+    log.info("✓ Applied save changes (%s): %d dweller(s), %d room row(s) rewritten",
+             changes.summary(), len(changes.dwellers['added']) + len(changes.dwellers['modified'])
+             + len(changes.dwellers['removed']), len(rewrite) + len(changes.rooms['removed']))
+
 
+def record_stats(conn, vault, dwellers):
+    """Append the changed stats of these dwellers to the vault's stat history"""
+    with conn:
+        appended = stat_history.record(conn, vault, dwellers)
+    if appended:
+        log.info("✓ Recorded %d stat change(s) in the stat history", appended)
 
-def run(json_path):
+
+def run(json_path, changes=None):
+    """
+    Load a decrypted save into the working tables of vault.db and return its outfit list.
+
+    With a save_diff.ChangeSet whose base is the save the tables already hold, only the change set
+    is applied; otherwise (or without one) the tables are rebuilt from the whole save. Either way
+    stats that changed are appended to the stat history under the save's name (the vault name).
+    """
     conn = sqlite3.connect("vault.db")
     cursor = conn.cursor()
+    vault = os.path.splitext(os.path.basename(json_path))[0]
     
     # Create tables if they don't exist
     create_database_schema(conn)
 
+    if changes is not None and not changes.full and changes.base == stored_digest(conn):
+        print_section("VAULT DATA PROCESSOR")
+        if not changes.is_empty:
+            apply_changes(conn, changes)
+            old_dwellers = changes.previous['dwellers']
+            record_stats(conn, vault, [d for key, d in list(changes.dwellers['added'].items())
+                                       + list(changes.dwellers['modified'].items())
+                                       if key not in old_dwellers or old_dwellers[key]['stats'] != d['stats']])
+        else:
+            log.info("✓ Save unchanged - working tables are current")
+        conn.close()
+        vault_log.flush()
+        return outfits_of(changes.parsed)
+
     wCounter = 0
     oCounter = 0 
     jCounter = 0
 
-    SPECIAL = ["Luck", "Strength", "Perception", "Endurance", "Chrisma", "Intelligence", "Agility"]
     delcount = 0
     dwellercount = 0
 
@@ -150,11 +299,14 @@ def run(json_path):
     file_path = os.path.join(downloads_folder, json_path) 
 
     print_section("VAULT DATA PROCESSOR")
-    print(f"Loading vault data from: {file_path}")
+    if changes is not None:
+        data = changes.data
+    else:
+        log.info("Loading vault data from: %s", file_path)
 
-    # Open and read the JSON file
-    with open(file_path, "r", encoding="utf-8") as file:
-        data = json.load(file)
+        # Open and read the JSON file
+        with open(file_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
 
     dwellers_list = data["dwellers"]["dwellers"]
     rooms = data["vault"]["rooms"]
@@ -163,25 +315,21 @@ def run(json_path):
     weapon_list = []
     junk_list = []
 
-    print(f"✓ Loaded {len(dwellers_list)} dwellers, {len(rooms)} rooms, {len(storItems)} storage items")
+    log.info("✓ Loaded %d dwellers, %d rooms, %d storage items", len(dwellers_list), len(rooms), len(storItems))
 
     # Clear working tables except for Outfit table
     tables = ["Stats", "TrainingRoom", "CraftingRoom", "Non_ProductionRoom", "ProductionRoom","ConsumableRoom","dwellers"]
     for t in tables:
         cursor.execute(f"DELETE FROM {t}")
+    # Nothing to diff against until the rebuild has finished
+    cursor.execute("DELETE FROM SaveState")
     conn.commit()
-    print(f"✓ Cleared {len(tables)} working tables")
-
-    table_map = {
-        "Production": "ProductionRoom",
-        "Consumable": "ProductionRoom",
-        "Crafting": "CraftingRoom",
-        "Training": "TrainingRoom"
-    }
+    log.info("✓ Cleared %d working tables", len(tables))
 
     # Process dwellers
     print_section("PROCESSING DWELLERS")
-    
+    verbose = log.isEnabledFor(logging.DEBUG)
+
     for idx, d in enumerate(dwellers_list, 1):
         fullname = d.get("name", "") + " " + d.get("lastName", "")
         serialize_id = d.get("serializeId")
@@ -201,10 +349,9 @@ def run(json_path):
         else:
             gender = "M"
 
-        print(f"\n[{idx}/{len(dwellers_list)}] {fullname}")
-        print(f"  ID: {serialize_id}")
-        print(f"  Gender: {gender}")
-        print(f"  Health: {health}/{maxhealth} | Level: {lvl} | Outfit: {outfitId}")
+        if verbose:
+            log.debug("\n[%d/%d] %s\n  ID: %s\n  Gender: %s\n  Health: %s/%s | Level: %s | Outfit: %s",
+                      idx, len(dwellers_list), fullname, serialize_id, gender, health, maxhealth, lvl, outfitId)
 
         # Process SPECIAL stats
         stat_list = stats_container["stats"]
@@ -215,10 +362,11 @@ def run(json_path):
             exps_value = stat_list[i]["exp"]
             
             # Format SPECIAL stat display
-            stat_display = f"{special_name[0]}: {stats_value}"
-            if mods_value != 0:
-                stat_display += f"(+{mods_value})"
-            special_display.append(stat_display)
+            if verbose:
+                stat_display = f"{special_name[0]}: {stats_value}"
+                if mods_value != 0:
+                    stat_display += f"(+{mods_value})"
+                special_display.append(stat_display)
             
             cursor.execute("""
                INSERT OR REPLACE INTO Stats
@@ -226,7 +374,8 @@ def run(json_path):
               VALUES (?, ?, ?, ?, ?)
               """, (serialize_id, special_name, stats_value, mods_value, exps_value))
         
-        print(f"  SPECIAL: {' | '.join(special_display)}")
+        if verbose:
+            log.debug("  SPECIAL: %s", ' | '.join(special_display))
 
         # Find dweller's room assignment
         current_room = None
@@ -234,7 +383,7 @@ def run(json_path):
             for dweller_id in room.get("dwellers", []):
                 if serialize_id == dweller_id:
                     current_room = room.get('type')
-                    print(f"  Assignment: {current_room}")
+                    log.debug("  Assignment: %s", current_room)
                     
                     cursor.execute("""
                     INSERT OR REPLACE INTO dwellers
@@ -246,11 +395,11 @@ def run(json_path):
                 break
         
         if not current_room:
-            print(f"  Assignment: Not assigned to any room")
+            log.debug("  Assignment: Not assigned to any room")
 
         # Track weapon and outfit
         weaponId = weapon.get("id")
-        print(f"  Weapon: {weaponId if weaponId else 'None'}")
+        log.debug("  Weapon: %s", weaponId if weaponId else 'None')
         
         if weaponId:
             weapon_list.append(weaponId)
@@ -283,9 +432,9 @@ def run(json_path):
         size_map = {0: "Small", 1: "Medium", 2: "Large"}
         size = size_map.get(MergeLevel, "Unknown")
 
-        print(f"\n{Roomtype} ({Class})")
-        print(f"  Location: Row {Row}, Col {Column}")
-        print(f"  Level: {Roomlevel} | Size: {size} (Merge {MergeLevel})")
+        if verbose:
+            log.debug("\n%s (%s)\n  Location: Row %s, Col %s\n  Level: %s | Size: %s (Merge %s)",
+                      Roomtype, Class, Row, Column, Roomlevel, size, MergeLevel)
 
         # Get dwellers in room
         for dweller_id in roominfo.get("dwellers", []):
@@ -297,12 +446,13 @@ def run(json_path):
             else:
                 names.append(f"ID {dweller_id} (missing)")
 
-        if names:
-            print(f"  Dwellers ({len(names)}): {', '.join(names)}")
-        else:
-            print(f"  Dwellers: None")
+        if verbose:
+            if names:
+                log.debug("  Dwellers (%d): %s", len(names), ', '.join(names))
+            else:
+                log.debug("  Dwellers: None")
 
-        table_name = table_map.get(roominfo.get("class"), "Non_ProductionRoom")
+        table_name = TABLE_MAP.get(roominfo.get("class"), "Non_ProductionRoom")
 
         sql = f"""
         INSERT OR REPLACE INTO {table_name}
@@ -336,36 +486,38 @@ def run(json_path):
         else:
             jCounter += 1
     
-    print(f"Storage Items Summary:")
-    print(f"  Weapons: {wCounter}")
-    print(f"  Outfits: {oCounter}")
-    print(f"  Junk: {jCounter}")
+    log.info("Storage Items Summary:\n  Weapons: %d\n  Outfits: %d\n  Junk: %d", wCounter, oCounter, jCounter)
 
     # Final summary
     print_section("PROCESSING COMPLETE")
     
-    print(f"Summary:")
-    print(f"  ✓ Processed {dwellercount} dwellers")
-    print(f"  ✓ Processed {len(rooms)} rooms")
+    log.info("Summary:\n  ✓ Processed %d dwellers\n  ✓ Processed %d rooms", dwellercount, len(rooms))
     if delcount > 0:
-        print(f"  ✓ Cleaned up {delcount} deleted dweller(s)")
+        log.info("  ✓ Cleaned up %d deleted dweller(s)", delcount)
     
-    print(f"\nRoom Distribution:")
-    for room_type, count in sorted(room_types.items()):
-        print(f"  {room_type}: {count}")
+    if verbose:
+        log.debug("\nRoom Distribution:")
+        for room_type, count in sorted(room_types.items()):
+            log.debug("  %s: %d", room_type, count)
 
-    print(f"\nOutfit Tracking:")
     unique_outfits = set(outfit_list)
-    print(f"  Total outfits (equipped + storage): {len(outfit_list)}")
-    print(f"  Unique outfit types: {len(unique_outfits)}")
+    log.info("\nOutfit Tracking:\n  Total outfits (equipped + storage): %d\n  Unique outfit types: %d",
+             len(outfit_list), len(unique_outfits))
     
-    if unique_outfits:
-        print(f"\n  Outfit IDs in use:")
-        for outfit in sorted(unique_outfits):
-            count = outfit_list.count(outfit)
-            print(f"    {outfit}: {count}x")
+    if verbose and unique_outfits:
+        log.debug("\n  Outfit IDs in use:")
+        for outfit, count in sorted(Counter(outfit_list).items()):
+            log.debug("    %s: %dx", outfit, count)
+
+    parsed = changes.parsed if changes is not None else save_diff.parse_save(data)
+    record_stats(conn, vault, parsed['dwellers'].values())
+
+    state = changes.digest if changes is not None else save_diff.digest(parsed)
+    cursor.execute("INSERT OR REPLACE INTO SaveState (key, value) VALUES ('digest', ?)", (state,))
+    conn.commit()
 
     conn.close()
-    print(f"\n{'=' * 80}\n")
+    log.info("\n%s\n", '=' * 80)
+    vault_log.flush()
     
     return outfit_list
\ No newline at end of file
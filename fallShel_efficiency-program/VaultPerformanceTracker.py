@@ -1,28 +1,22 @@
-import json
-import os
 from datetime import datetime
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from performance_store import PerformanceStore
 
 class VaultPerformanceTracker:
-    def __init__(self, vault_name):
+    # Points drawn on the timeline graph
+    GRAPH_POINTS = 2000
+
+    def __init__(self, vault_name, retention=None):
+        """retention: {'raw_hours': ..., 'hourly_days': ...} overrides for performance_store.DEFAULT_RETENTION"""
         self.vault_name = vault_name
-        self.data_file = f"{vault_name}_performance_history.json"
-        self.history = self._load_history()
-    
-    def _load_history(self):
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return {'timestamps': [], 'initial': [], 'before_balance': [], 'after_balance': [], 'with_outfits': []}
-        return {'timestamps': [], 'initial': [], 'before_balance': [], 'after_balance': [], 'with_outfits': []}
+        self.store = PerformanceStore(vault_name, retention=retention)
+        self.data_file = self.store.path
     
-    def _save_history(self):
-        """Save performance history to file"""
-        with open(self.data_file, 'w') as f:
-            json.dump(self.history, f, indent=2)
+    @property
+    def history(self):
+        """Cycles still kept at full resolution (read on demand; appending a cycle does not need it)"""
+        return self.store.history()
     
     def add_cycle_data(self, initial_avg, before_balance_avg, after_balance_avg, with_outfits_avg):
         """
@@ -34,42 +28,36 @@ class VaultPerformanceTracker:
             after_balance_avg: Average after balancing dwellers
             with_outfits_avg: Average after outfit optimization
         """
-        timestamp = datetime.now().isoformat()
-        
-        self.history['timestamps'].append(timestamp)
-        self.history['initial'].append(initial_avg)
-        self.history['before_balance'].append(before_balance_avg)
-        self.history['after_balance'].append(after_balance_avg)
-        self.history['with_outfits'].append(with_outfits_avg)
-        
-        self._save_history()
+        self.store.append(initial_avg, before_balance_avg, after_balance_avg, with_outfits_avg)
         print(f"✓ Recorded cycle data at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     def generate_performance_graph(self, output_filename=None):
         """Generate a line graph showing performance over time"""
-        if not self.history['timestamps']:
+        # Whole history, from the coarser tiers where raw cycles were already rolled up
+        history = self.store.timeline(self.GRAPH_POINTS)
+        if not history['timestamps']:
             print("No data to plot yet!")
             return
         
         # Convert timestamps to datetime objects
-        dates = [datetime.fromisoformat(ts) for ts in self.history['timestamps']]
+        dates = [datetime.fromisoformat(ts) for ts in history['timestamps']]
         
         fig, ax = plt.subplots(figsize=(14, 7))
         
         # Plot lines with different colors and styles
-        ax.plot(dates, self.history['initial'], 
+        ax.plot(dates, history['initial'], 
                 marker='o', linewidth=2, label='Initial State', 
                 color='#ff6b6b', alpha=0.8)
         
-        ax.plot(dates, self.history['before_balance'], 
+        ax.plot(dates, history['before_balance'], 
                 marker='s', linewidth=2, label='Before Balancing', 
                 color='#feca57', alpha=0.8)
         
-        ax.plot(dates, self.history['after_balance'], 
+        ax.plot(dates, history['after_balance'], 
                 marker='^', linewidth=2, label='After Balancing', 
                 color='#48dbfb', alpha=0.8)
         
-        ax.plot(dates, self.history['with_outfits'], 
+        ax.plot(dates, history['with_outfits'], 
                 marker='D', linewidth=2, label='With Outfits', 
                 color='#1dd1a1', alpha=0.8)
         
@@ -97,11 +85,12 @@ class VaultPerformanceTracker:
     
     def get_latest_improvement(self):
         """Calculate improvement from initial to final state in latest cycle"""
-        if not self.history['timestamps']:
+        latest = self.store.last(1)
+        if not latest['timestamps']:
             return None
         
-        initial = self.history['initial'][-1]
-        final = self.history['with_outfits'][-1]
+        initial = latest['initial'][-1]
+        final = latest['with_outfits'][-1]
         improvement_percent = ((initial - final) / initial) * 100
         
         return {
@@ -113,20 +102,13 @@ class VaultPerformanceTracker:
     
     def get_summary_stats(self):
         """Get summary statistics across all recorded cycles"""
-        if not self.history['timestamps']:
+        stats = self.store.summary()
+        if stats is None:
             return None
         
-        import statistics
-        
-        return {
-            'total_cycles': len(self.history['timestamps']),
-            'avg_initial': round(statistics.mean(self.history['initial']), 2),
-            'avg_final': round(statistics.mean(self.history['with_outfits']), 2),
-            'best_performance': round(min(self.history['with_outfits']), 2),
-            'worst_performance': round(max(self.history['with_outfits']), 2),
-            'first_recorded': self.history['timestamps'][0],
-            'last_recorded': self.history['timestamps'][-1]
-        }
+        for key in ('avg_initial', 'avg_final', 'best_performance', 'worst_performance'):
+            stats[key] = round(stats[key], 2)
+        return stats
     
     def print_summary(self):
         """Print a summary of vault performance"""
@@ -157,5 +139,5 @@ class VaultPerformanceTracker:
     
     def clear_history(self):
         """Clear all recorded history"""
-        self.history = {'timestamps': [], 'initial': [], 'before_balance': [], 'after_balance': [], 'with_outfits': []}
+        self.store.clear()
         print(f"✓ Cleared all history for {self.vault_name}")
@@ -0,0 +1,315 @@
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import multiprocessing
+import statistics
+from datetime import datetime
+
+from headless import HeadlessWorkspace, resource_path
+
+
+DEFAULT_SIZES = [20, 50, 100, 200, 400]
+OUTFIT_STRATEGIES = ['deficit_first', 'big_rooms_first', 'efficiency_first', 'hybrid']
+BALANCING_MODES = {'cross_stat': True, 'same_stat': False}
+
+# (type, class) pairs used to fill the synthetic vault
+PRODUCTION_ROOM_TYPES = [
+    ("Geothermal", "Production"),
+    ("Energy2", "Production"),
+    ("WaterPlant", "Production"),
+    ("Water2", "Production"),
+    ("Cafeteria", "Production"),
+    ("Hydroponic", "Production"),
+    ("MedBay", "Production"),
+    ("ScienceLab", "Production"),
+    ("NukaCola", "Production"),
+]
+TRAINING_ROOM_TYPES = [
+    ("Gym", "Training"),
+    ("Armory", "Training"),
+    ("Dojo", "Training"),
+    ("Classroom", "Training"),
+]
+
+ROWS = 25
+COLUMNS = 26
+
+
+def load_outfit_ids(db_path=None):
+    """Outfit ids known to the bundled outfit database, so placementCalc never stops on a missing outfit"""
+    conn = sqlite3.connect(db_path or resource_path("vault.db"))
+    try:
+        rows = conn.execute('SELECT "ITEM ID" FROM Outfit').fetchall()
+    finally:
+        conn.close()
+    return [r[0] for r in rows if r[0]]
+
+
+def generate_save(dweller_count, seed=0, outfit_ids=None):
+    """
+    Build a decrypted-save shaped dict with `dweller_count` dwellers and production/training
+    rooms for them. The 25x26 map holds ~300 production slots, so the 400 case also
+    exercises the overflow (unassigned dweller) path.
+    """
+    rng = random.Random(seed * 100003 + dweller_count)
+    outfit_ids = outfit_ids or load_outfit_ids()
+
+    dwellers = []
+    for i in range(dweller_count):
+        serialize_id = 1000 + i
+        stats = [{"value": rng.randint(1, 10), "mod": 0, "exp": rng.randint(0, 5000)} for _ in range(7)]
+        equipped_outfit = rng.choice(outfit_ids) if rng.random() < 0.6 else None
+        dwellers.append({
+            "serializeId": serialize_id,
+            "name": f"Dweller{i}",
+            "lastName": "Bench",
+            "gender": rng.randint(1, 2),
+            "happiness": {"happinessValue": rng.randint(50, 100)},
+            "health": {"healthValue": 100, "maxHealth": 100},
+            "experience": {"currentLevel": rng.randint(1, 50)},
+            "stats": {"stats": stats},
+            "equipedOutfit": {"id": equipped_outfit} if equipped_outfit else {},
+            "equipedWeapon": {"id": "Pistol"},
+        })
+
+    # Roughly one production slot per dweller, with a few training rooms on top
+    rooms = []
+    capacity_needed = dweller_count
+    next_id = 1
+    row, col = 0, 0
+    while capacity_needed > 0 and row < ROWS:
+        if col == 0:
+            rooms.append({
+                "type": "Elevator", "class": "Elevator", "row": row, "col": 0,
+                "level": 1, "mergeLevel": 1, "deserializeID": next_id, "dwellers": [],
+            })
+            next_id += 1
+            col = 1
+
+        merge_level = rng.choice([1, 2, 3, 3])
+        width = 3 * merge_level
+        if col + width > COLUMNS:
+            row += 1
+            col = 0
+            continue
+
+        if rng.random() < 0.15:
+            room_type, room_class = rng.choice(TRAINING_ROOM_TYPES)
+        else:
+            room_type, room_class = rng.choice(PRODUCTION_ROOM_TYPES)
+            capacity_needed -= 2 * merge_level
+
+        rooms.append({
+            "type": room_type, "class": room_class, "row": row, "col": col,
+            "level": rng.randint(1, 3), "mergeLevel": merge_level,
+            "deserializeID": next_id, "dwellers": [],
+        })
+        next_id += 1
+        col += width
+
+    # Scatter dwellers over the rooms as their "previous" assignment
+    workrooms = [r for r in rooms if r["class"] != "Elevator"]
+    for d in dwellers:
+        room = rng.choice(workrooms)
+        if len(room["dwellers"]) < 2 * room["mergeLevel"]:
+            room["dwellers"].append(d["serializeId"])
+
+    items = [{"id": rng.choice(outfit_ids), "type": "Outfit", "hasBeenAssigned": False}
+             for _ in range(max(1, dweller_count // 4))]
+
+    return {
+        "dwellers": {"dwellers": dwellers},
+        "vault": {"rooms": rooms, "inventory": {"items": items}},
+    }
+
+
+def run_case(workspace, save_path, outfitlist, size, strategy, mode, repeats, workers=0):
+    """Time one (size, strategy, mode) cell; phase timings are the median over `repeats` runs"""
+    params = {
+        'OUTFIT_STRATEGY': strategy,
+        'ENABLE_CROSS_STAT_BALANCING': BALANCING_MODES[mode],
+        'PARALLEL_WORKERS': workers,
+    }
+    wall_times = []
+    phase_runs = []
+    for rep in range(repeats):
+        vault_name = f"bench_{size}_{strategy}_{mode}_{rep}"
+        start = time.perf_counter()
+        results = workspace.optimize(save_path, outfitlist, vault_name, params)
+        wall_times.append(time.perf_counter() - start)
+        if results is None:
+            raise RuntimeError(f"placementCalc returned no results for {vault_name}")
+        phase_runs.append(results.get('phase_timings', {}))
+
+    phases = {}
+    for name in phase_runs[0]:
+        phases[name] = round(statistics.median(p.get(name, 0.0) for p in phase_runs), 6)
+
+    return {
+        'dwellers': size,
+        'strategy': strategy,
+        'mode': mode,
+        'workers': workers,
+        'repeats': repeats,
+        'wall_time': round(statistics.median(wall_times), 6),
+        'phases': phases,
+    }
+
+
+def run_benchmark(sizes, strategies, modes, repeats=1, seed=0, plot_mode='off', progress=print, workers=(0,)):
+    """Run every (size, strategy, mode, worker count) combination and return the list of case results"""
+    outfit_ids = load_outfit_ids()
+    cases = []
+    for size in sizes:
+        with HeadlessWorkspace(plot_mode=plot_mode) as ws:
+            save_path = os.path.join(ws.path, f"bench_{size}.json")
+            with open(save_path, "w", encoding="utf-8") as f:
+                json.dump(generate_save(size, seed, outfit_ids), f)
+            outfitlist = ws.ingest(save_path)
+
+            for strategy in strategies:
+                for mode in modes:
+                    for worker_count in workers:
+                        case = run_case(ws, save_path, outfitlist, size, strategy, mode, repeats, worker_count)
+                        cases.append(case)
+                        progress(f"  {size:4d} dwellers | {strategy:16s} | {mode:10s} | {worker_count:2d} workers"
+                                 f" | {case['wall_time']:8.3f}s")
+    return cases
+
+
+def case_key(case):
+    key = f"{case['dwellers']}/{case['strategy']}/{case['mode']}"
+    if case.get('workers'):
+        key += f"/{case['workers']}w"
+    return key
+
+
+def compare_to_baseline(cases, baseline_cases, threshold=0.25, min_delta=0.05):
+    """
+    Return the list of regressions: phases that got slower than the baseline by more
+    than `threshold` (fraction) AND by more than `min_delta` seconds.
+    """
+    baseline = {case_key(c): c for c in baseline_cases}
+    regressions = []
+    for case in cases:
+        base = baseline.get(case_key(case))
+        if base is None:
+            continue
+        current_phases = dict(case['phases'], wall_time=case['wall_time'])
+        base_phases = dict(base['phases'], wall_time=base['wall_time'])
+        for phase, current in current_phases.items():
+            previous = base_phases.get(phase)
+            if previous is None:
+                continue
+            delta = current - previous
+            if delta > min_delta and previous > 0 and delta / previous > threshold:
+                regressions.append({
+                    'case': case_key(case),
+                    'phase': phase,
+                    'baseline': previous,
+                    'current': current,
+                    'slowdown': round(delta / previous, 3),
+                })
+    return regressions
+
+
+def plot_scaling(cases, chart_path):
+    """Save a wall-time vs dweller-count chart, one line per strategy/mode"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    series = {}
+    for case in cases:
+        mode = case['mode'] + (f", {case['workers']} workers" if case.get('workers') else "")
+        series.setdefault((case['strategy'], mode), []).append((case['dwellers'], case['wall_time']))
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for (strategy, mode), points in sorted(series.items()):
+        points.sort()
+        linestyle = '-' if mode.startswith('cross_stat') else '--'
+        ax.plot([p[0] for p in points], [p[1] for p in points], marker='o',
+                linestyle=linestyle, label=f"{strategy} ({mode})")
+
+    ax.set_xlabel('Dwellers')
+    ax.set_ylabel('Wall time (s)')
+    ax.set_title('placementCalc scaling')
+    ax.grid(True, alpha=0.3)
+    ax.legend(fontsize=8)
+    fig.tight_layout()
+    fig.savefig(chart_path, dpi=120)
+    plt.close(fig)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark placementCalc across synthetic vaults")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Dweller counts to benchmark")
+    parser.add_argument("--strategies", nargs="+", default=OUTFIT_STRATEGIES, choices=OUTFIT_STRATEGIES)
+    parser.add_argument("--modes", nargs="+", default=list(BALANCING_MODES), choices=list(BALANCING_MODES))
+    parser.add_argument("--repeats", type=int, default=1, help="Runs per case (median is reported)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic vault generator")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--chart", default="benchmark_scaling.png", help="Where to write the scaling chart ('' to skip)")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown fraction per phase")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="Ignore slowdowns smaller than this many seconds")
+    parser.add_argument("--plot", default="off", choices=["off", "sync", "async"],
+                        help="Production plot mode inside placementCalc (default off)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0],
+                        help="PARALLEL_WORKERS values to run each case with (0 = serial balancing)")
+    parser.add_argument("--quick", action="store_true", help="Only 20 and 50 dwellers, deficit_first strategy")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.sizes = [20, 50]
+        args.strategies = ['deficit_first']
+
+    # Resolve output paths before the workspaces change directory
+    output_path = os.path.abspath(args.output)
+    chart_path = os.path.abspath(args.chart) if args.chart else None
+
+    print(f"Benchmarking sizes={args.sizes} strategies={args.strategies} modes={args.modes} "
+          f"workers={args.workers} repeats={args.repeats}")
+    cases = run_benchmark(args.sizes, args.strategies, args.modes, args.repeats, args.seed, args.plot,
+                          workers=args.workers)
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'seed': args.seed,
+        'plot_mode': args.plot,
+        'cases': cases,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(cases, baseline.get('cases', []), args.threshold, args.min_delta)
+        report['regressions'] = regressions
+        if regressions:
+            exit_code = 1
+            print(f"\n❌ {len(regressions)} phase regression(s) against {args.baseline}:")
+            for r in regressions:
+                print(f"   {r['case']:40s} {r['phase']:20s} {r['baseline']:.3f}s -> {r['current']:.3f}s (+{r['slowdown']:.0%})")
+        else:
+            print(f"\n✓ No regressions against {args.baseline}")
+
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output_path}")
+
+    if chart_path:
+        plot_scaling(cases, chart_path)
+        print(f"Scaling chart written to {chart_path}")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,9 +1,12 @@
 import os
 import time
+import multiprocessing
 import sav_fetcher
 import TableSorter
 import virtualvaultmap
 import placementCalc
+import production_plot
+from save_diff import SaveDiffer
 from VaultPerformanceTracker import VaultPerformanceTracker
 from AdaptiveVaultOptimizer import AdaptiveVaultOptimizer
 
@@ -11,6 +14,9 @@ from AdaptiveVaultOptimizer import AdaptiveVaultOptimizer
 RUN_INTERVAL = 60  # seconds
 AUTO_OPTIMIZE = True  # Set to True to auto-apply adjustments
 
+# Remembers the previous cycle's save so each cycle only reprocesses what changed
+SAVE_DIFFER = SaveDiffer()
+
 def get_vault_name():
     """Prompt user for vault number and return vault name"""
     while True:
@@ -25,12 +31,14 @@ def get_vault_name():
 
 def run_cycle(vault_name, outfitlist,optimizer_params):
     json_path = sav_fetcher.run(vault_name)
-    outfitlist = TableSorter.run(json_path)
-    virtualvaultmap.run(json_path)
-    placementCalc.run(json_path, outfitlist, vault_name, optimizer_params)
+    changes = SAVE_DIFFER.update(json_path)
+    outfitlist = TableSorter.run(json_path, changes)
+    layout = virtualvaultmap.run(json_path, changes)
+    placementCalc.run(json_path, outfitlist, vault_name, optimizer_params, layout=layout, changes=changes)
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     print("=" * 60)
     print("Fallout Shelter Efficiency Program")
     print("=" * 60)
@@ -87,6 +95,7 @@ if __name__ == "__main__":
                 print(f"Total uptime: {int(time.time() - start_time)} seconds")
         
                 print("\nCleaning up cycle plot images...")
+                production_plot.default_sink().close()  # let a queued plot finish first
                 deleted_count = 0
                 try:
                     current_dir = os.getcwd()
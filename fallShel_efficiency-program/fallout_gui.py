@@ -1,27 +1,32 @@
 import sys
 import os
 import json
+import threading
+import traceback
+import multiprocessing
 from datetime import datetime
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                                QHBoxLayout, QPushButton, QLabel, QTextEdit, 
                                QLineEdit, QGroupBox, QListWidget, QTabWidget,
                                QProgressBar, QScrollArea, QFrame, QSplitter, QMessageBox,
                                QSpinBox, QDoubleSpinBox, QComboBox, QCheckBox, QFormLayout, QRadioButton, QFileDialog)
-from PySide6.QtCore import QThread, Signal, Qt, QTimer
+from PySide6.QtCore import QThread, QThreadPool, QRunnable, QObject, Signal, Qt, QTimer
 from PySide6.QtGui import QFont, QPalette, QColor, QPixmap
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import matplotlib.pyplot as plt
 
-from placementCalc import NULL
-from placementCalc import BalancingConfig
+from placementCalc import BalancingConfig, OptimizationCancelled
 from outfit_manager import OutfitDatabaseManager
 from AdaptiveVaultOptimizer import AdaptiveVaultOptimizer
 from version import __version__ as APP_VERSION
+import vault_log
+import vault_layout
 import updater
 from vault_map_tab import VaultMapTab
 from vault_map_tab import RoomCell
 
+log = vault_log.get_logger(__name__)
 
 
 vault_design = []
@@ -33,7 +38,7 @@ class OptimizationThread(QThread):
     # accept any Python object (str path, dict, or list) from the worker
     dweller_suggestions = Signal(dict)
     missing_outfits_found = Signal(list)  # Signal for missing outfits
-    vault_design_ready = Signal(list)     # <-- new signal to send vault design to GUI
+    vault_design_ready = Signal(object)   # vault_layout.VaultLayout for the GUI map
     
     def __init__(self, vault_name, outfit_list, optimizer_params=None):
         super().__init__()
@@ -52,8 +57,12 @@ class OptimizationThread(QThread):
         import placementCalc
         from VaultPerformanceTracker import VaultPerformanceTracker
         from AdaptiveVaultOptimizer import AdaptiveVaultOptimizer
+        from param_bandit import ParameterBandit
+        from save_diff import SaveDiffer
         
         optimizer = AdaptiveVaultOptimizer(self.vault_name)
+        bandit = ParameterBandit(optimizer)
+        differ = SaveDiffer()
         
         while self.running:
             try:
@@ -67,7 +76,9 @@ class OptimizationThread(QThread):
                 
                 # Run cycle
                 json_path = sav_fetcher.run(self.vault_name)
-                outfitlist = TableSorter.run(json_path)
+                # What changed since the last cycle's save; the stages below only redo that
+                changes = differ.update(json_path)
+                outfitlist = TableSorter.run(json_path, changes)
                
 
                 outfit_manager = OutfitDatabaseManager()
@@ -83,8 +94,14 @@ class OptimizationThread(QThread):
                         if not self.running:
                             return
                 
-                virtualvaultmap.run(json_path)
-                self.vault_design = virtualvaultmap.run(json_path)
+                # Adaptive mode: try the bandit's arms on this snapshot, then run the one it picks
+                bandit_report = None
+                if not self.optimizer_params:
+                    bandit_report = bandit.run_cycle(json_path)
+                    if bandit_report:
+                        optimizer_params = optimizer.get_optimization_params()
+                
+                self.vault_design = virtualvaultmap.run(json_path, changes)
                 # Emit the design so the main thread can update the VaultMapTab
                 self.vault_design_ready.emit(self.vault_design)
 
@@ -103,7 +120,8 @@ class OptimizationThread(QThread):
                 # Capture suggestions or results file from placementCalc
                 suggestions = None
                 suggestion_path = placementCalc.run(
-                    json_path, outfitlist, self.vault_name, optimizer_params
+                    json_path, outfitlist, self.vault_name, optimizer_params,
+                    layout=self.vault_design, changes=changes
                 )
 
                 try:
@@ -123,7 +141,8 @@ class OptimizationThread(QThread):
                 stats = {
                     'cycle': self.cycle_count,
                     'timestamp': datetime.now().strftime('%H:%M:%S'),
-                    'params': optimizer_params
+                    'params': optimizer_params,
+                    'bandit': bandit_report
                 }
                 
                 self.cycle_complete.emit(self.cycle_count, stats)
@@ -146,7 +165,64 @@ class OptimizationThread(QThread):
         self.running = False
 
 
+class PlacementJobSignals(QObject):
+    progress = Signal(str, int)       # phase just finished, percent of the run
+    finished = Signal(object)         # results dict, or None when no results file was written
+    failed = Signal(object, str)      # exception, formatted traceback
+    cancelled = Signal()
+
+
+class PlacementJob(QRunnable):
+    """
+    One placementCalc run on a save picked in the file dialog, on the Qt thread pool so the
+    window stays responsive. cancel() stops it at placementCalc's next checkpoint.
+    """
+    def __init__(self, vault_file, vault_name, optimizer_params):
+        super().__init__()
+        self.vault_file = vault_file
+        self.vault_name = vault_name
+        self.optimizer_params = optimizer_params
+        self.signals = PlacementJobSignals()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        import placementCalc
 
+        try:
+            with open(self.vault_file, 'r') as f:
+                vault_data = json.load(f)
+
+            # Outfit list from the dwellers' equipped outfits
+            outfitlist = [d.get('equipedOutfit', {}).get('id')
+                          for d in vault_data.get('dwellers', {}).get('dwellers', [])]
+            outfitlist = [outfit for outfit in outfitlist if outfit]
+
+            # placementCalc expects just the filename (it looks in the Downloads folder)
+            results_file = placementCalc.run(
+                json_path=os.path.basename(self.vault_file),
+                outfitlist=outfitlist,
+                vault_name=self.vault_name,
+                optimizer_params=self.optimizer_params,
+                balancing_config=None,
+                layout=vault_layout.VaultLayout.from_save(vault_data.get('vault', {}).get('rooms', [])),
+                progress=self.signals.progress.emit,
+                cancel_event=self.cancel_event
+            )
+
+            results = None
+            if results_file and os.path.exists(results_file):
+                with open(results_file, 'r') as f:
+                    results = json.load(f)
+        except OptimizationCancelled:
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            self.signals.failed.emit(e, traceback.format_exc())
+            return
+        self.signals.finished.emit(results)
 
 
 class ProductionBarChart(FigureCanvas):
@@ -192,16 +268,16 @@ class ProductionBarChart(FigureCanvas):
         after_balance_times = []
         with_outfits_times = []
         
-        # Sort rooms by type and number
+        # Sort rooms by type, then by room id
         sorted_rooms = sorted(data['room_assignments'].items(), 
-                            key=lambda x: (x[1]['room_type'], x[1]['number']))
+                            key=lambda x: (x[1]['room_type'], int(x[0]) if x[0].isdigit() else 0))
         
         for room_id, room_data in sorted_rooms:
             # Skip training rooms (including Classroom)
             if room_data['room_type'] in ['Gym', 'Armory', 'Dojo', 'Classroom']:
                 continue
             
-            room_label = f"{room_data['room_type']}-{room_data['level']}-{room_data['size']}-{room_data['number']}"
+            room_label = vault_layout.describe_room(room_data)
             rooms.append(room_label)
             
             # Get production times (you'll need to add these to your JSON)
@@ -247,6 +323,9 @@ class ProductionBarChart(FigureCanvas):
 
 class PerformanceChart(FigureCanvas):
     """Timeline chart showing performance over time (datetime on x-axis)"""
+    # Points drawn on the timeline (older history comes in as hourly / daily means)
+    PLOT_POINTS = 1000
+
     def __init__(self, parent=None):
         self.fig = Figure(figsize=(10, 3.5), facecolor='#1a1a1a')
         super().__init__(self.fig)
@@ -273,17 +352,11 @@ class PerformanceChart(FigureCanvas):
     
     def update_plot(self, vault_name):
         """Load data from performance history and update plot with datetime x-axis"""
-        import json
         from datetime import datetime
         import matplotlib.dates as mdates
+        from performance_store import PerformanceStore
         
-        history_file = f"{vault_name}_performance_history.json"
-        
-        if not os.path.exists(history_file):
-            return
-        
-        with open(history_file, 'r') as f:
-            history = json.load(f)
+        history = PerformanceStore(vault_name).timeline(self.PLOT_POINTS)
         
         if not history['timestamps']:
             return
@@ -345,6 +418,7 @@ class FalloutShelterGUI(QMainWindow):
         
         # State
         self.optimization_thread = None
+        self.placement_job = None
         self.vault_name = None
         self.is_running = False
         self.outfit_manager = OutfitDatabaseManager()
@@ -550,6 +624,10 @@ class FalloutShelterGUI(QMainWindow):
         self.start_btn.clicked.connect(self.start_optimization)
         control_layout.addWidget(self.start_btn)
         
+        self.file_btn = QPushButton("📂 OPTIMIZE SAVE FILE")
+        self.file_btn.clicked.connect(self.start_file_optimization)
+        control_layout.addWidget(self.file_btn)
+        
         self.stop_btn = QPushButton("⏹ STOP OPTIMIZATION")
         self.stop_btn.clicked.connect(self.stop_optimization)
         self.stop_btn.setEnabled(False)
@@ -922,8 +1000,8 @@ class FalloutShelterGUI(QMainWindow):
         }
         return settings
     
-    def start_optimization(self):
-        """Start the optimization process with adaptive or manual settings"""
+    def start_file_optimization(self):
+        """Optimize a save picked in a file dialog once, with adaptive or manual settings"""
     
         # Get vault selection
         vault_file, _ = QFileDialog.getOpenFileName(
@@ -974,13 +1052,46 @@ class FalloutShelterGUI(QMainWindow):
     
         self.log("--- Starting Optimization ---\n", "#48dbfb")
     
+        # Disable start buttons during optimization; Stop cancels the run
+        self.start_btn.setEnabled(False)
+        self.file_btn.setEnabled(False)
+        self.file_btn.setText("⏳ OPTIMIZING...")
+        self.stop_btn.setEnabled(True)
+        self.progress_bar.setValue(0)
+    
+        # Run the actual optimization off the UI thread; the job's signals finish it here
+        self.run_placement_calc(vault_file, optimizer_params)
+
+    def run_placement_calc(self, vault_file, optimizer_params):
+        """
+        Start the placementCalc optimization with given parameters on the thread pool
+        """
+        self.log("Loading vault data...", "#48dbfb")
+        self.log(f"Reading vault file: {vault_file}", "#888888")
+        self.log(f"Starting optimization with strategy: {optimizer_params.get('OUTFIT_STRATEGY')}", "#48dbfb")
+    
+        job = PlacementJob(vault_file, self.vault_name, optimizer_params)
+        job.signals.progress.connect(self.on_placement_progress)
+        job.signals.finished.connect(self.on_placement_finished)
+        job.signals.failed.connect(self.on_placement_failed)
+        job.signals.cancelled.connect(self.on_placement_cancelled)
+        self.placement_job = job
+        QThreadPool.globalInstance().start(job)
+
+    def on_placement_progress(self, phase, percent):
+        """placementCalc finished a phase"""
+        self.progress_bar.setValue(percent)
+        self.countdown_label.setText(f"Optimizing: {phase.replace('_', ' ')} done")
+
+    def on_placement_finished(self, results):
+        """Show the results of a file-dialog run and, in adaptive mode, offer adjustments"""
+        self.end_placement_job()
         try:
-            # Disable start button during optimization
-            self.start_btn.setEnabled(False)
-            self.start_btn.setText("⏳ OPTIMIZING...")
-        
-            # Run the actual optimization (call your placementCalc script)
-            self.run_placement_calc(vault_file, optimizer_params)
+            if results is not None:
+                # Display results (placementCalc.record_cycle already stored the cycle)
+                self.display_optimization_results(results)
+            else:
+                self.log("⚠️ No results file generated", "#ffcc00")
         
             # After optimization completes
             self.log("\n✓ Optimization complete!", "#1dd1a1")
@@ -1013,89 +1124,36 @@ class FalloutShelterGUI(QMainWindow):
         except Exception as e:
             self.log(f"\n✗ Optimization failed: {str(e)}", "#ee5a6f")
             QMessageBox.critical(self, "Optimization Error", f"An error occurred:\n\n{str(e)}")
-    
-        finally:
-            # Re-enable start button
-            self.start_btn.setEnabled(True)
-            self.start_btn.setText("▶️ START OPTIMIZATION")
 
-    def run_placement_calc(self, vault_file, optimizer_params):
-        """
-        Execute the placementCalc optimization with given parameters
-        """
-        self.log("Loading vault data...", "#48dbfb")
-    
-        try:
-            # Load vault data to extract outfit list
-            import json
-        
-            self.log(f"Reading vault file: {vault_file}", "#888888")
-        
-            with open(vault_file, 'r') as f:
-                vault_data = json.load(f)
-        
-            # Extract outfit list from dwellers
-            outfitlist = []
-            dwellers = vault_data.get('dwellers', {}).get('dwellers', [])
-        
-            self.log(f"Found {len(dwellers)} dwellers in vault", "#888888")
-        
-            for dweller in dwellers:
-                outfit = dweller.get('equipedOutfit', {}).get('id')
-                if outfit:
-                    outfitlist.append(outfit)
-        
-            self.log(f"Found {len(outfitlist)} outfits to optimize", "#1dd1a1")
-        
-            # Import placementCalc
-            from placementCalc import run
-        
-            # Get just the filename (placementCalc expects it in Downloads folder)
-            json_filename = os.path.basename(vault_file)
-        
-            self.log(f"Starting optimization with strategy: {optimizer_params.get('OUTFIT_STRATEGY')}", "#48dbfb")
-        
-            # Run optimization
-            results_file = run(
-                json_path=json_filename,
-                outfitlist=outfitlist,
-                vault_name=self.vault_name,
-                optimizer_params=optimizer_params,
-                balancing_config=None
-            )
-        
-            # Load results if file was created
-            if results_file and os.path.exists(results_file):
-                self.log(f"Loading results from {results_file}", "#888888")
-                with open(results_file, 'r') as f:
-                    results = json.load(f)
-            
-                # Display results
-                self.display_optimization_results(results)
-            
-                # Save performance history for adaptive learning
-                self.save_performance_history(results)
-            else:
-                self.log("⚠️ No results file generated", "#ffcc00")
-    
-        except FileNotFoundError as e:
-            self.log(f"✗ File not found: {str(e)}", "#ee5a6f")
+    def on_placement_failed(self, error, error_details):
+        """A file-dialog run raised"""
+        self.end_placement_job()
+        if isinstance(error, FileNotFoundError):
+            self.log(f"✗ File not found: {str(error)}", "#ee5a6f")
             self.log("Make sure the vault file is in the Downloads folder", "#ffcc00")
-    
-        except ImportError as e:
-            self.log(f"⚠️ placementCalc module not found: {str(e)}", "#ffcc00")
-            self.log("Make sure placementCalc.py is in the same directory", "#ffcc00")
-    
-        except Exception as e:
-            self.log(f"✗ Optimization error: {str(e)}", "#ee5a6f")
-            import traceback
-            error_details = traceback.format_exc()
-            self.log(error_details, "#888888")
-            QMessageBox.critical(
-                self, 
-                "Optimization Error", 
-                f"An error occurred during optimization:\n\n{str(e)}\n\nCheck the log for details."
-            )
+            return
+        
+        self.log(f"✗ Optimization error: {str(error)}", "#ee5a6f")
+        self.log(error_details, "#888888")
+        QMessageBox.critical(
+            self, 
+            "Optimization Error", 
+            f"An error occurred during optimization:\n\n{str(error)}\n\nCheck the log for details."
+        )
+
+    def on_placement_cancelled(self):
+        self.end_placement_job()
+        self.log("✓ Optimization cancelled", "#ffcc00")
+
+    def end_placement_job(self):
+        """Re-enable the controls once a file-dialog run is over"""
+        self.placement_job = None
+        self.progress_bar.setValue(0)
+        self.countdown_label.setText("Next cycle in: --")
+        self.start_btn.setEnabled(True)
+        self.file_btn.setEnabled(True)
+        self.file_btn.setText("📂 OPTIMIZE SAVE FILE")
+        self.stop_btn.setEnabled(False)
 
     def display_optimization_results(self, results):
         """Display the optimization results in the GUI"""
@@ -1132,39 +1190,6 @@ class FalloutShelterGUI(QMainWindow):
         if 'outfit_assignments' in results:
             self.log(f"\nOutfits Assigned: {len(results['outfit_assignments'])}", "#ffcc00")
 
-    def save_performance_history(self, results):
-        """Save performance metrics for adaptive learning"""
-    
-        history_file = f"{self.vault_name}_performance_history.json"
-    
-        # Load existing history
-        if os.path.exists(history_file):
-            with open(history_file, 'r') as f:
-                history = json.load(f)
-        else:
-            history = {
-                'timestamps': [],
-                'initial': [],
-                'before_balance': [],
-                'after_balance': [],
-                'with_outfits': []
-            }
-    
-        # Append new data
-        from datetime import datetime
-        history['timestamps'].append(datetime.now().isoformat())
-        history['initial'].append(results.get('initial_time', 0))
-        history['before_balance'].append(results.get('before_balance_time', 0))
-        history['after_balance'].append(results.get('after_balance_time', 0))
-        history['with_outfits'].append(results.get('with_outfits_time', 0))
-    
-        # Save updated history
-        with open(history_file, 'w') as f:
-            json.dump(history, f, indent=2)
-    
-        self.log(f"\n✓ Performance data saved to {history_file}", "#888888")
-
-
     def on_mode_changed(self):
         """Handle mode toggle between adaptive and manual"""
         if self.auto_mode_radio.isChecked():
@@ -1457,6 +1482,7 @@ class FalloutShelterGUI(QMainWindow):
         self.status_label.setStyleSheet("font-size: 12px; font-weight: bold; color: #00ff00;")
         
         self.start_btn.setEnabled(False)
+        self.file_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         self.vault_input.setEnabled(False)
         
@@ -1478,6 +1504,13 @@ class FalloutShelterGUI(QMainWindow):
     
     def stop_optimization(self):
         """Stop optimization thread"""
+        if self.placement_job is not None:
+            # File-dialog run: placementCalc stops at its next checkpoint and reports back
+            self.log("⏹ Cancelling optimization...", "#ffcc00")
+            self.placement_job.cancel()
+            self.stop_btn.setEnabled(False)
+            return
+        
         if self.optimization_thread:
             self.log("⏹ Stopping optimization...", "#ffcc00")
             self.optimization_thread.stop()
@@ -1492,6 +1525,7 @@ class FalloutShelterGUI(QMainWindow):
         self.status_label.setStyleSheet("font-size: 12px; font-weight: bold; color: #ff6b6b;")
         
         self.start_btn.setEnabled(True)
+        self.file_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.vault_input.setEnabled(True)
         
@@ -1505,6 +1539,10 @@ class FalloutShelterGUI(QMainWindow):
         """Handle cycle completion"""
         self.cycle_label.setText(f"Cycles Completed: {cycle_num}")
         self.log(f"✓ Cycle #{cycle_num} completed at {stats['timestamp']}")
+        for arm in stats.get('bandit') or []:
+            result = f"{arm['with_outfits_avg']}s" if arm['reward'] is not None else "failed"
+            marker = "→" if arm['chosen'] else " "
+            self.log(f"  {marker} {arm['label']}: {result}, {arm['cpu_seconds']:.2f}s CPU")
         
         # Reset and start countdown progress bar
         self.progress_bar.setValue(0)
@@ -1564,13 +1602,9 @@ class FalloutShelterGUI(QMainWindow):
             with open(file_path, "r", encoding="utf-8") as file:
                 data = json.load(file)
     
-            print("DEBUG: data type:", type(data))
-            print("DEBUG: data keys:", data.keys() if isinstance(data, dict) else "NOT A DICT")
-    
             # Extract dweller and outfit assignments
             dweller_data = data["dweller_assignments"]
-            print("DEBUG: dweller_data type:", type(dweller_data))
-            print("DEBUG: dweller_data content:", dweller_data)
+            log.debug("dweller_assignments: %s entries (%s)", len(dweller_data), type(dweller_data).__name__)
     
 
             # Check if it's the nested structure with "dweller" key
@@ -1582,9 +1616,7 @@ class FalloutShelterGUI(QMainWindow):
                 dweller_assigns = dweller_data
             else:
                 dweller_assigns = []
-    
-            print("DEBUG: dweller_assigns type:", type(dweller_assigns))
-            print("DEBUG: dweller_assigns content:", dweller_assigns)
+
             
             
         except FileNotFoundError:
@@ -1635,8 +1667,7 @@ class FalloutShelterGUI(QMainWindow):
             # Group by room type for easier tracking
             moves_by_room = {}
             for mo in dwellers_moved:
-                move_info = mo.get("dweller_moved")
-                to_room = move_info["to"]
+                to_room = vault_layout.describe_room(mo.get("assigned_room"))
                 if to_room not in moves_by_room:
                     moves_by_room[to_room] = []
                 moves_by_room[to_room].append(mo)
@@ -1651,7 +1682,6 @@ class FalloutShelterGUI(QMainWindow):
                 for mo in dwellers:
                     name = mo.get("name")
                     id = mo.get("id")
-                    move_info = mo.get("dweller_moved")
                     primary = mo.get("primary_stat")
                     stat = mo.get("stat_value")
             
@@ -1667,9 +1697,9 @@ class FalloutShelterGUI(QMainWindow):
                     html += '<div style=" padding: 12px; border-radius: 6px; margin-bottom: 10px;">'
                     html += '<table style="width: 100%; border-collapse: collapse;">'
                     html += '<tr>'
-                    html += f'<td style="padding: 8px;  border: 2px solid #ff6b6b; border-radius: 5px; width: 45%; color: #ffffff; font-size: 18px;"><strong style="color: #ff6b6b;">FROM:</strong><br>{move_info["from"]}</td>'
+                    html += f'<td style="padding: 8px;  border: 2px solid #ff6b6b; border-radius: 5px; width: 45%; color: #ffffff; font-size: 18px;"><strong style="color: #ff6b6b;">FROM:</strong><br>{vault_layout.describe_room(mo.get("previous_room"))}</td>'
                     html += '<td style="text-align: center; width: 10%; font-size: 28px; color: #00ff00;">➜</td>'
-                    html += f'<td style="padding: 8px; border: 2px solid #1dd1a1; border-radius: 5px; width: 45%; color: #ffffff; font-size: 18px;"><strong style="color: #1dd1a1;">TO:</strong><br>{move_info["to"]}</td>'
+                    html += f'<td style="padding: 8px; border: 2px solid #1dd1a1; border-radius: 5px; width: 45%; color: #ffffff; font-size: 18px;"><strong style="color: #1dd1a1;">TO:</strong><br>{room}</td>'
                     html += '</tr>'
                     html += '</table>'
                     html += '</div>'
@@ -1747,7 +1777,7 @@ class FalloutShelterGUI(QMainWindow):
         
                 # Location
                 assigned_room = dweller.get('assigned_room', {})
-                current_room = f"{assigned_room.get('room_type', '?')}-{assigned_room.get('room_level', '?')}-{assigned_room.get('room_size', '?')}-{assigned_room.get('room_number', '?')}"
+                current_room = vault_layout.describe_room(assigned_room)
                 html += f'<div style="font-size: 18px; color: #ffffff;"><strong>Location:</strong> {current_room}</div>'
 
                 # Warning if needs to remove from someone
@@ -1950,4 +1980,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,176 @@
+import heapq
+import math
+
+# Sub-problems of the decomposed balancer. NukaCola counts towards both the Water and the Food
+# averages, so it is balanced on its own and the repair pass deals with the coupling.
+GROUPS = {
+    "Power": ("Geothermal", "Energy2"),
+    "Water": ("WaterPlant", "Water2"),
+    "Food": ("Cafeteria", "Hydroponic"),
+    "Medbay": ("MedBay", "ScienceLab"),
+    "NukaCola": ("NukaCola",),
+}
+
+# Passes of the normal balancer run over the recombined placement
+REPAIR_PASSES = 3
+
+# Same limits as the main balancer
+SWAPS_PER_PASS = 20
+MIN_IMPROVEMENT = 0.5
+
+
+def group_of(room_code):
+    for group, codes in GROUPS.items():
+        if room_code in codes:
+            return group
+    return None
+
+
+def relaxed_cost(pools, mass):
+    """Sum of the group's room times with `mass` stat split ideally (sqrt allocation, no caps)"""
+    if mass <= 0:
+        return math.inf
+    return sum(math.sqrt(p) for p in pools) ** 2 / mass
+
+
+def partition_cost(partition, pools, values):
+    """Summed average room time of every group (before the happiness factor) for a dweller partition"""
+    cost = 0.0
+    for group, dwellers in partition.items():
+        mass = sum(values[d][group] for d in dwellers)
+        cost += relaxed_cost(pools[group], mass) / len(pools[group])
+    return cost
+
+
+def allocate(partition, pools, values):
+    """
+    Fast re-split of the production dwellers between groups, keeping each group's headcount.
+
+    partition - {group: [dweller ids]} as currently placed
+    pools     - {group: [pool of each room]}
+    values    - {dweller: {group: relevant stat}}
+
+    Every dweller is worth its stat times the marginal gain of one more stat point in the group
+    (from the relaxed cost at the current split). Dwellers are handed out greedily, those with the
+    most to lose from a second choice first. The new split is kept only if its relaxed cost is lower.
+    """
+    counts = {group: len(dwellers) for group, dwellers in partition.items()}
+    weight = {}
+    for group, dwellers in partition.items():
+        mass = sum(values[d][group] for d in dwellers)
+        # d(cost)/d(mass) of the group's average time
+        weight[group] = relaxed_cost(pools[group], mass) / mass / len(pools[group]) if mass > 0 else 1.0
+
+    dwellers = [d for members in partition.values() for d in members]
+    scored = {d: sorted(((values[d][g] * weight[g], g) for g in partition), reverse=True) for d in dwellers}
+
+    def regret(d):
+        ranked = scored[d]
+        return ranked[0][0] - (ranked[1][0] if len(ranked) > 1 else 0)
+
+    allocated = {group: [] for group in partition}
+    for d in sorted(dwellers, key=lambda d: (-regret(d), d)):
+        for _, group in scored[d]:
+            if len(allocated[group]) < counts[group]:
+                allocated[group].append(d)
+                break
+
+    if partition_cost(allocated, pools, values) < partition_cost(partition, pools, values):
+        return allocated
+    return partition
+
+
+def seat(rooms, group_members, value):
+    """
+    Rebuild room member lists for a group's new dwellers, keeping every room's headcount.
+
+    rooms         - [(pool, current member list), ...]
+    group_members - the dwellers the group now has
+    Dwellers that stay keep their room; newcomers go, strongest first, to the room that is
+    slowest with what it holds so far.
+    """
+    wanted = set(group_members)
+    kept = [[d for d in members if d in wanted] for _, members in rooms]
+    placed = {d for members in kept for d in members}
+    newcomers = sorted((d for d in group_members if d not in placed), key=lambda d: (-value(d), d))
+
+    def slowest_first(i):
+        total = sum(value(d) for d in kept[i])
+        return (-(rooms[i][0] / total) if total else -math.inf, i)
+
+    free = [slowest_first(i) for i, (_, members) in enumerate(rooms) if len(kept[i]) < len(members)]
+    heapq.heapify(free)
+    for d in newcomers:
+        _, i = heapq.heappop(free)
+        kept[i].append(d)
+        if len(kept[i]) < len(rooms[i][1]):
+            heapq.heappush(free, slowest_first(i))
+    return kept
+
+
+def _time(pool, total, scale):
+    # Same arithmetic as placementCalc.production_time_for_total
+    if total == 0:
+        return None
+    return round(pool / (total * scale), 1)
+
+
+def balance_group(task):
+    """
+    Balance one group's rooms on their own (run in a worker process).
+
+    task: (group, [(pool, members), ...], {dweller: value}, happiness scale, threshold, max passes)
+    Each pass takes the rooms slower than the group average by more than the threshold, slowest
+    first, and swaps their weakest dweller for the one in another room of the group that gives
+    the best weighted gain (slow room 1.5x, as in the cross-stat balancer).
+    Returns (group, member lists, [(weak dweller, slow room index, strong dweller, other room index)]).
+    """
+    group, rooms, values, scale, threshold, max_passes = task
+    members = [list(m) for _, m in rooms]
+    pools = [pool for pool, _ in rooms]
+    totals = [sum(values[d] for d in m) for m in members]
+    swaps = []
+
+    for _ in range(max_passes):
+        times = [_time(pool, total, scale) for pool, total in zip(pools, totals)]
+        timed = [t for t in times if t is not None]
+        if len(timed) < 2:
+            break
+        target = sum(timed) / len(timed)
+        slow_rooms = sorted((i for i, t in enumerate(times) if t is not None and t - target > threshold),
+                            key=lambda i: -times[i])
+        made = 0
+        for slow in slow_rooms:
+            if made >= SWAPS_PER_PASS:
+                break
+            weak = min(members[slow], key=lambda d: (values[d], d))
+            best = None
+            for other, other_members in enumerate(members):
+                if other == slow or times[other] is None:
+                    continue
+                for strong in other_members:
+                    delta = values[strong] - values[weak]
+                    if delta <= 0:
+                        continue
+                    new_slow = _time(pools[slow], totals[slow] + delta, scale)
+                    new_other = _time(pools[other], totals[other] - delta, scale)
+                    if new_slow is None or new_other is None:
+                        continue
+                    gain = (times[slow] - new_slow) * 1.5 - (new_other - times[other])
+                    if gain > MIN_IMPROVEMENT and (best is None or gain > best[0]):
+                        best = (gain, other, strong, new_slow, new_other, delta)
+            if best is None:
+                continue
+            _, other, strong, new_slow, new_other, delta = best
+            members[slow].remove(weak)
+            members[other].remove(strong)
+            members[slow].append(strong)
+            members[other].append(weak)
+            totals[slow] += delta
+            totals[other] -= delta
+            times[slow], times[other] = new_slow, new_other
+            swaps.append((weak, slow, strong, other))
+            made += 1
+        if made == 0:
+            break
+    return group, members, swaps
@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import contextlib
+
+
+def resource_path(relative_path: str):
+    """
+    Return absolute path to resource, works for dev and for PyInstaller onefile.
+    """
+    if getattr(sys, "frozen", False):
+        base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+    else:
+        base = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base, relative_path)
+
+
+class HeadlessWorkspace:
+    """
+    Isolated working directory for running the cycle pipeline without the GUI.
+
+    TableSorter, virtualvaultmap and placementCalc all read and write files in the
+    current directory (vault.db, the vault map, results and history JSON), and
+    OutfitDatabaseManager keeps its copy of the outfit database under APPDATA.
+    Inside this context manager both point at a throw-away temp directory seeded
+    with the bundled vault.db, so benchmark and batch runs never touch the
+    user's real data. The production plot is off unless `plot_mode` says otherwise.
+    `outfit_db` seeds the workspace's outfit database with a copy of the user's
+    (OutfitDatabaseManager().db_path), so real saves with hand-entered outfits run too.
+    """
+
+    def __init__(self, db_source=None, quiet=True, keep=False, plot_mode='off', outfit_db=None):
+        self.db_source = db_source or resource_path("vault.db")
+        self.outfit_db = outfit_db
+        self.quiet = quiet
+        self.keep = keep
+        self.plot_mode = plot_mode
+        self._plot_sink = None
+        self.layout = None
+        self.path = None
+        self._prev_cwd = None
+        self._prev_appdata = None
+        self._devnull = None
+        self._differ = None
+
+    def __enter__(self):
+        self.path = tempfile.mkdtemp(prefix="fallShel_headless_")
+        shutil.copy2(self.db_source, os.path.join(self.path, "vault.db"))
+        if self.outfit_db and os.path.exists(self.outfit_db):
+            # Where OutfitDatabaseManager looks once APPDATA points at the workspace
+            outfit_dir = os.path.join(self.path, "fallShel_efficiency_program")
+            os.makedirs(outfit_dir, exist_ok=True)
+            shutil.copy2(self.outfit_db, os.path.join(outfit_dir, "vault.db"))
+
+        self._prev_cwd = os.getcwd()
+        self._prev_appdata = os.environ.get("APPDATA")
+        os.environ["APPDATA"] = self.path
+        os.chdir(self.path)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._plot_sink is not None:
+            self._plot_sink.close()
+            self._plot_sink = None
+        os.chdir(self._prev_cwd)
+        if self._prev_appdata is None:
+            os.environ.pop("APPDATA", None)
+        else:
+            os.environ["APPDATA"] = self._prev_appdata
+        if self._devnull is not None:
+            self._devnull.close()
+            self._devnull = None
+        if not self.keep:
+            shutil.rmtree(self.path, ignore_errors=True)
+        return False
+
+    def silenced(self):
+        """Context manager that swallows stdout when the workspace is quiet"""
+        if not self.quiet:
+            return contextlib.nullcontext()
+        if self._devnull is None:
+            self._devnull = open(os.devnull, "w", encoding="utf-8")
+        return contextlib.redirect_stdout(self._devnull)
+
+    def ingest(self, save_path):
+        """
+        Load a decrypted save into the workspace database and vault map.
+
+        Saves after the first are diffed against the previous one and only the
+        changes are applied. Returns the outfit list produced by TableSorter,
+        ready for placementCalc.
+        """
+        import TableSorter
+        import virtualvaultmap
+        from save_diff import SaveDiffer
+
+        if self._differ is None:
+            self._differ = SaveDiffer()
+        save_path = os.path.abspath(save_path)
+        with self.silenced():
+            changes = self._differ.update(save_path)
+            outfitlist = TableSorter.run(save_path, changes)
+            self.layout = virtualvaultmap.run(save_path, changes)
+        return outfitlist
+
+    def optimize(self, save_path, outfitlist, vault_name, optimizer_params=None):
+        """
+        Run placementCalc on an ingested save and return the optimization results dict,
+        or None when placementCalc refused to run (e.g. missing outfits).
+        """
+        import placementCalc
+        import production_plot
+
+        if self._plot_sink is None:
+            self._plot_sink = production_plot.ProductionPlotSink(self.plot_mode, output_dir=self.path)
+
+        save_path = os.path.abspath(save_path)
+        with self.silenced():
+            results_file = placementCalc.run(save_path, outfitlist, vault_name, optimizer_params,
+                                             plot_sink=self._plot_sink, layout=self.layout)
+
+        if not results_file or not os.path.exists(results_file):
+            return None
+        with open(results_file, "r") as f:
+            return json.load(f)
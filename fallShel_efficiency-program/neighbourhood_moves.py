@@ -0,0 +1,213 @@
+import heapq
+from collections import namedtuple
+
+# Operators the balancer can use, in the order they are tried
+OPERATORS = ("relocate", "swap", "ejection", "cycle3")
+
+# How many of a slow room's weakest members, and how many of the strongest outside
+# candidates, each operator combines
+WEAKEST_PER_ROOM = 2
+CANDIDATES_PER_ROOM = 8
+# Rooms an ejected or passed-on dweller may go to, best fits first
+DESTINATIONS_PER_MOVE = 3
+
+# A move: kind, the (dweller, from room, to room) steps it makes, and its weighted gain
+Move = namedtuple("Move", "kind steps score")
+
+
+def operators_from_param(value):
+    """NEIGHBOURHOOD_MOVES optimizer param -> tuple of operator names (True = all, falsy = none)"""
+    if not value:
+        return ()
+    if value is True:
+        return OPERATORS
+    if isinstance(value, str):
+        value = [value]
+    unknown = [name for name in value if name not in OPERATORS]
+    if unknown:
+        raise ValueError(f"Unknown neighbourhood move(s): {', '.join(unknown)}")
+    return tuple(name for name in OPERATORS if name in value)
+
+
+class MoveEvaluator:
+    """
+    Delta scoring of dweller moves between production rooms.
+
+    rooms maps room key -> list of dweller ids (the balancer's sortedL, shared, not copied).
+    Each room's summed relevant stat is cached, so scoring a move only recomputes the
+    times of the two or three rooms it touches. A move's score is the weighted drop in
+    those times: rooms slower than their target by more than `threshold` count 1.5x,
+    like the slow room in a cross-stat swap.
+
+    value(dweller, room)     - the dweller's relevant stat for the room
+    time_for(room, total)    - production time for a summed stat (None for no output)
+    capacity(room)           - dweller slots of the room
+    target(room)             - group target time of the room (None for no target)
+    """
+
+    def __init__(self, rooms, room_keys, value, time_for, capacity, target, threshold):
+        self.rooms = rooms
+        self.room_keys = list(room_keys)
+        self.room_order = {room: i for i, room in enumerate(self.room_keys)}
+        self._value = value
+        self._time_for = time_for
+        self.capacity = capacity
+        self.target = target
+        self.threshold = threshold
+        # Stats and the time formula are fixed for the evaluator's lifetime, so both are memoised
+        self._values = {}
+        self._times_for = {}
+        self.totals = {}
+        self.times = {}
+        self.weights = {}
+        for room in self.room_keys:
+            self.refresh(room)
+
+    def value(self, dweller, room):
+        key = (dweller, room)
+        if key not in self._values:
+            self._values[key] = self._value(dweller, room)
+        return self._values[key]
+
+    def time_for(self, room, total):
+        key = (room, total)
+        if key not in self._times_for:
+            self._times_for[key] = self._time_for(room, total)
+        return self._times_for[key]
+
+    def refresh(self, room):
+        """Re-read one room's members after it changed outside the evaluator"""
+        self.totals[room] = sum(self.value(d, room) for d in self.rooms.get(room, ()))
+        self.times[room] = self.time_for(room, self.totals[room])
+        target = self.target(room)
+        time = self.times[room]
+        slow = target is not None and time is not None and time - target > self.threshold
+        self.weights[room] = 1.5 if slow else 1.0
+
+    def score(self, steps):
+        """Weighted time gain of a move, or None if it overfills or empties a room"""
+        delta_total = {}
+        delta_count = {}
+        for dweller, src, dst in steps:
+            delta_total[src] = delta_total.get(src, 0) - self.value(dweller, src)
+            delta_total[dst] = delta_total.get(dst, 0) + self.value(dweller, dst)
+            delta_count[src] = delta_count.get(src, 0) - 1
+            delta_count[dst] = delta_count.get(dst, 0) + 1
+
+        gain = 0
+        for room, delta in delta_total.items():
+            count = len(self.rooms[room]) + delta_count[room]
+            if count < 1 or count > self.capacity(room):
+                return None
+            old_time = self.times[room]
+            new_time = self.time_for(room, self.totals[room] + delta)
+            if old_time is None or new_time is None:
+                return None
+            gain += (old_time - new_time) * self.weights[room]
+        return gain
+
+    def free_rooms(self, exclude=()):
+        """Rooms with an unused slot, in room order"""
+        return [room for room in self.room_keys
+                if room not in exclude and self.rooms.get(room) and len(self.rooms[room]) < self.capacity(room)]
+
+    def strongest_outside(self, room, floor):
+        """Up to CANDIDATES_PER_ROOM (dweller, their room) pairs from other rooms that beat `floor` for `room`"""
+        ranked = []
+        for other in self.room_keys:
+            if other == room:
+                continue
+            for slot, dweller in enumerate(self.rooms.get(other, ())):
+                v = self.value(dweller, room)
+                if v > floor:
+                    ranked.append((v, -self.room_order[other], -slot, dweller, other))
+        return [(d, other) for _, _, _, d, other in heapq.nlargest(CANDIDATES_PER_ROOM, ranked)]
+
+    def candidate_moves(self, room, operators=OPERATORS):
+        """Every move the operators generate to speed up `room`, in a fixed order"""
+        members = self.rooms.get(room) or []
+        if not members:
+            return
+        weakest = sorted(members, key=lambda d: self.value(d, room))[:WEAKEST_PER_ROOM]
+        floor = self.value(weakest[0], room)
+        strong = self.strongest_outside(room, floor)
+        has_slot = len(members) < self.capacity(room)
+
+        if "relocate" in operators and has_slot:
+            for dweller, other in strong:
+                yield "relocate", ((dweller, other, room),)
+
+        if "swap" in operators:
+            for weak in weakest:
+                for dweller, other in strong:
+                    yield "swap", ((weak, room, other), (dweller, other, room))
+
+        if "ejection" in operators and not has_slot:
+            # Pull a strong dweller in and push the weak one on into a room with a free slot
+            for weak in weakest:
+                free = self.free_rooms(exclude=(room,))
+                free = heapq.nlargest(DESTINATIONS_PER_MOVE, free, key=lambda r: self.value(weak, r))
+                for dweller, other in strong:
+                    for dest in free:
+                        if dest != other:
+                            yield "ejection", ((dweller, other, room), (weak, room, dest))
+
+        if "cycle3" in operators:
+            # weak -> via, via's best member for the donor room -> donor room, the strong dweller -> room
+            passers = {}
+            for weak in weakest:
+                for dweller, other in strong:
+                    if other not in passers:
+                        passers[other] = self.best_passers(other, exclude=(room,))
+                    for passer, via in passers[other]:
+                        yield "cycle3", ((weak, room, via), (passer, via, other), (dweller, other, room))
+
+    def best_passers(self, room, exclude=()):
+        """(dweller, their room) for the DESTINATIONS_PER_MOVE other rooms whose best member suits `room` most"""
+        best = []
+        for via in self.room_keys:
+            if via == room or via in exclude or not self.rooms.get(via):
+                continue
+            passer = max(self.rooms[via], key=lambda d: self.value(d, room))
+            best.append((self.value(passer, room), -self.room_order[via], passer, via))
+        return [(passer, via) for _, _, passer, via in heapq.nlargest(DESTINATIONS_PER_MOVE, best)]
+
+    def best_move(self, room, operators=OPERATORS, min_gain=0.5):
+        """Highest scoring move for `room` above min_gain (first generated wins ties), or None"""
+        best = None
+        for kind, steps in self.candidate_moves(room, operators):
+            score = self.score(steps)
+            if score is not None and score > min_gain and (best is None or score > best.score):
+                best = Move(kind, steps, score)
+        return best
+
+    def touched(self, move):
+        rooms = []
+        for _, src, dst in move.steps:
+            for room in (src, dst):
+                if room not in rooms:
+                    rooms.append(room)
+        return rooms
+
+
+def journal_steps(move):
+    """
+    Break a move into plain swaps and relocations that leave the same final placement:
+    ("swap", d1, room1, d2, room2) or ("relocate", dweller, from_room, to_room).
+    """
+    steps = move.steps
+    if move.kind == "relocate":
+        dweller, src, dst = steps[0]
+        return [("relocate", dweller, src, dst)]
+    if move.kind == "swap":
+        (weak, room, other), (dweller, _, _) = steps
+        return [("swap", weak, room, dweller, other)]
+    if move.kind == "ejection":
+        (dweller, other, room), (weak, _, free) = steps
+        # After the swap the weak dweller sits in the donor room; move it on to the free slot
+        return [("swap", dweller, other, weak, room), ("relocate", weak, other, free)]
+    if move.kind == "cycle3":
+        (weak, room, via), (passer, _, other), (dweller, _, _) = steps
+        # weak <-> passer puts passer in room; passer <-> dweller then sends it on to the donor room
+        return [("swap", weak, room, passer, via), ("swap", passer, room, dweller, other)]
+    raise ValueError(f"Unknown move kind: {move.kind}")
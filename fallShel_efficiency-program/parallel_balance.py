@@ -0,0 +1,283 @@
+import atexit
+import bisect
+import weakref
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import vault_log
+
+log = vault_log.get_logger(__name__)
+
+# Columns of the shared stat matrix
+STAT_COLUMNS = ("Strength", "Perception", "Agility", "Intelligence")
+
+
+def stat_columns(stat):
+    """Matrix columns for a room stat: one column, or two for dual-stat rooms (NukaCola)"""
+    if isinstance(stat, tuple):
+        return tuple(STAT_COLUMNS.index(s) for s in stat)
+    return (STAT_COLUMNS.index(stat),)
+
+
+class SharedPlacement:
+    """
+    Stat matrix and occupancy of one balancing run in shared memory.
+
+    stats[i]     - the dweller's STAT_COLUMNS values (fixed for the whole run)
+    occupancy[i] - (room index, position in the room's list) for the current pass, room -1 if not placed
+    Workers attach by name, so each pass only rewrites the occupancy array.
+    """
+
+    def __init__(self, stat_rows):
+        n = max(len(stat_rows), 1)
+        self._stats_shm = shared_memory.SharedMemory(create=True, size=n * len(STAT_COLUMNS) * 8)
+        self._occ_shm = shared_memory.SharedMemory(create=True, size=n * 2 * 4)
+        self.stats = np.ndarray((n, len(STAT_COLUMNS)), dtype=np.float64, buffer=self._stats_shm.buf)
+        self.occupancy = np.ndarray((n, 2), dtype=np.int32, buffer=self._occ_shm.buf)
+        self.stats[:] = 0
+        if stat_rows:
+            self.stats[:len(stat_rows)] = stat_rows
+        self.occupancy[:] = -1
+        self.generation = 0
+        # Release the segments even if balancing bails out with an exception
+        self._finalizer = weakref.finalize(self, SharedPlacement._release, self._stats_shm, self._occ_shm)
+
+    @property
+    def spec(self):
+        return (self._stats_shm.name, self._occ_shm.name, self.stats.shape[0], self.generation)
+
+    def set_occupancy(self, rooms):
+        """rooms: list of lists of dweller indices, in room index order"""
+        self.occupancy[:] = -1
+        for room_index, members in enumerate(rooms):
+            for slot, dweller in enumerate(members):
+                self.occupancy[dweller] = (room_index, slot)
+        self.generation += 1
+
+    def close(self):
+        # Drop our views before releasing the buffers
+        self.stats = self.occupancy = None
+        self._finalizer()
+
+    @staticmethod
+    def _release(*segments):
+        for shm in segments:
+            try:
+                shm.close()
+                shm.unlink()
+            except (BufferError, FileNotFoundError):
+                pass
+
+
+# --- Worker side -----------------------------------------------------------------
+
+_attached = {}
+
+
+def _pass_view(spec):
+    """Stats as Python floats, room members and room of every dweller for one pass (cached per pass in each worker)"""
+    stats_name, occ_name, n, generation = spec
+    cached = _attached.get("view")
+    if cached is not None and cached[0] == (stats_name, occ_name, generation):
+        return cached[1]
+
+    if _attached.get("names") != (stats_name, occ_name):
+        for shm in _attached.pop("shms", ()):
+            shm.close()
+        shms = (shared_memory.SharedMemory(name=stats_name), shared_memory.SharedMemory(name=occ_name))
+        _attached["shms"] = shms
+        _attached["names"] = (stats_name, occ_name)
+
+    stats_shm, occ_shm = _attached["shms"]
+    stats = np.ndarray((n, len(STAT_COLUMNS)), dtype=np.float64, buffer=stats_shm.buf).tolist()
+    occupancy = np.ndarray((n, 2), dtype=np.int32, buffer=occ_shm.buf)
+    placed = np.flatnonzero(occupancy[:, 0] >= 0)
+    order = placed[np.lexsort((occupancy[placed, 1], occupancy[placed, 0]))]
+    room_of = occupancy[:, 0].tolist()
+    members = {}
+    for dweller in order.tolist():
+        members.setdefault(room_of[dweller], []).append(dweller)
+
+    view = _PassView(stats, members, room_of)
+    _attached["view"] = ((stats_name, occ_name, generation), view)
+    return view
+
+
+class _PassView:
+    """Worker-side copy of one pass: sorted stat indexes and room sums are built on first use"""
+
+    def __init__(self, stats, members, room_of):
+        self.stats = stats
+        self.members = members
+        self.room_of = room_of
+        self._indexes = {}
+        self._summaries = {}
+
+    def value(self, dweller, columns):
+        row = self.stats[dweller]
+        if len(columns) == 2:
+            return (row[columns[0]] + row[columns[1]]) / 2
+        return row[columns[0]]
+
+    def stat_index(self, columns):
+        """(ascending values, dweller indices) of all placed dwellers"""
+        if columns not in self._indexes:
+            ranked = sorted((self.value(d, columns), d) for ms in self.members.values() for d in ms)
+            self._indexes[columns] = ([v for v, _ in ranked], [d for _, d in ranked])
+        return self._indexes[columns]
+
+    def summary(self, room, columns):
+        """(summed value, weakest value) of a room"""
+        if room not in self._summaries:
+            values = [self.value(d, columns) for d in self.members[room]]
+            self._summaries[room] = (sum(values), min(values))
+        return self._summaries[room]
+
+
+def _time(pool, total, happiness):
+    # Same arithmetic as placementCalc.production_time_for_total
+    if total == 0:
+        return None
+    return round(pool / (total * (1 + happiness / 100)), 1)
+
+
+def evaluate_slow_room(task):
+    """
+    Best swap partner for one slow room's weakest dweller, against the pass snapshot.
+
+    Same search and tie-break as placementCalc's serial scan (strongest candidates first,
+    pruned by each donor room's cheapest possible loss; equal improvements go to the
+    lowest (room, slot)). Returns (donor_room, improvement, slot, dweller, new_slow_time,
+    new_other_time) or None when no swap improves things.
+    """
+    spec, rooms, slow, worst, happiness = task
+    view = _pass_view(spec)
+    slow_pool, slow_cols, slow_time = rooms[slow]
+    worst_value = view.value(worst, slow_cols)
+    slow_total = view.summary(slow, slow_cols)[0]
+
+    donor_floor = {}
+    for other, (other_pool, other_cols, other_time) in enumerate(rooms):
+        if other == slow or other not in view.members:
+            continue
+        other_total, other_weakest = view.summary(other, other_cols)
+        floor_time = _time(other_pool, other_total - other_weakest + view.value(worst, other_cols), happiness)
+        if floor_time is not None:
+            donor_floor[other] = floor_time - other_time
+    if not donor_floor:
+        return None
+    min_donor_cost = min(donor_floor.values())
+
+    values, candidates = view.stat_index(slow_cols)
+    first = bisect.bisect_right(values, worst_value)
+    best = None
+    best_improvement = 0
+    for pos in range(len(candidates) - 1, first - 1, -1):
+        new_slow = _time(slow_pool, slow_total - worst_value + values[pos], happiness)
+        if new_slow is None:
+            continue
+        slow_gain = (slow_time - new_slow) * 1.5
+        if slow_gain - min_donor_cost < best_improvement:
+            break
+
+        dweller = candidates[pos]
+        other = view.room_of[dweller]
+        if other == slow or other not in donor_floor or slow_gain - donor_floor[other] < best_improvement:
+            continue
+        other_pool, other_cols, other_time = rooms[other]
+        other_total = view.summary(other, other_cols)[0]
+        new_other = _time(other_pool, other_total - view.value(dweller, other_cols) + view.value(worst, other_cols),
+                          happiness)
+        if new_other is None:
+            continue
+        improvement = slow_gain - (new_other - other_time)
+        slot = view.members[other].index(dweller)
+        if improvement > best_improvement or (
+                best is not None and improvement == best_improvement and (other, slot) < (best[0], best[2])):
+            best_improvement = improvement
+            best = (other, improvement, slot, dweller, new_slow, new_other)
+    return best
+
+
+def evaluate_chunk(spec, rooms, tasks, happiness):
+    return [evaluate_slow_room((spec, rooms, slow, worst, happiness)) for slow, worst in tasks]
+
+
+# --- Main process side -----------------------------------------------------------
+
+class ParallelSwapEvaluator:
+    """Process pool that scores cross-stat swap candidates for many slow rooms at once"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+
+    def submit(self, placement, rooms, tasks, happiness):
+        """
+        Queue one pass worth of slow rooms.
+
+        rooms: [(pool, stat columns, snapshot time), ...] by room index
+        tasks: [(slow room index, weakest dweller index), ...]
+        Returns a PendingScores; results are read back in task order.
+        """
+        spec = placement.spec
+        size = max(1, -(-len(tasks) // (self.workers * 4)))
+        futures = [self._executor.submit(evaluate_chunk, spec, rooms, tasks[i:i + size], happiness)
+                   for i in range(0, len(tasks), size)]
+        return PendingScores(futures, size)
+
+    def map(self, fn, tasks):
+        """Run whole jobs (fn(task) for each task) in the pool, results in task order"""
+        return list(self._executor.map(fn, tasks))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class PendingScores:
+    """Results of one submitted pass; chunks the balancer never reaches can be cancelled"""
+
+    def __init__(self, futures, chunk_size):
+        self._futures = futures
+        self._chunk_size = chunk_size
+
+    def result(self, index):
+        """Best swap for task `index` (blocks until its chunk is done)"""
+        chunk, offset = divmod(index, self._chunk_size)
+        return self._futures[chunk].result()[offset]
+
+    def cancel(self):
+        for future in self._futures:
+            future.cancel()
+
+
+_evaluators = {}
+_lock = threading.Lock()
+
+
+def get_evaluator(workers):
+    """Shared evaluator for this worker count (pools are reused across cycles); None if workers < 2"""
+    if not workers or workers < 2:
+        return None
+    with _lock:
+        evaluator = _evaluators.get(workers)
+        if evaluator is None:
+            try:
+                evaluator = ParallelSwapEvaluator(workers)
+            except (OSError, ValueError) as e:
+                log.warning("⚠️  Could not start %d balancing workers (%s) - using the serial balancer", workers, e)
+                return None
+            _evaluators[workers] = evaluator
+        return evaluator
+
+
+@atexit.register
+def shutdown():
+    with _lock:
+        evaluators = list(_evaluators.values())
+        _evaluators.clear()
+    for evaluator in evaluators:
+        evaluator.close()
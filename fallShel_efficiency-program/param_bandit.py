@@ -0,0 +1,154 @@
+import os
+import math
+import time
+
+import vault_log
+import parallel_balance
+from headless import HeadlessWorkspace
+from param_tuner import user_outfit_db
+
+log = vault_log.get_logger(__name__)
+
+# Arms are the current config plus these one-parameter moves:
+# (config key, multiply by / add, low, high)
+PERTURBATIONS = [
+    ('max_balance_passes', ('add', 3), 1, 25),
+    ('max_balance_passes', ('add', -3), 1, 25),
+    ('balance_threshold', ('mul', 1.25), 0.5, 20.0),
+    ('balance_threshold', ('mul', 0.8), 0.5, 20.0),
+]
+ARM_KEYS = ('max_balance_passes', 'balance_threshold')
+
+# UCB exploration weight. Rewards are the fraction of the initial average an arm saves, so
+# arms usually sit within a few hundredths of each other.
+EXPLORATION = 0.05
+
+
+def arm_key(arm):
+    """Statistics key of an arm: its bandit params"""
+    return "|".join(str(arm[key]) for key in ARM_KEYS)
+
+
+def arm_label(arm):
+    return f"passes {arm['max_balance_passes']} / threshold {arm['balance_threshold']}"
+
+
+def perturb(config, move):
+    key, (op, amount), low, high = move
+    value = config[key] * amount if op == 'mul' else config[key] + amount
+    if isinstance(config[key], int) and op == 'add':
+        value = int(value)
+    else:
+        value = round(float(value), 2)
+    return min(high, max(low, value))
+
+
+def evaluate_arm(task):
+    """
+    Run placementCalc with one arm's params on the cycle's snapshot (in a worker process).
+
+    task: (snapshot path, optimizer params, outfit database to copy or None)
+    Returns (performance dict or None, CPU seconds of the run).
+    """
+    save_path, params, outfit_db = task
+    with HeadlessWorkspace(outfit_db=outfit_db) as ws:
+        outfitlist = ws.ingest(save_path)
+        start = time.process_time()
+        run = ws.optimize(save_path, outfitlist, "bandit", params)
+        cpu = time.process_time() - start
+    return (run['performance'] if run else None), cpu
+
+
+class ParameterBandit:
+    """
+    Per-cycle bandit over balancing params for the adaptive mode.
+
+    Each cycle the current config and up to bandit_arms - 1 perturbations of it are all run on
+    the same snapshot in the balancing worker pool, so they are compared on identical game state.
+    An arm's reward is (initial - with outfits) / initial for that snapshot. The statistics live
+    under 'bandit_stats' in the optimizer config, keyed by the arm's params, so they carry over
+    when the config moves. The arm with the highest upper confidence bound becomes the live config.
+    """
+
+    def __init__(self, optimizer, workers=None):
+        self.optimizer = optimizer
+        self.workers = workers
+
+    @property
+    def arms_per_cycle(self):
+        return int(self.optimizer.config.get('bandit_arms', 0))
+
+    def arms(self, stats):
+        """The current config and the perturbations worth trying, best upper bound first"""
+        current = {key: self.optimizer.config[key] for key in ARM_KEYS}
+        candidates = []
+        for move in PERTURBATIONS:
+            arm = dict(current)
+            arm[move[0]] = perturb(current, move)
+            if arm_key(arm) != arm_key(current) and all(arm_key(arm) != arm_key(c) for c in candidates):
+                candidates.append(arm)
+        total = sum(s['n'] for s in stats.values())
+        candidates.sort(key=lambda arm: -self.upper_bound(stats.get(arm_key(arm)), total))
+        return [current] + candidates[:max(0, self.arms_per_cycle - 1)]
+
+    @staticmethod
+    def upper_bound(stat, total):
+        if not stat or not stat['n']:
+            return math.inf
+        return stat['mean'] + EXPLORATION * math.sqrt(2 * math.log(max(total, 1)) / stat['n'])
+
+    def run_cycle(self, json_path):
+        """
+        Evaluate this cycle's arms on json_path, update the statistics and move the adaptive config
+        to the arm with the best upper bound. Returns a report (one entry per arm, the chosen one
+        marked), or None when the bandit is off or could not run.
+        """
+        if self.arms_per_cycle < 2 or self.optimizer.manual_mode:
+            return None
+        stats = self.optimizer.bandit_stats()
+        arms = self.arms(stats)
+        workers = self.workers or min(len(arms), os.cpu_count() or 1)
+        evaluator = parallel_balance.get_evaluator(max(2, workers))
+        if evaluator is None:
+            return None
+
+        base = self.optimizer.get_optimization_params()
+        outfit_db = user_outfit_db()
+        tasks = []
+        for arm in arms:
+            params = dict(base)
+            params.update({'MAX_PASSES': arm['max_balance_passes'],
+                           'BALANCE_THRESHOLD': arm['balance_threshold']})
+            tasks.append((os.path.abspath(json_path), params, outfit_db))
+
+        start = time.perf_counter()
+        results = evaluator.map(evaluate_arm, tasks)
+        elapsed = time.perf_counter() - start
+
+        report = []
+        for arm, (performance, cpu) in zip(arms, results):
+            entry = {'label': arm_label(arm), 'params': arm, 'cpu_seconds': round(cpu, 3), 'reward': None,
+                     'with_outfits_avg': None, 'chosen': False}
+            if performance and performance.get('initial_avg'):
+                reward = (performance['initial_avg'] - performance['with_outfits_avg']) / performance['initial_avg']
+                stat = stats.setdefault(arm_key(arm), {'params': arm, 'n': 0, 'mean': 0.0, 'cpu_seconds': 0.0})
+                stat['n'] += 1
+                stat['mean'] += (reward - stat['mean']) / stat['n']
+                stat['cpu_seconds'] += (cpu - stat['cpu_seconds']) / stat['n']
+                entry.update(reward=round(reward, 4), with_outfits_avg=performance['with_outfits_avg'])
+            report.append(entry)
+
+        if all(entry['reward'] is None for entry in report):
+            log.warning("⚠️  No bandit arm produced a result this cycle - keeping the current config")
+            return None
+
+        self.optimizer.save_bandit_stats(stats)
+        total = sum(s['n'] for s in stats.values())
+        best = max(range(len(arms)), key=lambda i: self.upper_bound(stats.get(arm_key(arms[i])), total)
+                   if report[i]['reward'] is not None else -math.inf)
+        report[best]['chosen'] = True
+        if best != 0:
+            self.optimizer.config.update(arms[best])
+            self.optimizer._save_config()
+        log.info("🎰 Bandit: %d arms in %.1fs, live config %s", len(arms), elapsed, report[best]['label'])
+        return report
@@ -0,0 +1,212 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from headless import HeadlessWorkspace
+from benchmark import OUTFIT_STRATEGIES, generate_save, load_outfit_ids
+
+
+# Ranges searched for each optimizer param ((low, high) for numbers, a list for choices)
+SEARCH_SPACE = {
+    'BALANCE_THRESHOLD': (1.0, 10.0),
+    'MAX_PASSES': (5, 25),
+    'MIN_STAT_THRESHOLD': (1, 8),
+    'OUTFIT_STRATEGY': OUTFIT_STRATEGIES,
+}
+# ROOM_PRIORITIES is searched as an ordering of these room types
+PRIORITY_ROOMS = ('Medbay', 'Power', 'Water', 'Food')
+
+# Optimizer param -> AdaptiveVaultOptimizer config key
+CONFIG_KEYS = {
+    'BALANCE_THRESHOLD': 'balance_threshold',
+    'MAX_PASSES': 'max_balance_passes',
+    'MIN_STAT_THRESHOLD': 'min_stat_threshold',
+    'OUTFIT_STRATEGY': 'outfit_strategy',
+    'ROOM_PRIORITIES': 'room_priorities',
+}
+
+
+def sample_params(rng, base):
+    """One random candidate: every searched param drawn from SEARCH_SPACE, the rest copied from base"""
+    params = dict(base)
+    for name, space in SEARCH_SPACE.items():
+        if isinstance(space, list):
+            params[name] = rng.choice(space)
+        elif isinstance(space[0], int):
+            params[name] = rng.randint(*space)
+        else:
+            params[name] = round(rng.uniform(*space), 2)
+    order = list(PRIORITY_ROOMS)
+    rng.shuffle(order)
+    params['ROOM_PRIORITIES'] = {room: rank for rank, room in enumerate(order, start=1)}
+    return params
+
+
+def evaluate_chunk(task):
+    """
+    Run placementCalc for several candidates on one snapshot (in a worker process).
+
+    task: (snapshot path, [(candidate index, params), ...], outfit database to copy or None)
+    Returns [(candidate index, snapshot path, with-outfits average or None, seconds), ...].
+    """
+    save_path, chunk, outfit_db = task
+    results = []
+    with HeadlessWorkspace(outfit_db=outfit_db) as ws:
+        outfitlist = ws.ingest(save_path)
+        for index, params in chunk:
+            start = time.perf_counter()
+            run = ws.optimize(save_path, outfitlist, f"tune_{index}", params)
+            elapsed = time.perf_counter() - start
+            score = run['performance']['with_outfits_avg'] if run else None
+            results.append((index, save_path, score, elapsed))
+    return results
+
+
+def user_outfit_db():
+    """The user's outfit database (with hand-entered outfits), for workspaces to start from"""
+    from outfit_manager import OutfitDatabaseManager
+    return OutfitDatabaseManager().db_path
+
+
+def successive_halving(snapshots, candidates, eta=3, workers=None, progress=print):
+    """
+    Successive halving over snapshots: every candidate is scored on the first snapshot, the best
+    1/eta go on to eta times as many snapshots, and so on until the survivors have seen them all.
+    Candidate 0 (the incumbent) is never dropped, so the winner is always compared with it on
+    every snapshot. A candidate's score is its mean with-outfits average (lower is better).
+
+    Returns (ranking of (mean score, candidate index) over the final rung, {index: {snapshot: score}}).
+    """
+    scores = {i: {} for i in range(len(candidates))}
+    alive = list(range(len(candidates)))
+    budget = 1
+    workers = workers or os.cpu_count() or 1
+    outfit_db = user_outfit_db()
+
+    def mean_score(i, rung):
+        values = [scores[i].get(s) for s in rung]
+        if any(v is None for v in values):
+            return math.inf
+        return statistics.mean(values)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            rung = snapshots[:budget]
+            pending = [(i, s) for i in alive for s in rung if s not in scores[i]]
+            tasks = []
+            for snapshot in rung:
+                todo = [(i, candidates[i]) for i, s in pending if s == snapshot]
+                # Enough chunks to keep every worker busy, but each one ingests the snapshot once
+                per_chunk = max(1, math.ceil(len(todo) * len(rung) / workers))
+                tasks.extend((snapshot, todo[k:k + per_chunk], outfit_db) for k in range(0, len(todo), per_chunk))
+
+            start = time.perf_counter()
+            for chunk_results in pool.map(evaluate_chunk, tasks):
+                for index, snapshot, score, _ in chunk_results:
+                    scores[index][snapshot] = score
+
+            ranking = sorted((mean_score(i, rung), i) for i in alive)
+            progress(f"  {len(alive):3d} candidates x {len(rung)} snapshot(s) in {time.perf_counter() - start:.1f}s"
+                     f" | best {ranking[0][0]:.2f}s")
+            if budget >= len(snapshots):
+                return ranking, scores
+
+            keep = max(1, len(alive) // eta)
+            alive = [i for _, i in ranking[:keep]]
+            if 0 not in alive:
+                alive.append(0)
+            budget = min(len(snapshots), budget * eta)
+
+
+def tune(vault_name, snapshots, candidates=27, eta=3, workers=None, seed=0, write=True, progress=print):
+    """
+    Search optimizer params for a vault over saved snapshots and, when the best candidate beats the
+    current config, write it into <vault>_optimizer_config.json. Returns a summary dict.
+    """
+    from AdaptiveVaultOptimizer import AdaptiveVaultOptimizer
+
+    optimizer = AdaptiveVaultOptimizer(vault_name)
+    current = optimizer.get_optimization_params()
+    rng = random.Random(seed)
+    candidate_params = [current] + [sample_params(rng, current) for _ in range(max(0, candidates - 1))]
+    snapshots = [os.path.abspath(s) for s in snapshots]
+
+    progress(f"Tuning {vault_name}: {len(candidate_params)} candidates over {len(snapshots)} snapshot(s), eta={eta}")
+    start = time.perf_counter()
+    ranking, scores = successive_halving(snapshots, candidate_params, eta, workers, progress)
+    best_score, best = ranking[0]
+    current_score = next(score for score, i in ranking if i == 0)
+
+    improved = best != 0 and best_score < current_score
+    if improved and write:
+        optimizer.adopt_params(candidate_params[best])
+
+    summary = {
+        'vault_name': vault_name,
+        'snapshots': snapshots,
+        'seconds': round(time.perf_counter() - start, 2),
+        'current_score': current_score,
+        'best_score': best_score,
+        'best_params': candidate_params[best],
+        'improved': improved,
+        'written': improved and write,
+        'evaluations': sum(len(s) for s in scores.values()),
+    }
+    progress(f"Current config {current_score:.2f}s, best {best_score:.2f}s"
+             f" ({'written to ' + optimizer.config_file if summary['written'] else 'not written'})"
+             f" after {summary['evaluations']} runs in {summary['seconds']}s")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune optimizer params offline over saved vault snapshots")
+    parser.add_argument("vault", help="Vault name whose optimizer config is tuned (e.g. Vault1)")
+    parser.add_argument("snapshots", nargs="*", help="Decrypted save JSON files to evaluate on")
+    parser.add_argument("--synthetic", type=int, nargs="+", default=[],
+                        help="Also evaluate on synthetic vaults with these dweller counts")
+    parser.add_argument("--archived", type=int, default=0,
+                        help="Also evaluate on the vault's last N saves from the snapshot archive")
+    parser.add_argument("--candidates", type=int, default=27, help="Parameter sets to try (incl. the current one)")
+    parser.add_argument("--eta", type=int, default=3, help="Keep 1/eta of the candidates per rung")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for candidate sampling")
+    parser.add_argument("--dry-run", action="store_true", help="Report the winner without writing it back")
+    parser.add_argument("--output", help="Where to write the tuning summary JSON")
+    args = parser.parse_args(argv)
+
+    snapshots = list(args.snapshots)
+    with tempfile.TemporaryDirectory(prefix="fallShel_tune_") as tmp:
+        if args.archived:
+            from snapshot_archive import SnapshotArchive
+            snapshots.extend(SnapshotArchive().export(args.vault, tmp, limit=args.archived))
+        if args.synthetic:
+            outfit_ids = load_outfit_ids()
+            for size in args.synthetic:
+                path = os.path.join(tmp, f"synthetic_{size}.json")
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(generate_save(size, args.seed, outfit_ids), f)
+                snapshots.append(path)
+        if not snapshots:
+            parser.error("no snapshots given (pass save JSON files, --archived or --synthetic)")
+
+        summary = tune(args.vault, snapshots, args.candidates, args.eta, args.workers, args.seed,
+                       write=not args.dry_run)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Summary written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,335 @@
+import os
+import json
+import math
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import vault_log
+
+log = vault_log.get_logger(__name__)
+
+# Per-cycle averages, in the order of the old JSON history's lists
+SERIES = ("initial", "before_balance", "after_balance", "with_outfits")
+
+# Seconds a writer waits for another process / thread to release the database
+BUSY_TIMEOUT = 30
+
+# How long each tier keeps its rows: raw cycles, then hourly aggregates; daily aggregates are kept forever
+DEFAULT_RETENTION = {'raw_hours': 48, 'hourly_days': 90}
+
+# Bucket key of each aggregate tier (a prefix of the ISO timestamp) and what to append to get a timestamp back
+TIERS = {
+    'hourly': (13, ":00:00"),
+    'daily': (10, "T00:00:00"),
+}
+
+
+def _aggregate_columns():
+    return ", ".join(f"{s}_min REAL, {s}_sum REAL, {s}_max REAL" for s in SERIES)
+
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS cycles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    initial REAL,
+    before_balance REAL,
+    after_balance REAL,
+    with_outfits REAL
+);
+CREATE INDEX IF NOT EXISTS cycles_timestamp ON cycles (timestamp);
+CREATE TABLE IF NOT EXISTS hourly (bucket TEXT PRIMARY KEY, count INTEGER, {_aggregate_columns()});
+CREATE TABLE IF NOT EXISTS daily (bucket TEXT PRIMARY KEY, count INTEGER, {_aggregate_columns()});
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    count INTEGER,
+    initial_sum REAL,
+    with_outfits_sum REAL,
+    with_outfits_min REAL,
+    with_outfits_max REAL,
+    first_recorded TEXT,
+    last_recorded TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+INSERT_CYCLE = ("INSERT INTO cycles (timestamp, initial, before_balance, after_balance, with_outfits) "
+                "VALUES (?, ?, ?, ?, ?)")
+
+
+def _upsert_bucket(tier):
+    """One cycle -> its hourly / daily bucket (args: bucket, then the four series values)"""
+    columns = ", ".join(f"{s}_min, {s}_sum, {s}_max" for s in SERIES)
+    values = ", ".join(f":{s}, :{s}, :{s}" for s in SERIES)
+    updates = ", ".join(f"{s}_min = MIN({s}_min, excluded.{s}_min), {s}_sum = {s}_sum + excluded.{s}_sum, "
+                        f"{s}_max = MAX({s}_max, excluded.{s}_max)" for s in SERIES)
+    return (f"INSERT INTO {tier} (bucket, count, {columns}) VALUES (:bucket, 1, {values}) "
+            f"ON CONFLICT (bucket) DO UPDATE SET count = count + 1, {updates}")
+
+
+UPSERT = {tier: _upsert_bucket(tier) for tier in TIERS}
+
+UPSERT_TOTALS = """
+INSERT INTO totals (id, count, initial_sum, with_outfits_sum, with_outfits_min, with_outfits_max,
+                    first_recorded, last_recorded)
+VALUES (1, 1, :initial, :with_outfits, :with_outfits, :with_outfits, :timestamp, :timestamp)
+ON CONFLICT (id) DO UPDATE SET
+    count = count + 1,
+    initial_sum = initial_sum + excluded.initial_sum,
+    with_outfits_sum = with_outfits_sum + excluded.with_outfits_sum,
+    with_outfits_min = MIN(with_outfits_min, excluded.with_outfits_min),
+    with_outfits_max = MAX(with_outfits_max, excluded.with_outfits_max),
+    first_recorded = MIN(first_recorded, excluded.first_recorded),
+    last_recorded = MAX(last_recorded, excluded.last_recorded)
+"""
+
+
+def empty_history():
+    """History in the shape the JSON file had: {'timestamps': [...], 'initial': [...], ...}"""
+    history = {'timestamps': []}
+    history.update({name: [] for name in SERIES})
+    return history
+
+
+class PerformanceStore:
+    """
+    Append-only per-cycle performance history of one vault, in <vault>_performance_history.db.
+
+    Each cycle is a single INSERT, so writers never rewrite earlier cycles and readers can ask for
+    just the last N. The database runs in WAL mode with a busy timeout, so the optimization thread,
+    the GUI and the console loop can all write to it. An existing <vault>_performance_history.json
+    is imported the first time the store is opened and renamed to .json.migrated.
+
+    Every append also folds the cycle into hourly and daily min / sum / max buckets and into a
+    one-row totals table. Raw cycles older than retention['raw_hours'] and hourly buckets older than
+    retention['hourly_days'] are dropped (None keeps that tier); daily buckets and the totals are kept
+    for good, so the summary and the long-range charts never have to read individual cycles.
+    """
+
+    def __init__(self, vault_name, path=None, retention=None):
+        self.vault_name = vault_name
+        self.path = path or f"{vault_name}_performance_history.db"
+        self.json_path = f"{vault_name}_performance_history.json"
+        self.retention = dict(DEFAULT_RETENTION, **(retention or {}))
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+        self._build_tiers()
+        self._migrate_json()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT * 1000}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _once(self, flag, fn):
+        """Run fn(conn) in an immediate transaction unless the meta flag is already set; True if it ran"""
+        with closing(self._connect()) as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (flag,)).fetchone():
+                return False
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM meta WHERE key = ?", (flag,)).fetchone():
+                    conn.execute("COMMIT")
+                    return False
+                fn(conn)
+                conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (flag, datetime.now().isoformat()))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def _build_tiers(self):
+        """Fill the aggregate tiers from the raw cycles of a database that predates them"""
+        def build(conn):
+            for tier, (width, _) in TIERS.items():
+                aggregates = ", ".join(f"MIN({s}), SUM({s}), MAX({s})" for s in SERIES)
+                conn.execute(f"INSERT INTO {tier} SELECT substr(timestamp, 1, {width}), COUNT(*), {aggregates} "
+                             f"FROM cycles GROUP BY 1")
+            conn.execute("INSERT INTO totals SELECT 1, COUNT(*), SUM(initial), SUM(with_outfits), MIN(with_outfits), "
+                         "MAX(with_outfits), MIN(timestamp), MAX(timestamp) FROM cycles HAVING COUNT(*) > 0")
+
+        self._once('tiers_built', build)
+
+    def _migrate_json(self):
+        """Import the old JSON history once (the meta flag keeps concurrent openers from doing it twice)"""
+        if not os.path.exists(self.json_path):
+            return
+        rows = []
+
+        def migrate(conn):
+            try:
+                with open(self.json_path, 'r') as f:
+                    history = json.load(f)
+                rows.extend(zip(history['timestamps'], *(history[name] for name in SERIES)))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                log.warning("⚠️  Could not read %s (%s) - starting a fresh history", self.json_path, e)
+            self._insert(conn, rows)
+
+        if not self._once('json_migrated', migrate):
+            return
+        log.info("✓ Imported %d cycle(s) from %s into %s", len(rows), self.json_path, self.path)
+        try:
+            os.replace(self.json_path, self.json_path + ".migrated")
+        except OSError as e:
+            log.warning("⚠️  Could not rename %s (%s) - it will not be read again", self.json_path, e)
+
+    def _insert(self, conn, rows):
+        """Raw rows plus their share of every aggregate, then drop whatever fell out of retention"""
+        conn.executemany(INSERT_CYCLE, rows)
+        named = [dict(zip(('timestamp',) + SERIES, row)) for row in rows]
+        for tier, (width, _) in TIERS.items():
+            conn.executemany(UPSERT[tier], [dict(row, bucket=row['timestamp'][:width]) for row in named])
+        conn.executemany(UPSERT_TOTALS, named)
+        self._prune(conn)
+
+    def _prune(self, conn):
+        now = datetime.now()
+        if self.retention['raw_hours'] is not None:
+            raw_cutoff = (now - timedelta(hours=self.retention['raw_hours'])).isoformat()
+            conn.execute("DELETE FROM cycles WHERE timestamp < ?", (raw_cutoff,))
+        if self.retention['hourly_days'] is not None:
+            width = TIERS['hourly'][0]
+            hourly_cutoff = (now - timedelta(days=self.retention['hourly_days'])).isoformat()[:width]
+            conn.execute("DELETE FROM hourly WHERE bucket < ?", (hourly_cutoff,))
+
+    def append(self, initial, before_balance, after_balance, with_outfits, timestamp=None):
+        """Record one cycle (atomic: a reader sees all of it or none of it)"""
+        timestamp = timestamp or datetime.now().isoformat()
+        with closing(self._connect()) as conn, conn:
+            self._insert(conn, [(timestamp, initial, before_balance, after_balance, with_outfits)])
+        return timestamp
+
+    def last(self, n):
+        """The last n cycles still kept at full resolution, oldest first, in the JSON history's shape"""
+        return self._history("SELECT * FROM (SELECT timestamp, initial, before_balance, after_balance, "
+                             "with_outfits, id FROM cycles ORDER BY id DESC LIMIT ?) ORDER BY id", (n,))
+
+    def history(self):
+        """Every cycle still kept at full resolution, oldest first, in the JSON history's shape"""
+        return self._history("SELECT timestamp, initial, before_balance, after_balance, with_outfits "
+                             "FROM cycles ORDER BY id", ())
+
+    def _history(self, query, args):
+        history = empty_history()
+        with closing(self._connect()) as conn:
+            self._collect(history, conn.execute(query, args))
+        return history
+
+    @staticmethod
+    def _collect(history, rows):
+        for row in rows:
+            history['timestamps'].append(row[0])
+            for name, value in zip(SERIES, row[1:]):
+                history[name].append(value)
+
+    def timeline(self, max_points=1000):
+        """
+        The whole history for charts, oldest first, in the JSON history's shape. The most recent raw
+        cycles get the budget first (up to max_points of them); older history is filled in with hourly
+        means and daily means before the oldest hourly bucket, or daily means alone if the hourly ones
+        do not fit in the points left. When even the daily means do not fit, adjacent days are merged
+        into equal spans of days (count-weighted means), so the result never exceeds max_points.
+        """
+        means = ", ".join(f"{s}_sum / count" for s in SERIES)
+
+        def bucket_query(tier, before=None):
+            width, suffix = TIERS[tier]
+            where = "WHERE bucket < ?" if before is not None else ""
+            return f"SELECT bucket || '{suffix}', {means} FROM {tier} {where} ORDER BY bucket", (
+                (before[:width],) if before is not None else ())
+
+        with closing(self._connect()) as conn:
+            raw_total = conn.execute("SELECT COUNT(*) FROM cycles").fetchone()[0]
+            first_hour = conn.execute("SELECT MIN(bucket) FROM hourly").fetchone()[0]
+            first_hour = first_hour and first_hour + TIERS['hourly'][1]
+
+            def count(query, args):
+                return conn.execute(f"SELECT COUNT(*) FROM ({query})", args).fetchone()[0]
+
+            def tail_start(tail):
+                """Timestamp of the oldest of the last `tail` raw cycles (None for no tail)"""
+                if tail <= 0:
+                    return None
+                return conn.execute("SELECT timestamp FROM cycles ORDER BY id DESC LIMIT 1 OFFSET ?",
+                                    (tail - 1,)).fetchone()[0]
+
+            def merged_daily_query(before, points):
+                """Daily means merged into spans of whole days, at most `points` rows"""
+                where, args = ("WHERE bucket < ?", (before[:TIERS['daily'][0]],)) if before is not None else ("", ())
+                first, last = conn.execute(f"SELECT MIN(bucket), MAX(bucket) FROM daily {where}", args).fetchone()
+                if first is None:
+                    return bucket_query('daily', before)
+                days = int(conn.execute("SELECT julianday(?) - julianday(?)", (last, first)).fetchone()[0]) + 1
+                span = math.ceil(days / points)
+                weighted = ", ".join(f"SUM({s}_sum) / SUM(count)" for s in SERIES)
+                return (f"SELECT MIN(bucket) || '{TIERS['daily'][1]}', {weighted} FROM daily {where} "
+                        f"GROUP BY CAST(julianday(bucket) - julianday(?) AS INTEGER) / ? ORDER BY 1",
+                        args + (first, span))
+
+            tail = raw_total if raw_total <= max_points else int(max_points)
+            # History before the tail needs at least its daily means; shorten the tail until they fit
+            while tail > 0:
+                daily = count(*bucket_query('daily', tail_start(tail)))
+                if tail + daily <= max_points:
+                    break
+                tail = max(0, int(max_points) - daily)
+            start = tail_start(tail)
+
+            daily_before = min(t for t in (first_hour, start) if t) if first_hour or start else None
+            layouts = [
+                [bucket_query('daily', daily_before), bucket_query('hourly', start)],
+                [bucket_query('daily', start)],
+            ]
+            for layout in layouts:
+                if tail + sum(count(*part) for part in layout) <= max_points:
+                    break
+            else:
+                # tail is 0 here: the daily means alone are over budget
+                points = int(max_points)
+                layout = [merged_daily_query(start, points)] if points > 0 else []
+
+            history = empty_history()
+            for query, args in layout:
+                self._collect(history, conn.execute(query, args))
+            self._collect(history, conn.execute(
+                "SELECT * FROM (SELECT timestamp, initial, before_balance, after_balance, with_outfits, id "
+                "FROM cycles ORDER BY id DESC LIMIT ?) ORDER BY id", (tail,)))
+        return history
+
+    def count(self):
+        """Cycles recorded in total, including those only kept in aggregates"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT count FROM totals").fetchone()
+        return row[0] if row else 0
+
+    def summary(self):
+        """Totals over every cycle ever recorded, from the totals table (None when empty)"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT count, initial_sum, with_outfits_sum, with_outfits_min, with_outfits_max, "
+                "first_recorded, last_recorded FROM totals").fetchone()
+        if not row or not row[0]:
+            return None
+        count, initial_sum, final_sum, best, worst, first, last = row
+        return {
+            'total_cycles': count,
+            'avg_initial': initial_sum / count,
+            'avg_final': final_sum / count,
+            'best_performance': best,
+            'worst_performance': worst,
+            'first_recorded': first,
+            'last_recorded': last,
+        }
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            for table in ("cycles", "hourly", "daily", "totals"):
+                conn.execute(f"DELETE FROM {table}")
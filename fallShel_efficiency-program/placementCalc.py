@@ -1,132 +1,172 @@
-﻿from asyncio.windows_events import NULL
-from collections import defaultdict
+﻿from collections import defaultdict
 import os
+import bisect
 from statistics import median_grouped
 import time
 import json
+import hashlib
 import sqlite3
-from matplotlib import pyplot as plt
-import numpy as np
+import logging
 from datetime import datetime
 from outfit_manager import OutfitDatabaseManager
+import production_plot
+import parallel_balance
+import neighbourhood_moves
+import group_decomposition
+import production_bound
+import training_allocator
+import vault_layout
+import vault_log
+
+import numpy as np
+
+log = vault_log.get_logger(__name__)
 
 
 class SwapLogger:
-    def __init__(self, vault_happiness):
+    """
+    Journal of balancing swaps.
+
+    Each swap is stored as a compact tuple (the two dwellers, the two rooms, their
+    before/after production times and the relevant stat deltas). Nothing is
+    formatted until a report is asked for, so long balancing runs stay cheap;
+    pass verbose=True to get the old per-swap console report as swaps happen.
+    """
+    ROOM_STAT_MAP = {
+        "Geothermal": "Strength",
+        "Energy2": "Strength",
+        "WaterPlant": "Perception",
+        "Water2": "Perception",
+        "Cafeteria": "Agility",
+        "Hydroponic": "Agility",
+        "MedBay": "Intelligence",
+        "ScienceLab": "Intelligence",
+        "NukaCola": ("Perception", "Agility")
+    }
+
+    def __init__(self, vault_happiness, verbose=False):
         self.vault_happiness = vault_happiness
-        self.swap_history = []
+        self.verbose = verbose
+        self.journal = []
         self.swap_count = 0
-        
-    def log_swap(self, dweller1_id, dweller2_id, room1_key, room2_key, 
-                 before_times, after_times, dweller_stats, reason=""):
+
+    def log_swap(self, dweller1_id, dweller2_id, room1_key, room2_key,
+                 room1_times, room2_times, dweller_stats, reason=""):
+        """
+        Record dweller1 (room1 -> room2) swapped with dweller2 (room2 -> room1).
+        dweller2_id None records a one-way move of dweller1 into a free slot of room2.
+
+        room1_times / room2_times are (before, after) production times of the two rooms.
+        """
         self.swap_count += 1
-        
-        swap_record = {
-            'swap_number': self.swap_count,
-            'dweller1': dweller1_id,
-            'dweller2': dweller2_id,
-            'room1': self._format_room(room1_key),
-            'room2': self._format_room(room2_key),
-            'reason': reason,
-            'room1_time_before': before_times.get(room1_key),
-            'room1_time_after': after_times.get(room1_key),
-            'room2_time_before': before_times.get(room2_key),
-            'room2_time_after': after_times.get(room2_key),
-            'improvement': self._calculate_improvement(before_times, after_times, room1_key, room2_key)
-        }
-        
-        self.swap_history.append(swap_record)
-        self._print_swap_details(swap_record, dweller_stats, room1_key, room2_key)
-        
+
+        stat1 = self.ROOM_STAT_MAP.get(room1_key[0])
+        stat2 = self.ROOM_STAT_MAP.get(room2_key[0])
+        d1_stats = dweller_stats.get(dweller1_id, {})
+        d2_stats = dweller_stats.get(dweller2_id, {})
+        # Change in the summed relevant stat of each room caused by the swap
+        room1_stat_delta = self._stat_value(d2_stats, stat1) - self._stat_value(d1_stats, stat1)
+        room2_stat_delta = self._stat_value(d1_stats, stat2) - self._stat_value(d2_stats, stat2)
+
+        entry = (self.swap_count, dweller1_id, dweller2_id, room1_key, room2_key, reason,
+                 room1_times[0], room1_times[1], room2_times[0], room2_times[1],
+                 room1_stat_delta, room2_stat_delta)
+        self.journal.append(entry)
+
+        if self.verbose:
+            log.info(self.render_swap(entry, dweller_stats))
+
+    @staticmethod
+    def _stat_value(stats, stat):
+        if isinstance(stat, tuple):
+            return (stats.get(stat[0], 0) + stats.get(stat[1], 0)) / 2
+        return stats.get(stat, 0) if stat else 0
+
+    @staticmethod
+    def _improvement(entry):
+        r1_before, r1_after, r2_before, r2_after = entry[6:10]
+        return round(((r1_before or 0) + (r2_before or 0)) - ((r1_after or 0) + (r2_after or 0)), 2)
+
     def _format_room(self, room_key):
-        return f"{room_key[0]}_{room_key[1]}_{room_key[2]}_{room_key[3]}"
-    
-    def _calculate_improvement(self, before_times, after_times, room1_key, room2_key):
-        before_total = (before_times.get(room1_key, 0) + before_times.get(room2_key, 0))
-        after_total = (after_times.get(room1_key, 0) + after_times.get(room2_key, 0))
-        return round(before_total - after_total, 2)
-    
-    def _print_swap_details(self, record, dweller_stats, room1_key, room2_key):
-        print(f"\n{'='*80}")
-        print(f"SWAP #{record['swap_number']}: {record['reason']}")
-        print(f"{'='*80}")
-        
-        # Get room stats needed
-        _, stat1, _ = self._parse_room(room1_key)
-        _, stat2, _ = self._parse_room(room2_key)
-        
-        # Dweller stats
-        d1_stats = dweller_stats.get(record['dweller1'], {})
-        d2_stats = dweller_stats.get(record['dweller2'], {})
-        
-        print(f"\nDweller Movement:")
-        print(f"  Dweller {record['dweller1']} ({record['room1']} → {record['room2']})")
-        print(f"    Stats: S:{d1_stats.get('Strength', 0)} P:{d1_stats.get('Perception', 0)} "
-              f"E:{d1_stats.get('Endurance', 0)} C:{d1_stats.get('Charisma', 0)} "
-              f"I:{d1_stats.get('Intelligence', 0)} A:{d1_stats.get('Agility', 0)} L:{d1_stats.get('Luck', 0)}")
-        print(f"    Relevant stat for new room ({stat2}): {d1_stats.get(stat2, 0)}")
-        
-        print(f"\n  Dweller {record['dweller2']} ({record['room2']} → {record['room1']})")
-        print(f"    Stats: S:{d2_stats.get('Strength', 0)} P:{d2_stats.get('Perception', 0)} "
-              f"E:{d2_stats.get('Endurance', 0)} C:{d2_stats.get('Charisma', 0)} "
-              f"I:{d2_stats.get('Intelligence', 0)} A:{d2_stats.get('Agility', 0)} L:{d2_stats.get('Luck', 0)}")
-        print(f"    Relevant stat for new room ({stat1}): {d2_stats.get(stat1, 0)}")
-        
-        print(f"\nRoom Performance Changes:")
-        print(f"  {record['room1']}:")
-        print(f"    Before: {record['room1_time_before']}s → After: {record['room1_time_after']}s "
-              f"(Δ {round(record['room1_time_before'] - record['room1_time_after'], 2)}s)")
-        print(f"  {record['room2']}:")
-        print(f"    Before: {record['room2_time_before']}s → After: {record['room2_time_after']}s "
-              f"(Δ {round(record['room2_time_before'] - record['room2_time_after'], 2)}s)")
-        
-        print(f"\nOverall Improvement: {record['improvement']}s")
-        
-    def _parse_room(self, room_key):
-        ROOM_STAT_MAP = {
-            "Geothermal": "Strength",
-            "Energy2": "Strength",
-            "WaterPlant": "Perception",
-            "Water2": "Perception",
-            "Cafeteria": "Agility",
-            "Hydroponic": "Agility",
-            "MedBay": "Intelligence",
-            "ScienceLab": "Intelligence",
-            "NukaCola": "Perception+Agility"  
-        }
-        
-        code = room_key[0]
-        size = room_key[2]
-        stat = ROOM_STAT_MAP.get(code)
-        
-        ROOM_CODE_MAP = {
-            "Geothermal": "Power",
-            "Energy2": "Power2",
-            "WaterPlant": "Water",
-            "Water2": "Water2",
-            "Cafeteria": "Food",
-            "Hydroponic": "Food2",
-            "MedBay": "Medbay",
-            "ScienceLab": "Medbay",
-            "NukaCola": "NukaCola"
+        return room_key[3]
+
+    def _record(self, entry):
+        (number, d1, d2, room1, room2, reason,
+         r1_before, r1_after, r2_before, r2_after, r1_delta, r2_delta) = entry
+        return {
+            'swap_number': number,
+            'dweller1': d1,
+            'dweller2': d2,
+            'room1': self._format_room(room1),
+            'room2': self._format_room(room2),
+            'reason': reason,
+            'room1_time_before': r1_before,
+            'room1_time_after': r1_after,
+            'room2_time_before': r2_before,
+            'room2_time_after': r2_after,
+            'room1_stat_delta': r1_delta,
+            'room2_stat_delta': r2_delta,
+            'improvement': self._improvement(entry)
         }
-        
-        room_type = ROOM_CODE_MAP.get(code)
-        return room_type, stat, size
-    
+
+    @property
+    def swap_history(self):
+        """Journal expanded into one dict per swap (built on demand, e.g. for the results JSON)"""
+        return [self._record(entry) for entry in self.journal]
+
+    def render_swap(self, entry, dweller_stats=None):
+        """Human-readable report for one journal entry"""
+        record = self._record(entry)
+        stat1 = self.ROOM_STAT_MAP.get(entry[3][0])
+        stat2 = self.ROOM_STAT_MAP.get(entry[4][0])
+        stat1_name = "+".join(stat1) if isinstance(stat1, tuple) else stat1
+        stat2_name = "+".join(stat2) if isinstance(stat2, tuple) else stat2
+
+        lines = [
+            f"\n{'='*80}",
+            f"SWAP #{record['swap_number']}: {record['reason']}",
+            f"{'='*80}",
+            f"\nDweller Movement:",
+        ]
+        for dweller, src, dst, stat_name, stat in (
+                (record['dweller1'], record['room1'], record['room2'], stat2_name, stat2),
+                (record['dweller2'], record['room2'], record['room1'], stat1_name, stat1)):
+            if dweller is None:
+                continue
+            lines.append(f"  Dweller {dweller} ({src} → {dst})")
+            if dweller_stats is not None:
+                d = dweller_stats.get(dweller, {})
+                lines.append(f"    Stats: S:{d.get('Strength', 0)} P:{d.get('Perception', 0)} "
+                             f"E:{d.get('Endurance', 0)} C:{d.get('Charisma', 0)} "
+                             f"I:{d.get('Intelligence', 0)} A:{d.get('Agility', 0)} L:{d.get('Luck', 0)}")
+                lines.append(f"    Relevant stat for new room ({stat_name}): {self._stat_value(d, stat)}")
+
+        lines.append(f"\nRoom Performance Changes:")
+        for room, before, after, delta in (
+                (record['room1'], record['room1_time_before'], record['room1_time_after'], record['room1_stat_delta']),
+                (record['room2'], record['room2_time_before'], record['room2_time_after'], record['room2_stat_delta'])):
+            lines.append(f"  {room}:")
+            lines.append(f"    Before: {before}s → After: {after}s "
+                         f"(Δ {round((before or 0) - (after or 0), 2)}s, stat Δ {delta:+g})")
+
+        lines.append(f"\nOverall Improvement: {record['improvement']}s")
+        return "\n".join(lines)
+
+    def render(self, dweller_stats=None):
+        """Full report of every journalled swap"""
+        return "\n".join(self.render_swap(entry, dweller_stats) for entry in self.journal)
+
     def print_summary(self):
-        print(f"\n{'='*80}")
-        print(f"SWAP SUMMARY - Total Swaps: {self.swap_count}")
-        print(f"{'='*80}")
-        
-        total_improvement = sum(s['improvement'] for s in self.swap_history)
-        print(f"\nTotal Time Improvement: {round(total_improvement, 2)}s")
-        
-        if self.swap_history:
-            print(f"\nBest Single Swap: Swap #{max(self.swap_history, key=lambda s: s['improvement'])['swap_number']} "
-                  f"({max(s['improvement'] for s in self.swap_history)}s improvement)")
-            print(f"Worst Single Swap: Swap #{min(self.swap_history, key=lambda s: s['improvement'])['swap_number']} "
-                  f"({min(s['improvement'] for s in self.swap_history)}s improvement)")
+        log.info("\n%s\nSWAP SUMMARY - Total Swaps: %d\n%s", '='*80, self.swap_count, '='*80)
+
+        improvements = [self._improvement(entry) for entry in self.journal]
+        log.info("\nTotal Time Improvement: %ss", round(sum(improvements), 2))
+
+        if improvements:
+            best = max(range(len(improvements)), key=improvements.__getitem__)
+            worst = min(range(len(improvements)), key=improvements.__getitem__)
+            log.info("\nBest Single Swap: Swap #%d (%ss improvement)", self.journal[best][0], improvements[best])
+            log.info("Worst Single Swap: Swap #%d (%ss improvement)", self.journal[worst][0], improvements[worst])
 
 
 class BalancingConfig: 
@@ -149,6 +189,12 @@ class BalancingConfig:
             self.enable_cross_stat_balancing = optimizer_params.get('ENABLE_CROSS_STAT_BALANCING', True)
             self.outfit_strategy = optimizer_params.get('OUTFIT_STRATEGY', 'deficit_first')
             self.reference_baseline = optimizer_params.get('REFERENCE_BASELINE', 'auto')
+            self.parallel_workers = optimizer_params.get('PARALLEL_WORKERS', 0)
+            self.neighbourhood_moves = neighbourhood_moves.operators_from_param(
+                optimizer_params.get('NEIGHBOURHOOD_MOVES', False))
+            self.bound_epsilon = optimizer_params.get('BOUND_EPSILON')
+            self.decompose_groups = optimizer_params.get('DECOMPOSE_GROUPS', False)
+            self.training_allocation = optimizer_params.get('TRAINING_ALLOCATION', 'time')
             
             # Update room priorities from optimizer
             if 'ROOM_PRIORITIES' in optimizer_params and optimizer_params['ROOM_PRIORITIES']:
@@ -163,6 +209,11 @@ class BalancingConfig:
             self.enable_cross_stat_balancing = True
             self.outfit_strategy = 'deficit_first'
             self.reference_baseline = 'auto'
+            self.parallel_workers = 0
+            self.neighbourhood_moves = ()
+            self.bound_epsilon = None
+            self.decompose_groups = False
+            self.training_allocation = 'time'
         
     def set_priorities(self, priorities_dict):
 
@@ -177,19 +228,93 @@ class BalancingConfig:
         return sorted(self.room_priorities.keys(), key=lambda rt: self.room_priorities[rt])
 
 
-def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_config=None):
+class OptimizationCancelled(Exception):
+    """Raised inside run() at the next checkpoint once its cancel event is set"""
+
+
+# Phases of a run in the order they finish (progress is reported against this list)
+PHASES = ('outfit_check', 'load', 'map_parse', 'stats', 'initial_assignment', 'baseline', 'balancing',
+          'outfits', 'results', 'plot')
+
+
+class PhaseTimer:
+    """
+    Wall-clock timings for each stage of a placement run.
+
+    progress(phase, percent) is called as each phase finishes, and every mark is also a
+    cancellation checkpoint for `cancel_event` (a threading.Event).
+    """
+    def __init__(self, progress=None, cancel_event=None):
+        self.timings = {}
+        self.progress = progress
+        self.cancel_event = cancel_event
+        self._start = time.perf_counter()
+        self._last = self._start
+
+    def checkpoint(self):
+        """Raise OptimizationCancelled if the run was asked to stop"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise OptimizationCancelled()
+
+    def mark(self, phase):
+        """Close the current phase under `phase` and start timing the next one"""
+        now = time.perf_counter()
+        self.timings[phase] = round(self.timings.get(phase, 0.0) + (now - self._last), 6)
+        self._last = now
+        if self.progress is not None and phase in PHASES:
+            self.progress(phase, round(100 * (PHASES.index(phase) + 1) / len(PHASES)))
+        if phase != PHASES[-1]:
+            self.checkpoint()
+
+    def as_dict(self):
+        timings = dict(self.timings)
+        timings['total'] = round(self._last - self._start, 6)
+        return timings
+
+
+def run_input_key(save_digest, optimizer_params, cursor):
+    """Everything a run's results depend on: the parsed save, the params and the outfit table"""
+    h = hashlib.sha256()
+    h.update(save_digest.encode("utf-8"))
+    h.update(json.dumps(optimizer_params or {}, sort_keys=True, default=str).encode("utf-8"))
+    for row in cursor.execute("SELECT * FROM Outfit"):
+        h.update(repr(row).encode("utf-8"))
+    return h.hexdigest()
+
+
+def record_cycle(vault_name, performance):
+    """Add a finished cycle's averages to the trend window and the performance history"""
+    cycle_averages = dict(
+        initial_avg=performance['initial_avg'],
+        before_balance_avg=performance['before_balance_avg'],
+        after_balance_avg=performance['after_balance_avg'],
+        with_outfits_avg=performance['with_outfits_avg']
+    )
+    # Running trend statistics first: a missing window is seeded from the history before this cycle
+    from AdaptiveVaultOptimizer import AdaptiveVaultOptimizer
+    AdaptiveVaultOptimizer(vault_name).observe_cycle(**cycle_averages)
+
+    from VaultPerformanceTracker import VaultPerformanceTracker
+    tracker = VaultPerformanceTracker(vault_name)
+    tracker.add_cycle_data(**cycle_averages)
+
+
+def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_config=None, plot_sink=None,
+        layout=None, changes=None, progress=None, cancel_event=None):
     def print_section(title, char="=", width=100):
         """Print a formatted section header"""
-        print(f"\n{char * width}")
-        print(f"{title.center(width)}")
-        print(f"{char * width}\n")
+        log.info("\n%s\n%s\n%s\n", char * width, title.center(width), char * width)
 
     def print_subsection(title, width=100):
         """Print a formatted subsection header"""
-        print(f"\n{'-' * width}")
-        print(f"  {title}")
-        print(f"{'-' * width}")
+        log.info("\n%s\n  %s\n%s", '-' * width, title, '-' * width)
     
+    # Callers on another thread pass progress / cancel_event; a set event stops the run with
+    # OptimizationCancelled at the next phase, pass, room or outfit checkpoint
+    phase_timer = PhaseTimer(progress, cancel_event)
+    # Per-room / per-dweller / per-swap detail is only built when DEBUG logging is on
+    verbose = log.isEnabledFor(logging.DEBUG)
+
     # ===== OUTFIT DATABASE CHECK =====
     print_section("OUTFIT DATABASE CHECK")
     outfit_manager = OutfitDatabaseManager()
@@ -198,19 +323,21 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
     missing_outfits = outfit_manager.check_missing_outfits(outfitlist)
     
     if missing_outfits:
-        print(f"⚠️  WARNING: Found {len(missing_outfits)} outfit(s) missing from database:")
+        log.warning("⚠️  WARNING: Found %d outfit(s) missing from database:", len(missing_outfits))
         for outfit_id in missing_outfits:
-            print(f"   - {outfit_id}")
-        print("\n❌ ERROR: Cannot continue optimization without complete outfit data.")
-        print("   The GUI will prompt you to enter missing outfit information.")
-        print("   Please complete the outfit entry dialogs to continue.\n")
+            log.warning("   - %s", outfit_id)
+        log.error("\n❌ ERROR: Cannot continue optimization without complete outfit data.\n"
+                  "   The GUI will prompt you to enter missing outfit information.\n"
+                  "   Please complete the outfit entry dialogs to continue.\n")
         
         return None
     else:
-        print(f"✓ All {len(outfitlist)} outfits found in database")
-        print("✓ Outfit check passed - continuing with optimization\n")
+        log.info("✓ All %d outfits found in database", len(outfitlist))
+        log.info("✓ Outfit check passed - continuing with optimization\n")
+    phase_timer.mark('outfit_check')
     
     # ===== INITIALIZE BALANCING CONFIG =====
+    explicit_config = balancing_config is not None
     if balancing_config is None:
         balancing_config = BalancingConfig(optimizer_params)
     
@@ -229,14 +356,34 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
     # --- Config / constants ----------------------------------------------------
     conn = sqlite3.connect("vault.db")
     cursor = conn.cursor()
+    results_file = f"{vault_name}_optimization_results.json"
 
-    downloads_folder = os.path.expanduser(r"~\Downloads")
-    file_path = os.path.join(downloads_folder, json_path)
+    # A save_diff.ChangeSet carries the decoded save, and its digest tells whether this exact save
+    # was already optimized with the same params and outfits - then the last results still hold
+    input_key = None
+    if changes is not None and not explicit_config:
+        input_key = run_input_key(changes.digest, optimizer_params, cursor)
+        try:
+            with open(results_file, "r") as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = None
+        if previous and previous.get('input_key') == input_key:
+            log.info("✓ Save, parameters and outfits unchanged - reusing %s", results_file)
+            record_cycle(vault_name, previous['performance'])
+            conn.close()
+            vault_log.flush()
+            return results_file
+
+    if changes is not None:
+        data = changes.data
+    else:
+        downloads_folder = os.path.expanduser(r"~\Downloads")
+        file_path = os.path.join(downloads_folder, json_path)
 
-    with open(file_path, "r", encoding="utf-8") as file:
-        data = json.load(file)
+        with open(file_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
 
-    vault_file = "vault_map.txt"
     dwellers_list = data["dwellers"]["dwellers"]
 
     ROOM_CODE_MAP = {
@@ -251,18 +398,6 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
         "NukaCola": ("NukaCola", ("Perception", "Agility"))  
     }
 
-    ROOM_STAT_MAP = {
-        "Geothermal": "Strength",
-        "Energy2": "Strength",
-        "WaterPlant": "Perception",
-        "Water2": "Perception",
-        "Cafeteria": "Agility",
-        "Hydroponic": "Agility",
-        "MedBay": "Intelligence",
-        "ScienceLab": "Intelligence",
-        "NukaCola": ("Perception", "Agility")
-    }
-
     ROOM_GROUPS = {
         "Power": ("Geothermal", "Energy2"),
         "Water": ("WaterPlant", "Water2", "NukaCola"),  
@@ -285,8 +420,8 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
     ROOM_CAPACITY = {"size3": 2, "size6": 4, "size9": 6}
 
     # --- Storage ---------------------------------------------------------------
+    # Room keys are (type, lvlX, sizeY, room_id) where room_id is the save's deserializeID
     initial_rooms = {}
-    _room_counts = defaultdict(int)
     Roomtables =  ["ConsumableRoom", "CraftingRoom", "Non_ProductionRoom", "ProductionRoom", "TrainingRoom" ]
 
     # --- Load ALL rooms for tracking (previous room assignments) ---------------
@@ -294,7 +429,7 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
     exclude = ["FakeWasteland","Elevator"]
     for t in Roomtables:
         cursor.execute(
-            f"SELECT dweller_id, RoomName, Row, Column, RoomLevel, MergeLevel FROM {t} WHERE RoomName NOT IN {tuple(exclude)}",
+            f"SELECT Room_id, dweller_id, RoomName, Row, Column, RoomLevel, MergeLevel FROM {t} WHERE RoomName NOT IN {tuple(exclude)}",
         )
         all_rooms.extend(cursor.fetchall())
     
@@ -315,30 +450,18 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
         return "size9"
 
     # Build initial_rooms from ALL rooms (for tracking previous assignments)
-    for dweller_ids, room_name, row, column, room_l, merge_l in all_rooms:
-        if room_name in ROOM_STAT_MAP:
-            dwellers = [x.strip() for x in str(dweller_ids).split(",") if x.strip()]
-
-            base_key = (room_name, _lvl_str(room_l), _size_str(merge_l))
-            _room_counts[base_key] += 1
-            room_number = str(_room_counts[base_key])
-            room_key = (base_key[0], base_key[1], base_key[2], room_number)
-            initial_rooms[room_key] = dwellers
-            
-        else:
-            dwellers = [x.strip() for x in str(dweller_ids).split(",") if x.strip()]
-            base_key = (room_name, _lvl_str(room_l), _size_str(merge_l))
-            _room_counts[base_key] += 1
-            room_number = str(_room_counts[base_key])
-            room_key = (base_key[0], base_key[1], base_key[2], room_number)
-            initial_rooms[room_key] = dwellers
+    for room_id, dweller_ids, room_name, row, column, room_l, merge_l in all_rooms:
+        dwellers = [x.strip() for x in str(dweller_ids).split(",") if x.strip()]
+        room_key = (room_name, _lvl_str(room_l), _size_str(merge_l), str(room_id))
+        initial_rooms[room_key] = dwellers
     
     print_section("INITIAL ROOMS AND ASSIGNED DWELLERS")
-    for key, dwellers in initial_rooms.items():
-        
-        print(f" - {key} -> Dwellers: {', '.join(dwellers)}")
+    if verbose:
+        for key, dwellers in initial_rooms.items():
+            log.debug(" - %s -> Dwellers: %s", key, ', '.join(dwellers))
+    phase_timer.mark('load')
 
-    # --- Parse vault_map.txt into room lists -----------------------------------
+    # --- Build room lists from the structured vault layout ---------------------
     geothermal = []
     waterPlant = []
     cafeteria = []
@@ -348,126 +471,44 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
     dojo = []
     classroom = []
 
-    try:
-        with open(vault_file, "r", encoding="utf-8") as f:
-            for line in f:
-                parts = line.strip().split(" | ")
-                for room in parts:
-                    if room == "Empty":
-                        continue
-
-                    if "MergeLevel: 3" in room:
-                        size_s = "size9"
-                    elif "MergeLevel: 2" in room:
-                        size_s = "size6"
-                    else:
-                        size_s = "size3"
-
-                    if "level= 3" in room:
-                        lvl = 3
-                    elif "level= 2" in room:
-                        lvl = 2
-                    else:
-                        lvl = 1
-
-                    code = None
-                    if "NukaCola" in room:
-                        code = "NukaCola"
-                    elif "Energy2" in room:
-                        code = "Energy2"
-                    elif "Water2" in room:
-                        code = "Water2"
-                    elif "Hydroponic" in room:
-                        code = "Hydroponic"
-                    elif "Geothermal" in room:
-                        code = "Geothermal"
-                    elif "WaterPlant" in room:
-                        code = "WaterPlant"
-                    elif "Cafeteria" in room:
-                        code = "Cafeteria"
-                    elif "MedBay" in room:
-                        code = "MedBay"
-                    elif "ScienceLab" in room:
-                        code = "ScienceLab"
-                    elif "Gym" in room:
-                        code = "Gym"
-                    elif "Armory" in room:
-                        code = "Armory"
-                    elif "Dojo" in room:
-                        code = "Dojo"
-                    elif "Classroom" in room:
-                        code = "Classroom"
-
-                    if not code:
-                        continue
+    room_lists_by_code = {
+        "Geothermal": geothermal, "Energy2": geothermal,
+        "WaterPlant": waterPlant, "Water2": waterPlant, "NukaCola": waterPlant,
+        "Cafeteria": cafeteria, "Hydroponic": cafeteria,
+        "MedBay": meds, "ScienceLab": meds,
+        "Gym": gym, "Armory": armory, "Dojo": dojo, "Classroom": classroom,
+    }
 
-                    room_tuple = (code, f"lvl{lvl}", size_s, "1")
-
-                    if code in ("Energy2", "Geothermal"):
-                        geothermal.append(room_tuple)
-                    elif code in ("WaterPlant", "Water2", "NukaCola"):
-                        waterPlant.append(room_tuple)
-                    elif code in ("Cafeteria", "Hydroponic"):
-                        cafeteria.append(room_tuple)
-                    elif code in ("MedBay", "ScienceLab"):
-                        meds.append(room_tuple)
-                    elif code == "Gym":
-                        gym.append(room_tuple)
-                    elif code == "Armory":
-                        armory.append(room_tuple)
-                    elif code == "Dojo":
-                        dojo.append(room_tuple)
-                    elif code == "Classroom":
-                        classroom.append(room_tuple)
-    except FileNotFoundError:
-        print(f"{vault_file} not found.")
-    except Exception as e:
-        print(f"An error occurred: {e}")
-
-    # --- Normalize room lists: remove repeated tiles after merged rooms -------
-    def compact_room_list(lst):
-        out = []
-        i = 0
-        while i < len(lst):
-            out.append(lst[i])
-            size = lst[i][2]
-            if size == "size9":
-                i += 9
-            elif size == "size6":
-                i += 6
-            else:
-                i += 3
-        return out
-
-    RoomLists = [compact_room_list(geothermal), compact_room_list(waterPlant), 
-                 compact_room_list(cafeteria), compact_room_list(meds)]
-
-    def number_duplicates(lst):
-        counts = defaultdict(int)
-        out = []
-        for tup in lst:
-            base = (tup[0], tup[1], tup[2])
-            counts[base] += 1
-            out.append((base[0], base[1], base[2], str(counts[base])))
-        return out
-
-    geothermal = number_duplicates(RoomLists[0])
-    waterPlant = number_duplicates(RoomLists[1])
-    cafeteria = number_duplicates(RoomLists[2])
-    meds = number_duplicates(RoomLists[3])
+    if layout is None:
+        try:
+            layout = vault_layout.VaultLayout.load()
+        except FileNotFoundError:
+            log.error("%s not found.", vault_layout.LAYOUT_FILE)
+            layout = vault_layout.VaultLayout()
+    layout = vault_layout.VaultLayout.coerce(layout)
+
+    # layout is in grid scan order; the room id ties each entry to the same room in initial_rooms
+    for room in layout:
+        room_list = room_lists_by_code.get(room["type"])
+        if room_list is None:
+            continue
+        room_list.append(vault_layout.room_key(room))
 
     total_rooms = len(geothermal) + len(waterPlant) + len(cafeteria) + len(meds)
     is_small_vault = total_rooms < 10
 
     if is_small_vault:
-        print("\n🏠 Small vault detected - using conservative optimization")
+        log.info("\n🏠 Small vault detected - using conservative optimization")
         balancing_config.balance_threshold = 10.0
         balancing_config.max_passes = 5
+    phase_timer.mark('map_parse')
     
     # --- Read ALL dweller stats and build complete lookup ----------------------
     Stats = {}
     dweller_stats = {}
     dweller_stats_initial = {}
+    # Base value and Exp of each stat (outfits do not count for training)
+    training_progress = {}
     numDwellers = 0
     total_happiness = 0
 
@@ -478,10 +519,12 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
         serialize_id = d.get("serializeId")
         happiness = d.get("happiness", {}).get("happinessValue", 0)
         numDwellers += 1
+        if numDwellers % 50 == 0:
+            phase_timer.checkpoint()
         total_happiness += happiness
 
         cursor.execute(
-            "SELECT dweller_id, StatName, Value, Mod FROM Stats WHERE dweller_id = ?",
+            "SELECT dweller_id, StatName, Value, Mod, Exp FROM Stats WHERE dweller_id = ?",
             (serialize_id,)
         )
         allStats = cursor.fetchall()
@@ -490,9 +533,11 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
         # Build complete stat maps with ALL stats
         stat_map_initial = {}
         stat_map = {}
+        progress = {}
         
-        for _dwid, statname, value, mod in allStats:
+        for _dwid, statname, value, mod, exp in allStats:
             stat_map_initial[statname] = value
+            progress[statname] = (value, exp or 0)
             # For current working stats, include modifier if it exists
             stat_map[statname] = value + (mod if mod is not None else 0)
         
@@ -505,10 +550,11 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
         
         dweller_stats[str(serialize_id)] = stat_map
         dweller_stats_initial[str(serialize_id)] = stat_map_initial
+        training_progress[str(serialize_id)] = progress
         
 
     vault_happiness = round(total_happiness / numDwellers) if numDwellers > 0 else 0
-    print(f"\nVault Average Happiness: {vault_happiness}%\n")
+    log.info("\nVault Average Happiness: %s%%\n", vault_happiness)
 
     # --- Load existing outfit assignments and apply bonuses to initial stats ---
     print_section("LOADING EXISTING OUTFIT ASSIGNMENTS")
@@ -537,7 +583,7 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
             'sex': sex
         }
 
-    print(f"Found {len(existing_outfits)} existing outfit assignments")
+    log.info("Found %d existing outfit assignments", len(existing_outfits))
     
     # Apply existing outfit bonuses to initial stats
     for dweller_id, outfit_id in existing_outfits:
@@ -555,121 +601,55 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
             dweller_stats_initial[dweller_id_str]['Charisma'] += outfit['c']
             dweller_stats_initial[dweller_id_str]['Luck'] += outfit['l']
             
-            print(f"  Dweller {dweller_id}: {outfit['name']} (S+{outfit['s']} P+{outfit['p']} "
-                  f"E+{outfit['e']} C+{outfit['c']} I+{outfit['i']} A+{outfit['a']} L+{outfit['l']})")
-
-    # --- Build best/second/worst lists efficiently -----------------------------
-    bestGeo = []
-    bestWaP = []
-    bestCaf = []
-    bestMed = []
-    secbestGeo = []
-    secbestWaP = []
-    secbestCaf = []
-    secbestMed = []
-    worstGeo = []
-    worstWaP = []
-    worstCaf = []
-    worstMed = []
-
-    for serialize_id, stats in dweller_stats_initial.items():
-        values = {k: v for k, v in stats.items() if k in ("Strength", "Perception", "Agility", "Intelligence")}
-        if not values:
-            continue
-
-        sorted_stats = sorted(values.items(), key=lambda kv: kv[1], reverse=True)
-        highest_stat, highest_val = sorted_stats[0]
-        second = sorted_stats[1] if len(sorted_stats) > 1 else (None, -1)
-        second_stat, second_val = second
-        lowest_stat, lowest_val = min(values.items(), key=lambda kv: kv[1])
-
-        if highest_stat == "Strength":
-            bestGeo.append(f"{serialize_id} - {highest_val}")
-        elif highest_stat == "Perception":
-            bestWaP.append(f"{serialize_id} - {highest_val}")
-        elif highest_stat == "Agility":
-            bestCaf.append(f"{serialize_id} - {highest_val}")
-        elif highest_stat == "Intelligence":
-            bestMed.append(f"{serialize_id} - {highest_val}")
-
-        if second_stat == "Strength":
-            secbestGeo.append(f"{serialize_id} - {second_val}")
-        elif second_stat == "Perception":
-            secbestWaP.append(f"{serialize_id} - {second_val}")
-        elif second_stat == "Agility":
-            secbestCaf.append(f"{serialize_id} - {second_val}")
-        elif second_stat == "Intelligence":
-            secbestMed.append(f"{serialize_id} - {second_val}")
-
-        if lowest_stat == "Strength":
-            worstGeo.append(f"{serialize_id} - {lowest_val}")
-        elif lowest_stat == "Perception":
-            worstWaP.append(f"{serialize_id} - {lowest_val}")
-        elif lowest_stat == "Agility":
-            worstCaf.append(f"{serialize_id} - {lowest_val}")
-        elif lowest_stat == "Intelligence":
-            worstMed.append(f"{serialize_id} - {lowest_val}")
-
-    # sort lists
-    bestGeo.sort(key=lambda s: int(s.split(" - ")[1]), reverse=True)
-    bestWaP.sort(key=lambda s: int(s.split(" - ")[1]), reverse=True)
-    bestCaf.sort(key=lambda s: int(s.split(" - ")[1]), reverse=True)
-    bestMed.sort(key=lambda s: int(s.split(" - ")[1]), reverse=True)
-    secbestGeo.sort(key=lambda s: int(s.split(" - ")[1]))
-    secbestWaP.sort(key=lambda s: int(s.split(" - ")[1]))
-    secbestCaf.sort(key=lambda s: int(s.split(" - ")[1]))
-    secbestMed.sort(key=lambda s: int(s.split(" - ")[1]))
-    worstGeo.sort(key=lambda s: int(s.split(" - ")[1]))
-    worstWaP.sort(key=lambda s: int(s.split(" - ")[1]))
-    worstCaf.sort(key=lambda s: int(s.split(" - ")[1]))
-    worstMed.sort(key=lambda s: int(s.split(" - ")[1]))
-
-    # --- Helper utility functions ----------------------------------------------
-    def extract_ids(data):
-        return [x.split(" - ")[0].strip() for x in data]
-
-    def get_unassignedID(*lists):
-        return [item for sub in lists for item in sub]
-
-    def get_unassigned_stat(stats_list, allowed_ids):
-        allowed = set(allowed_ids)
-        stats_list[:] = [s for s in stats_list if s.split(" - ")[0].strip() in allowed]
-
+            if verbose:
+                log.debug("  Dweller %s: %s (S+%s P+%s E+%s C+%s I+%s A+%s L+%s)", dweller_id, outfit['name'],
+                          outfit['s'], outfit['p'], outfit['e'], outfit['c'], outfit['i'], outfit['a'], outfit['l'])
+
+
+    phase_timer.mark('stats')
+
+    # --- Stat matrix and best / second / worst buckets -------------------------
+    # Columns follow the order the stats are stored in, so ties break the same way
+    # as before (the first of equal stats wins).
+    PLACEMENT_STATS = ("Strength", "Perception", "Intelligence", "Agility")
+    dweller_ids = list(dweller_stats_initial)
+    stat_matrix = np.array(
+        [[dweller_stats_initial[d].get(stat, 0) for stat in PLACEMENT_STATS] for d in dweller_ids],
+        dtype=np.int32,
+    ).reshape(len(dweller_ids), len(PLACEMENT_STATS))
+
+    # Per dweller: column of the highest, second highest and lowest stat
+    stat_rank = np.argsort(-stat_matrix, axis=1, kind="stable")
+    best_col = stat_rank[:, 0]
+    second_col = stat_rank[:, 1]
+    worst_col = np.argmin(stat_matrix, axis=1)
+
+    def stat_bucket(rank_col, column, descending=False, min_value=None):
+        """Dweller indices whose ranked stat is `column`, ordered by that stat's value (stable on ties)"""
+        members = np.flatnonzero(rank_col == column)
+        values = stat_matrix[members, column]
+        if min_value:
+            keep = values >= min_value
+            members, values = members[keep], values[keep]
+        order = np.argsort(-values if descending else values, kind="stable")
+        return members[order]
+
+    # Each dweller is placed at most once; earlier rounds win
+    placed = np.zeros(len(dweller_ids), dtype=bool)
     sortedL = defaultdict(list)
 
-    def assign_rooms(rooms, dwellers):
-        size_map = {"size9": 6, "size6": 4, "size3": 2}
-        for room in rooms:
-            size = room[2]
-            limit = size_map.get(size, 0)
-            assigned_now = len(sortedL[room])
-            take = limit - assigned_now
-            if take > 0 and dwellers:
-                to_assign = dwellers[:take]
-                del dwellers[:take]
-                sortedL[room].extend(to_assign)
-
-    # --- Assign dwellers to production rooms (using INITIAL stats with outfits) ---
-    geo_dwellers = extract_ids(bestGeo)
-    caf_dwellers = extract_ids(bestCaf)
-    wap_dwellers = extract_ids(bestWaP)
-    med_dwellers = extract_ids(bestMed)
-
-    if MIN_STAT_THRESHOLD > 0:
-        geo_dwellers = [d for d in geo_dwellers if dweller_stats_initial.get(d, {}).get('Strength', 0) >= MIN_STAT_THRESHOLD]
-        wap_dwellers = [d for d in wap_dwellers if dweller_stats_initial.get(d, {}).get('Perception', 0) >= MIN_STAT_THRESHOLD]
-        caf_dwellers = [d for d in caf_dwellers if dweller_stats_initial.get(d, {}).get('Agility', 0) >= MIN_STAT_THRESHOLD]
-        med_dwellers = [d for d in med_dwellers if dweller_stats_initial.get(d, {}).get('Intelligence', 0) >= MIN_STAT_THRESHOLD]
-
-    sec_geo_dwellers = extract_ids(secbestGeo)
-    sec_caf_dwellers = extract_ids(secbestCaf)
-    sec_wap_dwellers = extract_ids(secbestWaP)
-    sec_med_dwellers = extract_ids(secbestMed)
-
-    thi_geo_dwellers = extract_ids(worstGeo)
-    thi_caf_dwellers = extract_ids(worstCaf)
-    thi_wap_dwellers = extract_ids(worstWaP)
-    thi_med_dwellers = extract_ids(worstMed)
+    def assign_rooms(rooms, candidates):
+        """Fill rooms in order with the not-yet-placed candidates, up to each room's free capacity"""
+        free = candidates[~placed[candidates]]
+        room_free = np.array([ROOM_CAPACITY.get(room[2], 0) - len(sortedL[room]) for room in rooms], dtype=np.int64)
+        ends = np.cumsum(np.maximum(room_free, 0))
+        starts = ends - np.maximum(room_free, 0)
+        for room, start, end in zip(rooms, starts, ends):
+            chosen = free[start:end]
+            if chosen.size:
+                sortedL[room].extend(dweller_ids[i] for i in chosen)
+        if len(ends):
+            placed[free[:ends[-1]]] = True
 
     # Room priority scoring
     def room_priority_score(room_tuple):
@@ -685,92 +665,72 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
     cafeteria_sorted = sorted(cafeteria, key=room_priority_score, reverse=True)
     meds_sorted = sorted(meds, key=room_priority_score, reverse=True)
 
-    print("\n🎯 ROOM ASSIGNMENT PRIORITY ORDER:")
-    print(f"Power rooms: {[f'{r[0]} {r[1]} {r[2]}' for r in geothermal_sorted]}")
-    print(f"Water rooms: {[f'{r[0]} {r[1]} {r[2]}' for r in waterPlant_sorted]}")
-    print(f"Food rooms: {[f'{r[0]} {r[1]} {r[2]}' for r in cafeteria_sorted]}")
-    print(f"Med rooms: {[f'{r[0]} {r[1]} {r[2]}' for r in meds_sorted]}\n")
-
-    # Round 1
-    assign_rooms(geothermal_sorted, geo_dwellers)
-    assign_rooms(waterPlant_sorted, wap_dwellers)
-    assign_rooms(cafeteria_sorted, caf_dwellers)
-    assign_rooms(meds_sorted, med_dwellers)
-
-    # Round 2
-    secRdwellers = get_unassignedID(sec_geo_dwellers, sec_caf_dwellers, sec_wap_dwellers, sec_med_dwellers)
-    get_unassigned_stat(secbestGeo, secRdwellers)
-    get_unassigned_stat(secbestCaf, secRdwellers)
-    get_unassigned_stat(secbestWaP, secRdwellers)
-    get_unassigned_stat(secbestMed, secRdwellers)
-    assign_rooms(geothermal, sec_geo_dwellers)
-    assign_rooms(waterPlant, sec_wap_dwellers)
-    assign_rooms(cafeteria, sec_caf_dwellers)
-    assign_rooms(meds, sec_med_dwellers)
-
-    # Round 3
-    thiRdwellers = get_unassignedID(thi_geo_dwellers, thi_caf_dwellers, thi_wap_dwellers, thi_med_dwellers)
-    get_unassigned_stat(worstGeo, thiRdwellers)
-    get_unassigned_stat(worstCaf, thiRdwellers)
-    get_unassigned_stat(worstWaP, thiRdwellers)
-    get_unassigned_stat(worstMed, thiRdwellers)
-    assign_rooms(geothermal, thi_geo_dwellers)
-    assign_rooms(waterPlant, thi_wap_dwellers)
-    assign_rooms(cafeteria, thi_caf_dwellers)
-    assign_rooms(meds, thi_med_dwellers)
-
-    leftOver = get_unassignedID(thi_geo_dwellers, thi_caf_dwellers, thi_wap_dwellers, thi_med_dwellers)
-
-    print("")
-    for room, dwellers in sortedL.items():
-        print(f"Room: {room} -> Dwellers: {', '.join(dwellers)}")
-    print("")
+    if verbose:
+        log.debug("\n🎯 ROOM ASSIGNMENT PRIORITY ORDER:")
+        log.debug("Power rooms: %s", [f'{r[0]} {r[1]} {r[2]}' for r in geothermal_sorted])
+        log.debug("Water rooms: %s", [f'{r[0]} {r[1]} {r[2]}' for r in waterPlant_sorted])
+        log.debug("Food rooms: %s", [f'{r[0]} {r[1]} {r[2]}' for r in cafeteria_sorted])
+        log.debug("Med rooms: %s\n", [f'{r[0]} {r[1]} {r[2]}' for r in meds_sorted])
+
+    # Production rooms and the training room for each placement stat
+    production_by_stat = {
+        "Strength": (geothermal_sorted, geothermal),
+        "Perception": (waterPlant_sorted, waterPlant),
+        "Agility": (cafeteria_sorted, cafeteria),
+        "Intelligence": (meds_sorted, meds),
+    }
+    training_by_stat = {"Strength": gym, "Agility": dojo, "Perception": armory, "Intelligence": classroom}
+    # Assignment order used by every round (power, water, food, medbay)
+    round_order = ("Strength", "Perception", "Agility", "Intelligence")
+    col_of = {stat: PLACEMENT_STATS.index(stat) for stat in round_order}
+
+    # Round 1: best stat, strongest first, into rooms by priority (MIN_STAT_THRESHOLD applies here)
+    for stat in round_order:
+        assign_rooms(production_by_stat[stat][0],
+                     stat_bucket(best_col, col_of[stat], descending=True, min_value=MIN_STAT_THRESHOLD))
+
+    # Round 2: second best stat of whoever is still unplaced
+    for stat in round_order:
+        assign_rooms(production_by_stat[stat][1], stat_bucket(second_col, col_of[stat]))
+
+    # Round 3: lowest stat
+    for stat in round_order:
+        assign_rooms(production_by_stat[stat][1], stat_bucket(worst_col, col_of[stat]))
+
+    if verbose:
+        for room, dwellers in sortedL.items():
+            log.debug("Room: %s -> Dwellers: %s", room, ', '.join(dwellers))
 
     # --- Training assignments ---------------------------------------------------
-    get_unassigned_stat(worstGeo, leftOver)
-    get_unassigned_stat(worstCaf, leftOver)
-    get_unassigned_stat(worstWaP, leftOver)
-    get_unassigned_stat(worstMed, leftOver)
-
-    for lst in (worstGeo, worstCaf, worstWaP, worstMed):
-        lst.sort(key=lambda x: int(x.split(" - ")[1]))
-
-    assign_rooms(gym, extract_ids(worstGeo))
-    assign_rooms(dojo, extract_ids(worstCaf))
-    assign_rooms(armory, extract_ids(worstWaP))
-    assign_rooms(classroom, extract_ids(worstMed))
-
-    get_unassigned_stat(secbestGeo, leftOver)
-    get_unassigned_stat(secbestCaf, leftOver)
-    get_unassigned_stat(secbestWaP, leftOver)
-    get_unassigned_stat(secbestMed, leftOver)
-
-    for lst in (secbestGeo, secbestCaf, secbestWaP, secbestMed):
-        lst.sort(key=lambda x: int(x.split(" - ")[1]))
-
-    assign_rooms(gym, extract_ids(secbestGeo))
-    assign_rooms(dojo, extract_ids(secbestCaf))
-    assign_rooms(armory, extract_ids(secbestWaP))
-    assign_rooms(classroom, extract_ids(secbestMed))
-
-    get_unassigned_stat(bestGeo, leftOver)
-    get_unassigned_stat(bestCaf, leftOver)
-    get_unassigned_stat(bestWaP, leftOver)
-    get_unassigned_stat(bestMed, leftOver)
-
-    for lst in (bestGeo, bestCaf, bestWaP, bestMed):
-        lst.sort(key=lambda x: int(x.split(" - ")[1]))
-
-    assign_rooms(gym, extract_ids(bestGeo))
-    assign_rooms(dojo, extract_ids(bestCaf))
-    assign_rooms(armory, extract_ids(bestWaP))
-    assign_rooms(classroom, extract_ids(bestMed))
-
-    print("\nTraining Rooms:")
-    for room, dwellers in sortedL.items():
-        if room[0] in ("Gym", "Armory", "Dojo", "Classroom"):
-            print(f"Room: {room} -> Dwellers: {', '.join(dwellers)}")
-    print("")
+    training_order = ("Strength", "Agility", "Perception", "Intelligence")
+    if balancing_config.training_allocation == 'time':
+        # Leftover dwellers go where the vault's summed time to everyone's next point is smallest
+        training_rooms = [room for stat in training_order for room in training_by_stat[stat]]
+        leftovers = np.flatnonzero(~placed)
+        trainee_stats = np.array(
+            [[training_progress[dweller_ids[i]].get(stat, (0, 0)) for stat in training_allocator.TRAINING_STATS]
+             for i in leftovers],
+            dtype=np.float64,
+        ).reshape(len(leftovers), len(training_allocator.TRAINING_STATS), 2)
+        pairs, training_seconds = training_allocator.allocate(
+            training_rooms, [ROOM_CAPACITY.get(room[2], 0) - len(sortedL[room]) for room in training_rooms],
+            trainee_stats[:, :, 0], trainee_stats[:, :, 1])
+        for i, room_index in pairs:
+            sortedL[training_rooms[room_index]].append(dweller_ids[leftovers[i]])
+            placed[leftovers[i]] = True
+        log.info("Training: %d dweller(s) placed, %.1f hours to their next points in total",
+                 len(pairs), training_seconds / 3600)
+    else:
+        # Leftover dwellers train their weakest stat first, then second best, then best
+        for rank_col in (worst_col, second_col, best_col):
+            for stat in training_order:
+                assign_rooms(training_by_stat[stat], stat_bucket(rank_col, col_of[stat]))
+
+    if verbose:
+        log.debug("\nTraining Rooms:")
+        for room, dwellers in sortedL.items():
+            if room[0] in ("Gym", "Armory", "Dojo", "Classroom"):
+                log.debug("Room: %s -> Dwellers: %s", room, ', '.join(dwellers))
 
     allDwellerIDs = {str(d["serializeId"]) for d in dwellers_list}
     assigned = set()
@@ -778,8 +738,10 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
         assigned.update(dwellers)
     finalRemaining = list(allDwellerIDs - assigned)
 
-    print("\nFinal Unassigned Dwellers:")
-    print(", ".join(finalRemaining))
+    log.info("\nFinal Unassigned Dwellers: %d", len(finalRemaining))
+    if verbose:
+        log.debug(", ".join(finalRemaining))
+    phase_timer.mark('initial_assignment')
 
     # --- Production time helpers (CORRECTED FORMULA) ----------------------------
     TRAINING_ROOMS = {"Armory", "Dojo", "Gym", "Classroom"}
@@ -804,8 +766,6 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
         if room_type is None or not dwellers:
             return None
 
-        pool = BASE_POOL[room_type] * SIZE_MULTIPLIER[size]
-        
         # Handle dual-stat rooms (like NukaCola)
         if isinstance(stat, tuple):
             # For dual-stat rooms, use the average of both stats
@@ -818,15 +778,27 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
             # Single-stat rooms
             total_stat = sum(dweller_stats.get(d, {}).get(stat, 0) for d in dwellers)
 
-        if total_stat == 0:
+        return production_time_for_total(room_key, total_stat, happiness)
+
+    def production_time_for_total(room_key, total_stat, happiness=1.0):
+        """Production time of a room whose summed relevant stat is total_stat (same rounding as above)"""
+        room_type, stat, size = parse_room(room_key)
+        if room_type is None or total_stat == 0:
             return None
 
-       
+        pool = BASE_POOL[room_type] * SIZE_MULTIPLIER[size]
         rounded_percent = (happiness/100)
         production_time = pool / (total_stat * (1 + rounded_percent))
 
         return round(production_time, 1)
 
+    def stat_value(dweller_id, stat):
+        """A dweller's relevant stat for a room (average of both stats for dual-stat rooms)"""
+        d_stats = working_stats.get(dweller_id, {})
+        if isinstance(stat, tuple):
+            return (d_stats.get(stat[0], 0) + d_stats.get(stat[1], 0)) / 2
+        return d_stats.get(stat, 0)
+
     def recalc_mean_finder(stats_dict, sortList, happiness_value):
         result = {}
         for room_key, dwellers in sortList.items():
@@ -835,6 +807,67 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
                 result[room_key] = t
         return result
 
+    def update_room_time(mean_map, room_key, stats_dict, sortList, happiness_value):
+        """Recompute one room's time in place, dropping it like recalc_mean_finder would"""
+        t = get_room_production_time(room_key, sortList[room_key], stats_dict, happiness=happiness_value)
+        if t:
+            mean_map[room_key] = t
+        else:
+            mean_map.pop(room_key, None)
+        return t
+
+    # Groups as group_means averages them (NukaCola counts towards Water and Food)
+    BOUND_GROUPS = {
+        'Power': ("Geothermal", "Energy2"),
+        'Water': ("WaterPlant", "Water2", "NukaCola"),
+        'Food': ("Cafeteria", "Hydroponic", "NukaCola"),
+        'Medbay': ("MedBay", "ScienceLab"),
+        'NukaCola': ("NukaCola",),
+    }
+
+    def stat_of(stat_map, stat):
+        if isinstance(stat, tuple):
+            return (stat_map.get(stat[0], 0) + stat_map.get(stat[1], 0)) / 2
+        return stat_map.get(stat, 0)
+
+    def group_bounds(rooms, dwellers, stats_dict, bonus_maps=()):
+        """
+        Lower bound on each group's average time (production_bound.group_bound) for these rooms,
+        the dwellers that can staff them and, optionally, the outfit bonuses that could be handed out.
+        """
+        time_scale = 1 + happiness_decimal / 100
+        bounds = {}
+        for group, codes in BOUND_GROUPS.items():
+            group_rooms = [r for r in rooms if r[0] in codes]
+            if not group_rooms:
+                continue
+            stats = {parse_room(r)[1] for r in group_rooms}
+            values = [max(stat_of(stats_dict.get(d, {}), s) for s in stats) for d in dwellers]
+            bonuses = [max(stat_of(b, s) for s in stats) for b in bonus_maps]
+            pools = [BASE_POOL[parse_room(r)[0]] * SIZE_MULTIPLIER[r[2]] for r in group_rooms]
+            slots = [ROOM_CAPACITY.get(r[2], 0) for r in group_rooms]
+            bounds[group] = production_bound.group_bound(pools, slots, values, time_scale, bonuses)
+        return bounds
+
+    def group_average(mean_map, group):
+        times = [t for r, t in mean_map.items() if r[0] in BOUND_GROUPS[group]]
+        return (sum(times) / len(times)) if times else None
+
+    def near_optimal(mean_map, bounds):
+        """True when BOUND_EPSILON is set and every group average is within it of its bound"""
+        epsilon = balancing_config.bound_epsilon
+        if epsilon is None or not bounds:
+            return False
+        checked = False
+        for group, bound in bounds.items():
+            current = group_average(mean_map, group)
+            if bound is None or current is None:
+                continue
+            if current - bound > epsilon:
+                return False
+            checked = True
+        return checked
+
     def calculate_overall_average(mean_map):
         times = [t for r, t in mean_map.items() if r[0] not in TRAINING_ROOMS]
         return round(sum(times) / len(times), 2) if times else 0
@@ -856,42 +889,42 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
     # --- Calculate initial times (with existing outfits applied) ---------------
     happiness_decimal = vault_happiness / 100
     
-    print("\nTIME BEFORE ANY CHANGES (INITIAL STATE - WITH EXISTING OUTFITS)")
     initial_mean_finder = recalc_mean_finder(dweller_stats_initial, initial_rooms, happiness_decimal)
     
-    for room_key, t in initial_mean_finder.items():
-        room_type, stat, size = parse_room(room_key)
-        dwellers = initial_rooms[room_key]
-        total_stat = sum(dweller_stats_initial.get(d, {}).get(stat, 0) for d in dwellers)
-        print(f"{room_key} -> {t}s ({stat}:{total_stat})")
+    if verbose:
+        log.debug("\nTIME BEFORE ANY CHANGES (INITIAL STATE - WITH EXISTING OUTFITS)")
+        for room_key, t in initial_mean_finder.items():
+            room_type, stat, size = parse_room(room_key)
+            dwellers = initial_rooms[room_key]
+            total_stat = sum(dweller_stats_initial.get(d, {}).get(stat, 0) for d in dwellers)
+            log.debug("%s -> %ss (%s:%s)", room_key, t, stat, total_stat)
 
-    print("\nTIME AFTER INITIAL ASSIGNMENT (BEFORE BALANCING - WITH EXISTING OUTFITS)")
     before_balancing_times = recalc_mean_finder(dweller_stats_initial, sortedL, happiness_decimal)
     
-    for room_key, t in before_balancing_times.items():
-        print(f"{room_key} -> {t} seconds")
+    if verbose:
+        log.debug("\nTIME AFTER INITIAL ASSIGNMENT (BEFORE BALANCING - WITH EXISTING OUTFITS)")
+        for room_key, t in before_balancing_times.items():
+            log.debug("%s -> %s seconds", room_key, t)
 
     geo_mean, wap_mean, caf_mean, med_mean, nuka_mean = group_means(before_balancing_times)
 
     if geo_mean is not None:
-        print(f"\nGeothermal Average Time: {round(geo_mean,1)} seconds")
+        log.info("\nGeothermal Average Time: %s seconds", round(geo_mean,1))
     if wap_mean is not None:
-        print(f"Water Plant Average Time: {round(wap_mean,1)} seconds")
+        log.info("Water Plant Average Time: %s seconds", round(wap_mean,1))
     if caf_mean is not None:
-        print(f"Cafeteria Average Time: {round(caf_mean,1)} seconds")
+        log.info("Cafeteria Average Time: %s seconds", round(caf_mean,1))
     if med_mean is not None:
-        print(f"Medbay Average Time: {round(med_mean,1)} seconds")
+        log.info("Medbay Average Time: %s seconds", round(med_mean,1))
     if nuka_mean is not None:
-        print(f"NukaCola Average Time: {round(nuka_mean,1)} seconds")
+        log.info("NukaCola Average Time: %s seconds", round(nuka_mean,1))
 
     initial_overall_avg = calculate_overall_average(initial_mean_finder)
     before_balance_overall_avg = calculate_overall_average(before_balancing_times)
 
-    print(f"\n{'='*60}")
-    print("PERFORMANCE COMPARISON")
-    print(f"{'='*60}")
-    print(f"Initial Average Time: {initial_overall_avg}s")
-    print(f"Before Balancing Average Time: {before_balance_overall_avg}s")
+    log.info("\n%s\nPERFORMANCE COMPARISON\n%s", '='*60, '='*60)
+    log.info("Initial Average Time: %ss", initial_overall_avg)
+    log.info("Before Balancing Average Time: %ss", before_balance_overall_avg)
 
 
     working_stats = dweller_stats_initial.copy()
@@ -906,52 +939,209 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
     reference_baseline = balancing_config.reference_baseline
     
     if reference_baseline == 'before_balancing':
-        print(f"\nℹ️  Reference Baseline Setting: BEFORE BALANCING (user-forced)")
-        print(f"    Using BEFORE BALANCING state as baseline for balancing process")
+        log.info("\nℹ️  Reference Baseline Setting: BEFORE BALANCING (user-forced)")
+        log.info("    Using BEFORE BALANCING state as baseline for balancing process")
         outfit_owner_beforeswap = {d: get_outfit_bonus(d) for dwellers in sortedL.values() for d in dwellers}
     elif reference_baseline == 'initial':
-        print(f"\nℹ️  Reference Baseline Setting: INITIAL STATE (user-forced)")
-        print(f"    Using INITIAL state as baseline for balancing process")
+        log.info("\nℹ️  Reference Baseline Setting: INITIAL STATE (user-forced)")
+        log.info("    Using INITIAL state as baseline for balancing process")
         sortedL.clear()
         for room_key, dwellers in initial_rooms.items():
             sortedL[room_key] = dwellers.copy()
             outfit_owner_beforeswap.update({d: get_outfit_bonus(d) for d in dwellers})
-        print(f"    ✓ Balancing will optimize from initial state")
+        log.info("    ✓ Balancing will optimize from initial state")
     else:
-        print(f"\nℹ️ AUTO")
+        log.info("\nℹ️ AUTO")
         if initial_overall_avg > 0 and initial_overall_avg < before_balance_overall_avg:
-            print(f"    ⚠️  Initial assignment ({initial_overall_avg}s) is BETTER than before balancing ({before_balance_overall_avg}s)")
-            print(f"    Using INITIAL state as baseline for balancing process")
+            log.info("    ⚠️  Initial assignment (%ss) is BETTER than before balancing (%ss)",
+                     initial_overall_avg, before_balance_overall_avg)
+            log.info("    Using INITIAL state as baseline for balancing process")
             sortedL.clear()
             for room_key, dwellers in initial_rooms.items():
                 sortedL[room_key] = dwellers.copy()
                 outfit_owner_beforeswap.update({d: get_outfit_bonus(d) for d in dwellers})
 
-            print(f"    ✓ Balancing will optimize from initial state")
+            log.info("    ✓ Balancing will optimize from initial state")
         else:
-            print(f"    ✓ Before balancing ({before_balance_overall_avg}s) is better than or equal to initial ({initial_overall_avg}s)")
-            print(f"    Using BEFORE BALANCING state as baseline")
+            log.info("    ✓ Before balancing (%ss) is better than or equal to initial (%ss)",
+                     before_balance_overall_avg, initial_overall_avg)
+            log.info("    Using BEFORE BALANCING state as baseline")
             outfit_owner_beforeswap = {d: get_outfit_bonus(d) for dwellers in sortedL.values() for d in dwellers}
 
+    phase_timer.mark('baseline')
+
     # --- ENHANCED CROSS-STAT BALANCING WITH DETAILED LOGGING -------------------
     print_section("CROSS-STAT BALANCING WITH PRIORITY-BASED OPTIMIZATION")
     
     swap_logger = SwapLogger(vault_happiness)
     
-    print(f"Balancing Configuration:")
-    print(f"  Balance Threshold: {balancing_config.balance_threshold}s")
-    print(f"  Max Passes: {balancing_config.max_passes}")
-    print(f"  Cross-Stat Balancing: {'Enabled' if balancing_config.enable_cross_stat_balancing else 'Disabled'}")
-    print(f"  Reference Baseline: {balancing_config.reference_baseline}")
-    print(f"\nRoom Type Priorities (lower = higher priority):")
+    log.info("Balancing Configuration:")
+    log.info("  Balance Threshold: %ss", balancing_config.balance_threshold)
+    log.info("  Max Passes: %s", balancing_config.max_passes)
+    log.info("  Cross-Stat Balancing: %s", 'Enabled' if balancing_config.enable_cross_stat_balancing else 'Disabled')
+    log.info("  Reference Baseline: %s", balancing_config.reference_baseline)
+    if balancing_config.neighbourhood_moves:
+        log.info("  Neighbourhood Moves: %s", ', '.join(balancing_config.neighbourhood_moves))
+    if balancing_config.decompose_groups:
+        log.info("  Decomposed Groups: %d repair passes", group_decomposition.REPAIR_PASSES)
+    log.info("\nRoom Type Priorities (lower = higher priority):")
     for room_type in balancing_config.get_sorted_room_types():
         priority = balancing_config.get_priority(room_type)
-        print(f"  {room_type}: Priority {priority}")
+        log.info("  %s: Priority %s", room_type, priority)
+
         
 
 
 
-    for pass_num in range(1, balancing_config.max_passes + 1):
+    # Optional worker pool: slow rooms are scored speculatively against each pass snapshot
+    parallel = None
+    shared_placement = None
+    if balancing_config.enable_cross_stat_balancing:
+        parallel = parallel_balance.get_evaluator(balancing_config.parallel_workers)
+    if parallel is not None:
+        log.info("  Parallel Workers: %d", parallel.workers)
+        dweller_ids = list(dict.fromkeys([*working_stats, *(d for ds in sortedL.values() for d in ds)]))
+        dweller_index = {d: i for i, d in enumerate(dweller_ids)}
+        shared_placement = parallel_balance.SharedPlacement(
+            [[working_stats.get(d, {}).get(s, 0) for s in parallel_balance.STAT_COLUMNS] for d in dweller_ids])
+
+    def apply_neighbourhood_moves(production_rooms, deviations, budget):
+        """
+        Try the configured move operators (relocate / swap / ejection / cycle3) on rooms still
+        off target after the pass's swaps. Returns the number of moves made (at most budget).
+        """
+        room_stats = {room: parse_room(room)[1] for room in production_rooms}
+        evaluator = neighbourhood_moves.MoveEvaluator(
+            sortedL, production_rooms,
+            value=lambda d, room: stat_value(d, room_stats[room]),
+            time_for=lambda room, total: production_time_for_total(room, total, happiness_decimal),
+            capacity=lambda room: ROOM_CAPACITY.get(room[2], 0),
+            target=lambda room: group_targets.get(parse_room(room)[0]),
+            threshold=balancing_config.balance_threshold)
+
+        moves = 0
+        for room_data in deviations:
+            if moves >= budget:
+                break
+            room = room_data['room']
+            current = mean_finder.get(room)
+            if current is None or abs(current - room_data['target']) <= balancing_config.balance_threshold:
+                continue
+            move = evaluator.best_move(room, balancing_config.neighbourhood_moves)
+            if move is None:
+                continue
+
+            reason = f"Neighbourhood {move.kind}: Improving {room_data['type']} (Priority {room_data['priority']})"
+            for step in neighbourhood_moves.journal_steps(move):
+                if step[0] == "swap":
+                    _, d1, room1, d2, room2 = step
+                    sortedL[room1].remove(d1)
+                    sortedL[room2].remove(d2)
+                    sortedL[room1].append(d2)
+                    sortedL[room2].append(d1)
+                else:
+                    _, d1, room1, room2 = step
+                    d2 = None
+                    sortedL[room1].remove(d1)
+                    sortedL[room2].append(d1)
+                room1_before, room2_before = mean_finder.get(room1), mean_finder.get(room2)
+                room1_after = update_room_time(mean_finder, room1, working_stats, sortedL, happiness_decimal)
+                room2_after = update_room_time(mean_finder, room2, working_stats, sortedL, happiness_decimal)
+                swap_logger.log_swap(d1, d2, room1, room2, (room1_before, room1_after),
+                                     (room2_before, room2_after), working_stats, reason)
+            for touched in evaluator.touched(move):
+                evaluator.refresh(touched)
+            moves += 1
+        return moves
+
+    # Best case for the dwellers the balancer can move (those in production rooms)
+    balance_rooms = [r for r, ds in sortedL.items() if ds and r[0] not in TRAINING_ROOMS and parse_room(r)[0]]
+    balance_bounds = group_bounds(balance_rooms, [d for r in balance_rooms for d in sortedL[r]], working_stats)
+    stopped_at_bound = {'balancing': False, 'outfits': False}
+
+    def decompose_groups():
+        """
+        Re-split the production dwellers between groups (only with cross-stat balancing, which may
+        move dwellers across stats), then balance every group's rooms on its own, in the worker
+        pool when PARALLEL_WORKERS allows. Returns the number of logged changes.
+        """
+        scale = 1 + happiness_decimal / 100
+        group_rooms = defaultdict(list)
+        for room in balance_rooms:
+            group = group_decomposition.group_of(room[0])
+            if group is not None:
+                group_rooms[group].append(room)
+        group_stat = {group: parse_room(rooms[0])[1] for group, rooms in group_rooms.items()}
+        pools = {group: [BASE_POOL[parse_room(r)[0]] * SIZE_MULTIPLIER[r[2]] for r in rooms]
+                 for group, rooms in group_rooms.items()}
+        times = recalc_mean_finder(working_stats, sortedL, happiness_decimal)
+        changes = 0
+
+        if balancing_config.enable_cross_stat_balancing:
+            partition = {group: [d for r in rooms for d in sortedL[r]] for group, rooms in group_rooms.items()}
+            values = {d: {g: stat_value(d, stat) for g, stat in group_stat.items()}
+                      for members in partition.values() for d in members}
+            allocated = group_decomposition.allocate(partition, pools, values)
+            if allocated is not partition:
+                previous_room = {d: r for rooms in group_rooms.values() for r in rooms for d in sortedL[r]}
+                before = dict(times)
+                for group, rooms in group_rooms.items():
+                    seated = group_decomposition.seat(
+                        [(pool, sortedL[r]) for pool, r in zip(pools[group], rooms)], allocated[group],
+                        lambda d, stat=group_stat[group]: stat_value(d, stat))
+                    for room, members in zip(rooms, seated):
+                        sortedL[room] = members
+                for room in balance_rooms:
+                    update_room_time(times, room, working_stats, sortedL, happiness_decimal)
+                for group, rooms in group_rooms.items():
+                    for room in rooms:
+                        for d in sortedL[room]:
+                            if previous_room[d] != room:
+                                src = previous_room[d]
+                                swap_logger.log_swap(d, None, src, room, (before.get(src), times.get(src)),
+                                                     (before.get(room), times.get(room)), working_stats,
+                                                     f"Group allocation: moved to {group}")
+                                changes += 1
+
+        tasks = []
+        for group, rooms in group_rooms.items():
+            members = {d for r in rooms for d in sortedL[r]}
+            tasks.append((group, [(pool, list(sortedL[r])) for pool, r in zip(pools[group], rooms)],
+                          {d: stat_value(d, group_stat[group]) for d in members}, scale,
+                          balancing_config.balance_threshold, balancing_config.max_passes))
+        evaluator = parallel_balance.get_evaluator(balancing_config.parallel_workers)
+        if evaluator is not None:
+            results = evaluator.map(group_decomposition.balance_group, tasks)
+        else:
+            results = map(group_decomposition.balance_group, tasks)
+
+        for group, _, swaps in results:
+            rooms = group_rooms[group]
+            for weak, slow_index, strong, other_index in swaps:
+                slow_room, other_room = rooms[slow_index], rooms[other_index]
+                slow_before, other_before = times.get(slow_room), times.get(other_room)
+                sortedL[slow_room].remove(weak)
+                sortedL[other_room].remove(strong)
+                sortedL[slow_room].append(strong)
+                sortedL[other_room].append(weak)
+                slow_after = update_room_time(times, slow_room, working_stats, sortedL, happiness_decimal)
+                other_after = update_room_time(times, other_room, working_stats, sortedL, happiness_decimal)
+                swap_logger.log_swap(weak, strong, slow_room, other_room, (slow_before, slow_after),
+                                     (other_before, other_after), working_stats,
+                                     f"Decomposed balancing within {group}")
+                changes += 1
+        log.info("\nDecomposed balancing: %d change(s) across %d groups", changes, len(tasks))
+        return changes
+
+    # Decomposed mode leaves only a few normal passes to repair what crosses group lines
+    max_passes = balancing_config.max_passes
+    if balancing_config.decompose_groups:
+        decompose_groups()
+        max_passes = min(max_passes, group_decomposition.REPAIR_PASSES)
+
+    passes_run = 0
+    for pass_num in range(1, max_passes + 1):
+        phase_timer.checkpoint()
         mean_finder = recalc_mean_finder(working_stats, sortedL, happiness_decimal)
         geo_mean, wap_mean, caf_mean, med_mean, nuka_mean = group_means(mean_finder)
         
@@ -980,13 +1170,17 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
                     return False
             return True
 
+        if near_optimal(mean_finder, balance_bounds):
+            log.info("\n✓ Within %ss of the lower bound after %d passes", balancing_config.bound_epsilon, pass_num - 1)
+            stopped_at_bound['balancing'] = True
+            break
+
         if is_balanced_local():
-            print(f"\n✓ Balanced after {pass_num - 1} passes")
+            log.info("\n✓ Balanced after %d passes", pass_num - 1)
             break
 
-        print(f"\n{'='*80}")
-        print(f"BALANCE PASS {pass_num}")
-        print(f"{'='*80}")
+        log.info("\n%s\nBALANCE PASS %d\n%s", '='*80, pass_num, '='*80)
+        passes_run = pass_num
 
         swaps_this_pass = 0
         
@@ -1019,14 +1213,179 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
             
 
             room_deviations.sort(key=lambda x: (x['priority'], -abs(x['deviation'])))
+
+            # Candidate indexes for this pass. Swaps only move dwellers between these rooms,
+            # so the set of placed dwellers (and their stats) stays fixed; only room_of changes.
+            production_time_of = dict(all_production_rooms)
+            room_order = {room: i for i, (room, _) in enumerate(all_production_rooms)}
+            room_of = {d: room for room, _ in all_production_rooms for d in sortedL.get(room, [])}
+            stat_indexes = {}
+
+            def stat_index(stat):
+                """(ascending stat values, dweller ids) of all placed production dwellers for one stat"""
+                if stat not in stat_indexes:
+                    ranked = sorted((stat_value(d, stat), d) for d in room_of)
+                    stat_indexes[stat] = ([v for v, _ in ranked], [d for _, d in ranked])
+                return stat_indexes[stat]
+
+            room_summaries = {}
+
+            def room_summary(room):
+                """(stat, summed stat, weakest member's stat) of a room, cached until it takes part in a swap"""
+                if room not in room_summaries:
+                    _, stat, _ = parse_room(room)
+                    values = [stat_value(d, stat) for d in sortedL[room]]
+                    room_summaries[room] = (stat, sum(values), min(values))
+                return room_summaries[room]
             
 
 
 
 
+            def find_best_swap(slow_room, slow_time, slow_stat, worst_in_slow, worst_stat_value,
+                               donors=None, incumbent=None):
+                """
+                Best swap partner for worst_in_slow (a dict with 'improvement' / 'order', or None).
+                With `donors`, only those rooms are searched and the result is whichever of
+                their best and `incumbent` wins.
+                """
+                best_swap = incumbent
+                best_improvement = incumbent['improvement'] if incumbent else 0
+
+                # Only dwellers whose stat for the slow room beats its weakest occupant can help.
+                # Visit them strongest first: the slow room's gain only shrinks from there, so once
+                # gain minus the smallest possible cost of the donor room cannot beat the best swap,
+                # nobody further down can either.
+                values, candidates = stat_index(slow_stat)
+                first = bisect.bisect_right(values, worst_stat_value)
+                slow_total = room_summary(slow_room)[1]
+
+                # Cheapest each donor room can get: losing its weakest member for worst_in_slow
+                donor_floor = {}
+                for other_room, other_time in all_production_rooms:
+                    if other_room == slow_room or not sortedL.get(other_room):
+                        continue
+                    if donors is not None and other_room not in donors:
+                        continue
+                    other_stat, other_total, other_weakest = room_summary(other_room)
+                    floor_time = production_time_for_total(
+                        other_room, other_total - other_weakest + stat_value(worst_in_slow, other_stat),
+                        happiness_decimal)
+                    if floor_time is not None:
+                        donor_floor[other_room] = floor_time - other_time
+                if not donor_floor:
+                    return best_swap
+                min_donor_cost = min(donor_floor.values())
+
+                for pos in range(len(candidates) - 1, first - 1, -1):
+                    gain_time = production_time_for_total(slow_room, slow_total - worst_stat_value + values[pos],
+                                                          happiness_decimal)
+                    if gain_time is None:
+                        continue
+                    slow_gain = (slow_time - gain_time) * 1.5
+                    if slow_gain - min_donor_cost < best_improvement:
+                        break
+
+                    other_dweller = candidates[pos]
+                    other_room = room_of.get(other_dweller)
+                    if other_room is None or other_room == slow_room:
+                        continue
+                    if other_room not in donor_floor or slow_gain - donor_floor[other_room] < best_improvement:
+                        continue
+                    other_time = production_time_of[other_room]
+
+                    temp_slow = [d for d in sortedL[slow_room] if d != worst_in_slow]
+                    temp_other = [d for d in sortedL[other_room] if d != other_dweller]
+
+                    temp_slow.append(other_dweller)
+                    temp_other.append(worst_in_slow)
+                    
+                    # Calculate new times
+                    new_slow_time = get_room_production_time(slow_room, temp_slow, working_stats, happiness_decimal)
+                    new_other_time = get_room_production_time(other_room, temp_other, working_stats, happiness_decimal)
+                    
+                    if new_slow_time is None or new_other_time is None:
+                        continue
+                    
+                    # Calculate improvement
+                    slow_improvement = slow_time - new_slow_time
+                    other_change = new_other_time - other_time
+                    
+                    # Weighted improvement (prioritize slow room)
+                    total_improvement = (slow_improvement * 1.5) - other_change
+                    
+                    # Only accept if net positive; equal improvements go to the room / dweller
+                    # that comes first in room order, as a plain scan would pick
+                    order = (room_order[other_room], sortedL[other_room].index(other_dweller))
+                    if total_improvement > best_improvement or (
+                            best_swap is not None and total_improvement == best_improvement
+                            and order < best_swap['order']):
+                        best_improvement = total_improvement
+                        best_swap = {
+                            'other_room': other_room,
+                            'other_dweller': other_dweller,
+                            'new_slow_time': new_slow_time,
+                            'new_other_time': new_other_time,
+                            'order': order,
+                            'improvement': total_improvement,
+                        }
+                return best_swap
+
+            def score_pass_in_parallel(deviations):
+                """
+                Queue every slow room of this pass in the worker pool, scored against the pass-start placement.
+                Returns ({slow room: task index}, PendingScores).
+                """
+                room_index = {room: i for i, (room, _) in enumerate(all_production_rooms)}
+                shared_placement.set_occupancy(
+                    [[dweller_index[d] for d in sortedL.get(room, [])] for room, _ in all_production_rooms])
+                rooms = []
+                for room, prod_time in all_production_rooms:
+                    room_type, stat, size = parse_room(room)
+                    rooms.append((BASE_POOL[room_type] * SIZE_MULTIPLIER[size],
+                                  parallel_balance.stat_columns(stat), prod_time))
+
+                slow_rooms, tasks = [], []
+                for room_data in deviations:
+                    slow_room = room_data['room']
+                    if abs(room_data['time'] - room_data['target']) <= balancing_config.balance_threshold:
+                        continue
+                    if not sortedL.get(slow_room):
+                        continue
+                    worst = min(sortedL[slow_room], key=lambda d: stat_value(d, room_data['stat']))
+                    slow_rooms.append(slow_room)
+                    tasks.append((room_index[slow_room], dweller_index[worst]))
+
+                pending = parallel.submit(shared_placement, rooms, tasks, happiness_decimal)
+                return {slow_room: i for i, slow_room in enumerate(slow_rooms)}, pending
+
+            def snapshot_best_swap(slow_room):
+                """Pass-start result for a slow room from the worker pool, False if it was not scored"""
+                if slow_room not in scored_rooms:
+                    return False
+                found = pending_scores.result(scored_rooms[slow_room])
+                if found is None:
+                    return None
+                other, improvement, slot, dweller, new_slow_time, new_other_time = found
+                return {
+                    'other_room': all_production_rooms[other][0],
+                    'other_dweller': dweller_ids[dweller],
+                    'new_slow_time': new_slow_time,
+                    'new_other_time': new_other_time,
+                    'order': (other, slot),
+                    'improvement': improvement,
+                }
+
+            # Speculative scoring of every slow room against this pass's snapshot
+            scored_rooms, pending_scores = {}, None
+            dirty_rooms = set()
+            if parallel is not None:
+                scored_rooms, pending_scores = score_pass_in_parallel(room_deviations)
+
             for room_data in room_deviations:
                 if swaps_this_pass >= 20:  
                     break
+                phase_timer.checkpoint()
                 
                 slow_room = room_data['room']
                 slow_time = room_data['time']
@@ -1041,107 +1400,59 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
                 if not sortedL.get(slow_room):
                     continue
                 
-                # Handle dual-stat rooms
-                if isinstance(slow_stat, tuple):
-                    # For dual-stat rooms, find dweller with worst average of both stats
-                    stat1, stat2 = slow_stat
-                    worst_in_slow = min(sortedL[slow_room], 
-                                       key=lambda d: (working_stats.get(d, {}).get(stat1, 0) + 
-                                                     working_stats.get(d, {}).get(stat2, 0)) / 2)
-                    worst_stat_value = (working_stats.get(worst_in_slow, {}).get(stat1, 0) + 
-                                       working_stats.get(worst_in_slow, {}).get(stat2, 0)) / 2
-                else:
-                    worst_in_slow = min(sortedL[slow_room], 
-                                       key=lambda d: working_stats.get(d, {}).get(slow_stat, 0))
-                    worst_stat_value = working_stats.get(worst_in_slow, {}).get(slow_stat, 0)
-                
-                best_swap = None
-                best_improvement = 0
+                # Dual-stat rooms (NukaCola) use the average of both stats
+                worst_in_slow = min(sortedL[slow_room], key=lambda d: stat_value(d, slow_stat))
+                worst_stat_value = stat_value(worst_in_slow, slow_stat)
                 
-                for other_room, other_time in all_production_rooms:
-                    if other_room == slow_room or not sortedL.get(other_room):
-                        continue
-                    
-                    other_type, other_stat, other_size = parse_room(other_room)
-                    other_target = group_targets.get(other_type)
-                    
-                    # Find dweller in other room who would be better in slow room
-                    for other_dweller in sortedL[other_room]:
-                        other_dweller_stats = working_stats.get(other_dweller, {})
-                        
-                        # Calculate stat values for comparison (handle dual-stat rooms)
-                        if isinstance(slow_stat, tuple):
-                            stat1, stat2 = slow_stat
-                            other_in_slow_stat = (other_dweller_stats.get(stat1, 0) + 
-                                                 other_dweller_stats.get(stat2, 0)) / 2
-                        else:
-                            other_in_slow_stat = other_dweller_stats.get(slow_stat, 0)
-                        
-                        if isinstance(other_stat, tuple):
-                            stat1, stat2 = other_stat
-                            worst_in_other_stat = (working_stats.get(worst_in_slow, {}).get(stat1, 0) + 
-                                                  working_stats.get(worst_in_slow, {}).get(stat2, 0)) / 2
-                        else:
-                            worst_in_other_stat = working_stats.get(worst_in_slow, {}).get(other_stat, 0)
-                        
-                        if other_in_slow_stat <= worst_stat_value:
-                            continue
-                        
-                        temp_slow = [d for d in sortedL[slow_room] if d != worst_in_slow]
-                        temp_other = [d for d in sortedL[other_room] if d != other_dweller]
-
-                        temp_slow.append(other_dweller)
-                        temp_other.append(worst_in_slow)
-                        
-                        # Calculate new times
-                        new_slow_time = get_room_production_time(slow_room, temp_slow, working_stats, happiness_decimal)
-                        new_other_time = get_room_production_time(other_room, temp_other, working_stats, happiness_decimal)
-                        
-                        if new_slow_time is None or new_other_time is None:
-                            continue
-                        
-                        # Calculate improvement
-                        slow_improvement = slow_time - new_slow_time
-                        other_change = new_other_time - other_time
-                        
-                        # Weighted improvement (prioritize slow room)
-                        total_improvement = (slow_improvement * 1.5) - other_change
-                        
-                        # Only accept if net positive
-                        if total_improvement > best_improvement:
-                            best_improvement = total_improvement
-                            best_swap = {
-                                'other_room': other_room,
-                                'other_dweller': other_dweller,
-                                'new_slow_time': new_slow_time,
-                                'new_other_time': new_other_time
-                            }
+                snapshot_swap = False if slow_room in dirty_rooms else snapshot_best_swap(slow_room)
+                if (snapshot_swap is not False
+                        and (snapshot_swap is None or snapshot_swap['other_room'] not in dirty_rooms)):
+                    # The pass-start best still holds for rooms untouched this pass; only rooms
+                    # swapped since then need a fresh look
+                    best_swap = find_best_swap(slow_room, slow_time, slow_stat, worst_in_slow, worst_stat_value,
+                                               donors=dirty_rooms, incumbent=snapshot_swap)
+                else:
+                    best_swap = find_best_swap(slow_room, slow_time, slow_stat, worst_in_slow, worst_stat_value)
+                best_improvement = best_swap['improvement'] if best_swap else 0
                 
                 # Execute best swap if found
                 if best_swap and best_improvement > 0.5:
                     other_room = best_swap['other_room']
                     other_dweller = best_swap['other_dweller']
                     
-                    # Record before state
-                    before_times = mean_finder.copy()
-                    
+                    slow_before = mean_finder.get(slow_room)
+                    other_before = mean_finder.get(other_room)
+
                     # Execute swap
                     sortedL[slow_room].remove(worst_in_slow)
                     sortedL[other_room].remove(other_dweller)
                     sortedL[slow_room].append(other_dweller)
                     sortedL[other_room].append(worst_in_slow)
+                    room_of[other_dweller] = slow_room
+                    room_of[worst_in_slow] = other_room
+                    room_summaries.pop(slow_room, None)
+                    room_summaries.pop(other_room, None)
+                    dirty_rooms.update((slow_room, other_room))
                     
-                    # Recalculate times
-                    mean_finder = recalc_mean_finder(working_stats, sortedL, happiness_decimal)
+                    # Only the two swapped rooms change
+                    slow_after = update_room_time(mean_finder, slow_room, working_stats, sortedL, happiness_decimal)
+                    other_after = update_room_time(mean_finder, other_room, working_stats, sortedL, happiness_decimal)
                     
                     # Log the swap
                     reason = f"Cross-stat optimization: Improving {room_data['type']} (Priority {room_data['priority']})"
                     swap_logger.log_swap(worst_in_slow, other_dweller, slow_room, other_room,
-                                        before_times, mean_finder, working_stats, reason)
+                                        (slow_before, slow_after), (other_before, other_after),
+                                        working_stats, reason)
                     
                     swaps_this_pass += 1
 
+            if pending_scores is not None:
+                pending_scores.cancel()
 
+            # Relocations into free slots, ejection chains and 3-cycles for rooms the swaps did not fix
+            if balancing_config.neighbourhood_moves and swaps_this_pass < 20:
+                swaps_this_pass += apply_neighbourhood_moves(
+                    [r for r, _ in all_production_rooms], room_deviations, 20 - swaps_this_pass)
 
         else:
             # SAME-STAT BALANCING ONLY (original logic)
@@ -1183,69 +1494,72 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
                 if best_stat <= worst_stat * 1.5:
                     continue
 
-                # Record before state
-                before_times = mean_finder.copy()
-                
                 # Execute swap
                 sortedL[strongest].remove(best_from_strong)
                 sortedL[weakest].remove(worst_from_weak)
                 sortedL[strongest].append(worst_from_weak)
                 sortedL[weakest].append(best_from_strong)
                 
-                # Recalculate times
-                mean_finder = recalc_mean_finder(working_stats, sortedL, happiness_decimal)
+                # Only the two swapped rooms change
+                new_strongest_time = update_room_time(mean_finder, strongest, working_stats, sortedL, happiness_decimal)
+                new_weakest_time = update_room_time(mean_finder, weakest, working_stats, sortedL, happiness_decimal)
                 
                 # Log the swap
                 reason = f"Same-stat balancing within {room_type}"
                 swap_logger.log_swap(best_from_strong, worst_from_weak, strongest, weakest,
-                                    before_times, mean_finder, working_stats, reason)
+                                    (strongest_time, new_strongest_time),
+                                    (weakest_time, new_weakest_time),
+                                    working_stats, reason)
                 
                 swaps_this_pass += 1
         
         if swaps_this_pass == 0:
-            print(f"\nNo beneficial swaps found in pass {pass_num} - stopping")
+            log.info("\nNo beneficial swaps found in pass %d - stopping", pass_num)
             break
         else:
-            print(f"\nCompleted {swaps_this_pass} swap(s) in pass {pass_num}")
+            log.info("\nCompleted %d swap(s) in pass %d", swaps_this_pass, pass_num)
+
 
 
+    if shared_placement is not None:
+        shared_placement.close()
 
     # Print swap summary
     swap_logger.print_summary()
 
     # --- Final state after balancing ---
-    print("")
-    for room, dwellers in sortedL.items():
-        print(f"Room: {room} -> Dwellers: {', '.join(dwellers)}")
-    print("")
+    if verbose:
+        for room, dwellers in sortedL.items():
+            log.debug("Room: %s -> Dwellers: %s", room, ', '.join(dwellers))
 
     after_balancing_times = recalc_mean_finder(working_stats, sortedL, happiness_decimal)
 
-    print("\nFINAL TIMES AFTER BALANCING")
-    for room_key, t in after_balancing_times.items():
-        print(f"{room_key} -> {t} seconds")
+    if verbose:
+        log.debug("\nFINAL TIMES AFTER BALANCING")
+        for room_key, t in after_balancing_times.items():
+            log.debug("%s -> %s seconds", room_key, t)
 
     geo_mean, wap_mean, caf_mean, med_mean, nuka_mean = group_means(after_balancing_times)
 
     if geo_mean is not None:
-        print(f"\nGeothermal Average Time: {round(geo_mean,1)} seconds")
+        log.info("\nGeothermal Average Time: %s seconds", round(geo_mean,1))
     if wap_mean is not None:
-        print(f"Water Plant Average Time: {round(wap_mean,1)} seconds")
+        log.info("Water Plant Average Time: %s seconds", round(wap_mean,1))
     if caf_mean is not None:
-        print(f"Cafeteria Average Time: {round(caf_mean,1)} seconds")
+        log.info("Cafeteria Average Time: %s seconds", round(caf_mean,1))
     if med_mean is not None:
-        print(f"Medbay Average Time: {round(med_mean,1)} seconds")
+        log.info("Medbay Average Time: %s seconds", round(med_mean,1))
     if nuka_mean is not None:
-        print(f"NukaCola Average Time: {round(nuka_mean,1)} seconds")
+        log.info("NukaCola Average Time: %s seconds", round(nuka_mean,1))
+
+    phase_timer.mark('balancing')
 
     # --- OUTFIT OPTIMIZATION (based on after-balancing placement) ---------------
-    print("\n" + "="*60)
-    print("OUTFIT OPTIMIZATION")
-    print("="*60)
+    log.info("\n%s\nOUTFIT OPTIMIZATION\n%s", "="*60, "="*60)
 
     # Get outfit strategy from optimizer config
     outfit_strategy = balancing_config.outfit_strategy if hasattr(balancing_config, 'outfit_strategy') else 'deficit_first'
-    print(f"Using strategy: {outfit_strategy}")
+    log.info("Using strategy: %s", outfit_strategy)
 
     # FIRST: Build complete map of who owned what outfit BEFORE any changes
     outfit_previous_owners_list = defaultdict(list)
@@ -1253,10 +1567,11 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
         if outfit_id:
             outfit_previous_owners_list[outfit_id].append(dweller_id)
 
-    print(f"\nTracked outfit ownership for {len(outfit_previous_owners_list)} outfit types before optimization")
-    for outfit_id, owners in outfit_previous_owners_list.items():
-        outfit_name = outfit_mods.get(outfit_id, {}).get('name', outfit_id)
-        print(f"  {outfit_name}: {len(owners)} dweller(s)")
+    log.info("\nTracked outfit ownership for %d outfit types before optimization", len(outfit_previous_owners_list))
+    if verbose:
+        for outfit_id, owners in outfit_previous_owners_list.items():
+            outfit_name = outfit_mods.get(outfit_id, {}).get('name', outfit_id)
+            log.debug("  %s: %d dweller(s)", outfit_name, len(owners))
 
     # Start fresh for NEW outfit assignments
     outfit_assignments = {}
@@ -1274,9 +1589,7 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
         return (row[0] or "").strip()
 
     # Validate existing outfits against NEW placement
-    print("\n" + "-"*60)
-    print("VALIDATING EXISTING OUTFIT ASSIGNMENTS AGAINST NEW PLACEMENT")
-    print("-"*60)
+    log.info("\n%s\nVALIDATING EXISTING OUTFIT ASSIGNMENTS AGAINST NEW PLACEMENT\n%s", "-"*60, "-"*60)
 
     outfits_to_relocate = []
 
@@ -1294,14 +1607,15 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
         
             if stat_key and outfit[stat_key] > 0:
                 outfit_assignments[dweller_id] = outfit_id
-                print(f"✓ Dweller {dweller_id} in {room_type} room with {outfit['name']} (+{outfit[stat_key]} {stat})")
+                log.debug("✓ Dweller %s in %s room with %s (+%s %s)",
+                          dweller_id, room_type, outfit['name'], outfit[stat_key], stat)
             else:
-                print(f"⚠️  Dweller {dweller_id} in {room_type} room has MISPLACED {outfit['name']}")
+                log.debug("⚠️  Dweller %s in %s room has MISPLACED %s", dweller_id, room_type, outfit['name'])
                 outfits_to_relocate.append((dweller_id, outfit_id))
 
     # Handle relocations FIRST, before applying outfit bonuses
     if outfits_to_relocate:
-        print(f"\n⚠️  Found {len(outfits_to_relocate)} misplaced outfits - attempting to relocate...")
+        log.info("\n⚠️  Found %d misplaced outfits - attempting to relocate...", len(outfits_to_relocate))
 
         # REMOVE MISPLACED OUTFITS FROM outfit_assignments FIRST
         for old_dweller_id, outfit_id in outfits_to_relocate:
@@ -1333,13 +1647,15 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
                             if not outfit_manager.is_outfit_compatible(dweller_sex, outfit_id):
                                 continue
                             outfit_assignments[potential_dweller] = outfit_id
-                            print(f"  ✓ Moved {outfit['name']} from Dweller {old_dweller_id} to Dweller {potential_dweller}")
+                            log.debug("  ✓ Moved %s from Dweller %s to Dweller %s",
+                                      outfit['name'], old_dweller_id, potential_dweller)
                             found_new_home = True
                             break
                 if found_new_home:
                     break
             if not found_new_home:
-                print(f"  ⚠️  Could not relocate {outfit['name']} from Dweller {old_dweller_id}")
+                log.debug("  ⚠️  Could not relocate %s from Dweller %s", outfit['name'], old_dweller_id)
+
  
     dweller_stats_with_outfits = {k: v.copy() for k, v in working_stats.items()}
     
@@ -1429,8 +1745,8 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
     outfit_inventory = Counter(available_outfits)
     outfit_used = {oid: 0 for oid in outfit_inventory}
 
-    print(f"\nOutfits available for new assignments: {sum(outfit_inventory.values())}")
-    print(f"Outfits already assigned: {len(outfit_assignments)}")
+    log.info("\nOutfits available for new assignments: %d", sum(outfit_inventory.values()))
+    log.info("Outfits already assigned: %d", len(outfit_assignments))
 
 
 
@@ -1592,9 +1908,7 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
     FILTER OUT REDUNDANT ASSIGNMENTS - Some existing outfits may still be valid and efficient in new placement, so we keep them. 
     This step just removes any that are now redundant (dweller already has the same outfit in the database) to free them up for reassignment if needed. 
     """
-    print("\n" + "-"*60)
-    print("FILTERING REDUNDANT OUTFIT ASSIGNMENTS")
-    print("-"*60)
+    log.info("\n%s\nFILTERING REDUNDANT OUTFIT ASSIGNMENTS\n%s", "-"*60, "-"*60)
 
     redundant_assignments = []
     for dweller_id, outfit_id in list(outfit_assignments.items()):
@@ -1603,42 +1917,55 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
             redundant_assignments.append((dweller_id, outfit_id))
             
     if redundant_assignments:
-        print(f"Found {len(redundant_assignments)} redundant assignments (dweller already wearing outfit):")
+        log.info("Found %d redundant assignments (dweller already wearing outfit):", len(redundant_assignments))
         for dweller_id, outfit_id in redundant_assignments:
-            outfit_name = outfit_mods.get(outfit_id, {}).get('name', outfit_id)
-            print(f"  - Dweller {dweller_id} already has {outfit_name} - skipping")
+            if verbose:
+                outfit_name = outfit_mods.get(outfit_id, {}).get('name', outfit_id)
+                log.debug("  - Dweller %s already has %s - skipping", dweller_id, outfit_name)
             del outfit_assignments[dweller_id]
     else:
-        print("No redundant assignments found")
+        log.info("No redundant assignments found")
 
 
     # Sort rooms based on strategy
     if outfit_strategy == 'deficit_first':
         sorted_rooms = sort_rooms_deficit_first(room_needs)
-        print("\n📊 Strategy: DEFICIT FIRST - Prioritizing rooms needing most help")
+        log.info("\n📊 Strategy: DEFICIT FIRST - Prioritizing rooms needing most help")
     elif outfit_strategy == 'big_rooms_first':
         sorted_rooms = sort_rooms_big_rooms_first(room_needs)
-        print("\n🏢 Strategy: BIG ROOMS FIRST - Prioritizing high-level/merged rooms")
+        log.info("\n🏢 Strategy: BIG ROOMS FIRST - Prioritizing high-level/merged rooms")
     elif outfit_strategy == 'hybrid':
         sorted_rooms = sort_rooms_hybrid(room_needs)
-        print("\n⚖️  Strategy: HYBRID - Balancing deficit and room size")
+        log.info("\n⚖️  Strategy: HYBRID - Balancing deficit and room size")
     elif outfit_strategy == 'efficiency_first':
         sorted_rooms = sort_rooms_efficiency_first(room_needs)
-        print("\n⚡ Strategy: EFFICIENCY FIRST - Maximizing outfit stat efficiency")
+        log.info("\n⚡ Strategy: EFFICIENCY FIRST - Maximizing outfit stat efficiency")
     else:
         sorted_rooms = sort_rooms_deficit_first(room_needs)
-        print(f"\n⚠️  Unknown strategy '{outfit_strategy}', defaulting to DEFICIT FIRST")
+        log.warning("\n⚠️  Unknown strategy '%s', defaulting to DEFICIT FIRST", outfit_strategy)
 
     # MAIN OUTFIT ASSIGNMENT LOOP
-    print("\n" + "-"*60)
-    print("OUTFIT ASSIGNMENT - STRATEGY-BASED OPTIMIZATION")
-    print("-"*60)
+    log.info("\n%s\nOUTFIT ASSIGNMENT - STRATEGY-BASED OPTIMIZATION\n%s", "-"*60, "-"*60)
 
     assignments_made = 0
 
+    # Best case with every outfit (including ones already worn) free to hand out again
+    outfit_pool = list(outfitlist) + list(existing_outfit_assignments.values())
+    outfit_bounds = group_bounds(
+        balance_rooms, [d for r in balance_rooms for d in sortedL[r]], working_stats,
+        [{stat: outfit_mods[oid][key] for stat, key in outfit_stat_map.items()}
+         for oid in outfit_pool if oid in outfit_mods])
+    outfit_times = dict(current_times)
+
     for room_key, need_data in sorted_rooms:
+        phase_timer.checkpoint()
         if not any_outfit_left():
-            print("\n⚠️  No more outfits available")
+            log.info("\n⚠️  No more outfits available")
+            break
+
+        if near_optimal(outfit_times, outfit_bounds):
+            log.info("\n✓ Within %ss of the lower bound - skipping the remaining rooms", balancing_config.bound_epsilon)
+            stopped_at_bound['outfits'] = True
             break
     
         stat_needed = need_data['stat']
@@ -1665,7 +1992,9 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
         if not relevant_outfits:
             continue
 
-        print(f"\n{room_key} (Priority {priority}, Value {value_score}, Deficit: {round(deficit, 1)} {stat_needed})")
+        if verbose:
+            log.debug("\n%s (Priority %s, Value %s, Deficit: %s %s)",
+                      room_key, priority, value_score, round(deficit, 1), stat_needed)
     
         # Sort dwellers (lowest stat first = most benefit from outfit)
         unequipped_dwellers.sort(
@@ -1685,7 +2014,8 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
             ]
 
             if not gender_compatible_outfits:
-                print(f"  ⚠️  No gender-compatible outfits available for Dweller {dweller_id} ({dweller_sex or 'unknown sex'})")
+                log.debug("  ⚠️  No gender-compatible outfits available for Dweller %s (%s)",
+                          dweller_id, dweller_sex or 'unknown sex')
                 continue
 
             # Select best outfit based on strategy
@@ -1717,77 +2047,81 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
             efficiency = round(get_outfit_efficiency(outfit_id, stat_needed) * 100, 1)
             total_bonus = get_outfit_total_bonus(outfit_id)
         
-            print(f"  ✓ Assigned {outfit['name']} to Dweller {dweller_id}")
-            print(f"    +{bonus} {stat_needed} ({efficiency}% efficient, +{total_bonus} total stats)")
+            log.debug("  ✓ Assigned %s to Dweller %s\n    +%s %s (%s%% efficient, +%s total stats)",
+                      outfit['name'], dweller_id, bonus, stat_needed, efficiency, total_bonus)
         
             assignments_made += 1
             deficit -= bonus
 
             # Strategy-specific stopping conditions
             if outfit_strategy == 'deficit_first' and deficit <= 0:
-                print(f"  ✓ Room deficit eliminated!")
+                log.debug("  ✓ Room deficit eliminated!")
                 break
             elif outfit_strategy == 'efficiency_first' and efficiency < 60:
-                print(f"  ⚠️  Efficiency threshold reached, moving to next room")
+                log.debug("  ⚠️  Efficiency threshold reached, moving to next room")
                 break
 
-    print(f"\n{'='*60}")
-    print(f"OUTFIT ASSIGNMENT COMPLETE - {assignments_made} new assignments")
-    print(f"{'='*60}")
+        if room_key in outfit_times:
+            update_room_time(outfit_times, room_key, dweller_stats_with_outfits, sortedL, happiness_decimal)
+
+    log.info("\n%s\nOUTFIT ASSIGNMENT COMPLETE - %d new assignments\n%s", '='*60, assignments_made, '='*60)
 
     # Recalculate with outfits
     mean_finder_with_outfits = recalc_mean_finder(dweller_stats_with_outfits, sortedL, happiness_decimal)
 
-    print("\n" + "="*60)
-    print("PRODUCTION TIMES WITH OUTFITS")
-    print("="*60)
+    if verbose:
+        log.debug("\n%s\nPRODUCTION TIMES WITH OUTFITS\n%s", "="*60, "="*60)
+        for room_key, t in mean_finder_with_outfits.items():
+            if room_key[0] in TRAINING_ROOMS:
+                continue
+            old_time = after_balancing_times.get(room_key, 0)
+            improvement_pct = ((old_time - t) / old_time * 100) if old_time > 0 else 0
+            log.debug("%s -> %.1fs (was %.1fs, %+.1f%%)", room_key, t, old_time, improvement_pct)
 
-    for room_key, t in mean_finder_with_outfits.items():
-        if room_key[0] in TRAINING_ROOMS:
-            continue
-        old_time = after_balancing_times.get(room_key, 0)
-        improvement = old_time - t
-        improvement_pct = ((old_time - t) / old_time * 100) if old_time > 0 else 0
-        print(f"{room_key} -> {t:.1f}s (was {old_time:.1f}s, {improvement_pct:+.1f}%)")
 
     geo_mean_new, wap_mean_new, caf_mean_new, med_mean_new, nuka_mean_new = group_means(mean_finder_with_outfits)
 
-    print(f"\n{'='*60}")
-    print("AVERAGE TIMES COMPARISON")
-    print(f"{'='*60}")
+    log.info("\n%s", '=' * 60)
+    log.info("AVERAGE TIMES COMPARISON")
+    log.info('=' * 60)
 
     if geo_mean is not None and geo_mean_new is not None:
         improvement_pct = ((geo_mean - geo_mean_new) / geo_mean * 100)
-        print(f"Power:  {round(geo_mean, 1)}s -> {round(geo_mean_new, 1)}s (Δ {round(geo_mean - geo_mean_new, 1)}s, {improvement_pct:+.1f}%)")
+        log.info("Power:  %.1fs -> %.1fs (Δ %.1fs, %+.1f%%)",
+                 geo_mean, geo_mean_new, geo_mean - geo_mean_new, improvement_pct)
     if wap_mean is not None and wap_mean_new is not None:
         improvement_pct = ((wap_mean - wap_mean_new) / wap_mean * 100)
-        print(f"Water:  {round(wap_mean, 1)}s -> {round(wap_mean_new, 1)}s (Δ {round(wap_mean - wap_mean_new, 1)}s, {improvement_pct:+.1f}%)")
+        log.info("Water:  %.1fs -> %.1fs (Δ %.1fs, %+.1f%%)",
+                 wap_mean, wap_mean_new, wap_mean - wap_mean_new, improvement_pct)
     if caf_mean is not None and caf_mean_new is not None:
         improvement_pct = ((caf_mean - caf_mean_new) / caf_mean * 100)
-        print(f"Food:   {round(caf_mean, 1)}s -> {round(caf_mean_new, 1)}s (Δ {round(caf_mean - caf_mean_new, 1)}s, {improvement_pct:+.1f}%)")
+        log.info("Food:   %.1fs -> %.1fs (Δ %.1fs, %+.1f%%)",
+                 caf_mean, caf_mean_new, caf_mean - caf_mean_new, improvement_pct)
     if med_mean is not None and med_mean_new is not None:
         improvement_pct = ((med_mean - med_mean_new) / med_mean * 100)
-        print(f"Medbay: {round(med_mean, 1)}s -> {round(med_mean_new, 1)}s (Δ {round(med_mean - med_mean_new, 1)}s, {improvement_pct:+.1f}%)")
+        log.info("Medbay: %.1fs -> %.1fs (Δ %.1fs, %+.1f%%)",
+                 med_mean, med_mean_new, med_mean - med_mean_new, improvement_pct)
     if nuka_mean is not None and nuka_mean_new is not None:
         improvement_pct = ((nuka_mean - nuka_mean_new) / nuka_mean * 100)
-        print(f"NukaCola: {round(nuka_mean, 1)}s -> {round(nuka_mean_new, 1)}s (Δ {round(nuka_mean - nuka_mean_new, 1)}s, {improvement_pct:+.1f}%)")
+        log.info("NukaCola: %.1fs -> %.1fs (Δ %.1fs, %+.1f%%)",
+                 nuka_mean, nuka_mean_new, nuka_mean - nuka_mean_new, improvement_pct)
 
     # Outfit assignment summary
-    print(f"\n{'='*60}")
-    print("OUTFIT ASSIGNMENT SUMMARY")
-    print(f"{'='*60}")
+    log.info("\n%s", '=' * 60)
+    log.info("OUTFIT ASSIGNMENT SUMMARY")
+    log.info('=' * 60)
 
     new_assignments = {k: v for k, v in outfit_assignments.items() if k not in existing_outfit_assignments}
     kept_existing = {k: v for k, v in outfit_assignments.items() if k in existing_outfit_assignments}
 
-    print(f"Strategy Used: {outfit_strategy}")
-    print(f"Total outfits assigned: {len(outfit_assignments)}")
-    print(f"  - Pre-existing (kept): {len(kept_existing)}")
-    print(f"  - Newly assigned: {len(new_assignments)}")
-    print(f"  - Relocated: {len(outfits_to_relocate)}")
+    log.info("Strategy Used: %s", outfit_strategy)
+    log.info("Total outfits assigned: %d", len(outfit_assignments))
+    log.info("  - Pre-existing (kept): %d", len(kept_existing))
+    log.info("  - Newly assigned: %d", len(new_assignments))
+    log.info("  - Relocated: %d", len(outfits_to_relocate))
 
     remaining = sum(outfit_inventory[oid] - outfit_used.get(oid, 0) for oid in outfit_inventory)
-    print(f"Remaining unassigned outfits: {remaining}")
+    log.info("Remaining unassigned outfits: %s", remaining)
 
     # Strategy-specific metrics
     if outfit_strategy == 'efficiency_first':
@@ -1807,48 +2141,25 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
     
         if count > 0:
             avg_efficiency = (total_efficiency / count) * 100
-            print(f"Average outfit efficiency: {avg_efficiency:.1f}%")
-
-    # Plotting
-    exclude = {"Gym", "Armory", "Dojo", "Classroom"}
-    rooms = [r for r in list(before_balancing_times.keys()) if r[0] not in exclude]
-
-    initial = [initial_mean_finder.get(r, np.nan) for r in rooms]
-    before = [before_balancing_times.get(r, np.nan) for r in rooms]
-    after = [after_balancing_times.get(r, np.nan) for r in rooms]
-    with_outfits = [mean_finder_with_outfits.get(r, np.nan) for r in rooms]
-
-    x = np.arange(len(rooms))
-    width = 0.2
-
-    plt.figure(figsize=(14, 7))
-    plt.bar(x - 1.5*width, initial, width=width, label="Initial", color='#ff6b6b')
-    plt.bar(x - 0.5*width, before, width=width, label="Before Balancing", color='#feca57')
-    plt.bar(x + 0.5*width, after, width=width, label="After Balancing", color='#48dbfb')
-    plt.bar(x + 1.5*width, with_outfits, width=width, label="With Outfits", color='#1dd1a1')
-
-    plt.xticks(ticks=x, labels=[f"{r[0]}-{r[1]}-{r[2]}-{r[3]}" for r in rooms], rotation=45, ha="right")
-    plt.ylabel("Production Time (s)")
-    plt.title("Room Production Times: Initial → Balanced → Optimized with Outfits")
-    plt.legend()
-    plt.grid(axis='y', alpha=0.3)
-    plt.tight_layout()
-
-    timestamp = time.strftime("%Y%m%d_%H%M%S")
-    plot_filename = f"vault_production_{timestamp}.png"
-    plt.savefig(plot_filename, dpi=150, bbox_inches='tight')
-    plt.close()
-    print(f"\nPlot saved as: {plot_filename}")
+            log.info("Average outfit efficiency: %.1f%%", avg_efficiency)
+
+    phase_timer.mark('outfits')
+
 
     # Save optimization results to JSON
     optimization_results = {
         'timestamp': datetime.now().isoformat(),
         'vault_name': vault_name,
+        'input_key': input_key,
         'balancing_config': {
             'balance_threshold': balancing_config.balance_threshold,
             'max_passes': balancing_config.max_passes,
             'cross_stat_balancing': balancing_config.enable_cross_stat_balancing,
-            'priorities': balancing_config.room_priorities
+            'neighbourhood_moves': list(balancing_config.neighbourhood_moves),
+            'decompose_groups': balancing_config.decompose_groups,
+            'training_allocation': balancing_config.training_allocation,
+            'priorities': balancing_config.room_priorities,
+            'passes': passes_run
         },
         'swap_history': swap_logger.swap_history,
         'dweller_assignments': [],
@@ -1871,38 +2182,29 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
         if assigned_room:
             room_type, stat, size = parse_room(assigned_room)
             assigned_room_info = {
+                'room_id': assigned_room[3],
                 'room_type': assigned_room[0],
                 'room_level': assigned_room[1],
                 'room_size': assigned_room[2],
-                'room_number': assigned_room[3],
             }
 
             previous_room_info = None
             for room_key, dwellers in initial_rooms.items():
                 if dweller_id in dwellers:
                     previous_room_info = {
+                        'room_id': room_key[3],
                         'room_type': room_key[0],
                         'room_level': room_key[1],
                         'room_size': room_key[2],
-                        'room_number': room_key[3],
                     }
                     break
 
             moved_room_info = None
-            if previous_room_info:
-                prev_room_tuple = (
-                    previous_room_info['room_type'],
-                    previous_room_info['room_level'],
-                    previous_room_info['room_size'],
-                    previous_room_info['room_number'],
-                )
-                assigned_room_tuple = tuple(assigned_room[:4])
-
-                if assigned_room_tuple != prev_room_tuple:
-                    moved_room_info = {
-                        'from': f"{prev_room_tuple[0]}_{prev_room_tuple[1]}_{prev_room_tuple[2]}_{prev_room_tuple[3]}",
-                        'to': f"{assigned_room_tuple[0]}_{assigned_room_tuple[1]}_{assigned_room_tuple[2]}_{assigned_room_tuple[3]}",
-                    }
+            if previous_room_info and previous_room_info['room_id'] != assigned_room_info['room_id']:
+                moved_room_info = {
+                    'from': previous_room_info['room_id'],
+                    'to': assigned_room_info['room_id'],
+                }
 
             dweller_all_stats = working_stats.get(dweller_id, {})
             
@@ -1966,7 +2268,7 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
             optimization_results['dweller_assignments'].append(dweller_entry)
 
     for room_key, dwellers_in_room in sortedL.items():
-        room_id = f"{room_key[0]}_{room_key[1]}_{room_key[2]}_{room_key[3]}"
+        room_id = room_key[3]
         dweller_list = []
         for dweller_id in dwellers_in_room:
             dweller_info = next((d for d in optimization_results['dweller_assignments'] if d['id'] == dweller_id), {})
@@ -1976,10 +2278,10 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
             })
         
         optimization_results['room_assignments'][room_id] = {
+            'room_id': room_id,
             'room_type': room_key[0],
             'level': room_key[1],
             'size': room_key[2],
-            'number': room_key[3],
             'dwellers': dweller_list,
             'initial_time': initial_mean_finder.get(room_key),
             'before_balance_time': before_balancing_times.get(room_key),
@@ -1987,6 +2289,27 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
             'production_time': mean_finder_with_outfits.get(room_key)
         }
     
+    # How far each group average is from what the relaxed placement could reach
+    bound_report = {}
+    for group in BOUND_GROUPS:
+        if group not in balance_bounds:
+            continue
+        after = group_average(after_balancing_times, group)
+        with_outfits = group_average(mean_finder_with_outfits, group)
+        bound_report[group] = {
+            'bound': round(balance_bounds[group], 2) if balance_bounds[group] is not None else None,
+            'after_balance': round(after, 2) if after is not None else None,
+            'gap': production_bound.gap(after, balance_bounds[group]),
+            'bound_with_outfits': round(outfit_bounds[group], 2) if outfit_bounds.get(group) is not None else None,
+            'with_outfits': round(with_outfits, 2) if with_outfits is not None else None,
+            'gap_with_outfits': production_bound.gap(with_outfits, outfit_bounds.get(group)),
+        }
+    optimization_results['bounds'] = {
+        'epsilon': balancing_config.bound_epsilon,
+        'stopped_at_bound': stopped_at_bound,
+        'groups': bound_report,
+    }
+
     optimization_results['performance'] = {
         'initial_avg': calculate_overall_average(initial_mean_finder),
         'before_balance_avg': calculate_overall_average(before_balancing_times),
@@ -1998,21 +2321,23 @@ def run(json_path, outfitlist, vault_name, optimizer_params=None, balancing_conf
         'medbay_avg': round(med_mean_new, 2) if med_mean_new else None,
         'nukacola_avg': round(nuka_mean_new, 2) if nuka_mean_new else None
     }
+
+    phase_timer.mark('results')
+
+    # Production plot is rendered from the results by a separate sink (off / sync / background)
+    if plot_sink is None:
+        plot_sink = production_plot.default_sink()
+    plot_sink.submit(optimization_results)
+    phase_timer.mark('plot')
+    optimization_results['phase_timings'] = phase_timer.as_dict()
     
-    results_file = f"{vault_name}_optimization_results.json"
     with open(results_file, 'w') as f:
         json.dump(optimization_results, f, indent=2)
     
-    print(f"✓ Optimization results saved to {results_file}")
+    log.info("✓ Optimization results saved to %s", results_file)
+    vault_log.flush()
     
-    from VaultPerformanceTracker import VaultPerformanceTracker
-    tracker = VaultPerformanceTracker(vault_name)
-    tracker.add_cycle_data(
-        initial_avg=optimization_results['performance']['initial_avg'], 
-        before_balance_avg=optimization_results['performance']['before_balance_avg'],
-        after_balance_avg=optimization_results['performance']['after_balance_avg'],
-        with_outfits_avg=optimization_results['performance']['with_outfits_avg']
-    )
+    record_cycle(vault_name, optimization_results['performance'])
 
     conn.close()
-    return results_file
\ No newline at end of file
+    return results_file
@@ -0,0 +1,74 @@
+import heapq
+import math
+
+# Production times are rounded to 0.1s, so a room can come in up to this much under the relaxed value
+ROUNDING_SLACK = 0.05
+
+
+def room_ceiling(values, slots):
+    """Largest summed stat a room with `slots` places can reach: its share of the strongest dwellers"""
+    return sum(heapq.nlargest(slots, values))
+
+
+def min_total_time(pools, ceilings, mass):
+    """
+    Minimum of sum(pool_i / T_i) over room stat totals with sum(T_i) <= mass and T_i <= ceiling_i.
+
+    Without the ceilings the optimum is T_i proportional to sqrt(pool_i); with them the rooms
+    that would exceed their ceiling are pinned there and the rest share what is left the same way.
+    Returns None when the rooms cannot all get a positive total.
+    """
+    if mass <= 0 or any(c <= 0 for c in ceilings):
+        return None
+    if sum(ceilings) <= mass:
+        return sum(p / c for p, c in zip(pools, ceilings))
+
+    roots = [math.sqrt(p) for p in pools]
+    # Rooms whose ceiling is lowest relative to their sqrt share saturate first
+    order = sorted(range(len(pools)), key=lambda i: ceilings[i] / roots[i])
+    pinned_mass = 0.0
+    pinned_cost = 0.0
+    free_roots = sum(roots)
+    for i in order:
+        scale = (mass - pinned_mass) / free_roots
+        if roots[i] * scale <= ceilings[i]:
+            # Nobody else saturates either (they have larger ceiling / sqrt ratios)
+            return pinned_cost + free_roots * free_roots / (mass - pinned_mass)
+        pinned_mass += ceilings[i]
+        pinned_cost += pools[i] / ceilings[i]
+        free_roots -= roots[i]
+    return pinned_cost
+
+
+def group_bound(pools, slots, values, time_scale, bonuses=()):
+    """
+    Lower bound on the average production time of a group of rooms.
+
+    pools      - BASE_POOL * SIZE_MULTIPLIER of each room
+    slots      - dweller capacity of each room
+    values     - relevant stat of every dweller that could work in the group (best of the
+                 group's stats for mixed groups), with the outfits they wear now
+    time_scale - the happiness factor the production formula divides by
+    bonuses    - relevant bonus of every outfit that could still be handed out
+
+    Dwellers are treated as divisible and shareable between groups, so the true optimum can
+    only be slower. Returns None for an empty group or one that cannot be staffed.
+    """
+    if not pools:
+        return None
+    values = [v for v in values if v > 0]
+    bonuses = [b for b in bonuses if b > 0]
+    # Each slot holds one dweller wearing at most one outfit
+    mass = room_ceiling(values, sum(slots)) + room_ceiling(bonuses, sum(slots))
+    ceilings = [room_ceiling(values, s) + room_ceiling(bonuses, s) for s in slots]
+    total = min_total_time(pools, ceilings, mass)
+    if total is None:
+        return None
+    return max(0.0, total / time_scale / len(pools) - ROUNDING_SLACK)
+
+
+def gap(current, bound):
+    """Seconds the current group average is above its bound (None if either is unknown)"""
+    if current is None or bound is None:
+        return None
+    return round(current - bound, 2)
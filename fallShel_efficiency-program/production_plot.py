@@ -0,0 +1,159 @@
+import os
+import glob
+import itertools
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import vault_log
+
+log = vault_log.get_logger(__name__)
+
+PLOT_MODE_ENV = "FALLSHEL_PLOT_MODE"
+PLOT_KEEP_ENV = "FALLSHEL_PLOT_KEEP"
+PLOT_PREFIX = "vault_production_"
+
+TRAINING_ROOMS = {"Gym", "Armory", "Dojo", "Classroom"}
+SERIES = [
+    ('initial_time', "Initial", '#ff6b6b'),
+    ('before_balance_time', "Before Balancing", '#feca57'),
+    ('after_balance_time', "After Balancing", '#48dbfb'),
+    ('production_time', "With Outfits", '#1dd1a1'),
+]
+
+
+def render_production_plot(results, filename, dpi=150):
+    """
+    Draw the per-room production bar chart (initial / before / after balancing / with outfits)
+    from an optimization results dict and save it as a PNG.
+
+    Uses a bare Figure + Agg canvas instead of pyplot, so it is safe to call off the main thread.
+    """
+    import numpy as np
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    rooms = [(room_id, info) for room_id, info in results.get('room_assignments', {}).items()
+             if info.get('room_type') not in TRAINING_ROOMS and info.get('before_balance_time') is not None]
+
+    x = np.arange(len(rooms))
+    width = 0.2
+
+    fig = Figure(figsize=(14, 7))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    for i, (field, label, color) in enumerate(SERIES):
+        values = [info.get(field) if info.get(field) is not None else np.nan for _, info in rooms]
+        ax.bar(x + (i - 1.5) * width, values, width=width, label=label, color=color)
+
+    ax.set_xticks(x)
+    ax.set_xticklabels([f"{info.get('room_type')}-{info.get('level')}-{info.get('size')}-#{room_id}" for room_id, info in rooms],
+                       rotation=45, ha="right")
+    ax.set_ylabel("Production Time (s)")
+    ax.set_title("Room Production Times: Initial → Balanced → Optimized with Outfits")
+    ax.legend()
+    ax.grid(axis='y', alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(filename, dpi=dpi, bbox_inches='tight')
+    return filename
+
+
+class ProductionPlotSink:
+    """
+    Consumer of optimization results that renders the production plot.
+
+    mode:
+      'off'   - do nothing (headless / service runs)
+      'sync'  - render inside submit(), like the old placementCalc behaviour
+      'async' - hand the results to a single background worker and return immediately
+    Only the newest `keep_last` vault_production_*.png files in `output_dir` are kept.
+    """
+    MODES = ('off', 'sync', 'async')
+
+    def __init__(self, mode='async', keep_last=5, output_dir=".", dpi=150):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown plot mode '{mode}', expected one of {self.MODES}")
+        self.mode = mode
+        self.keep_last = keep_last
+        self.output_dir = output_dir
+        self.dpi = dpi
+        self._executor = None
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+
+    @property
+    def enabled(self):
+        return self.mode != 'off'
+
+    def submit(self, results):
+        """
+        Queue (or render) the plot for one results dict.
+
+        Returns the PNG path for 'sync', a Future resolving to it for 'async', None for 'off'.
+        """
+        if not self.enabled:
+            return None
+
+        # Resolve now: the caller may change directory before an async render runs
+        output_dir = os.path.abspath(self.output_dir)
+        # Microseconds plus a per-sink sequence number, so plots submitted close together never share a file
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        filename = os.path.join(output_dir, f"{PLOT_PREFIX}{timestamp}_{next(self._sequence)}.png")
+
+        if self.mode == 'sync':
+            return self._render(results, filename, output_dir)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="production-plot")
+            return self._executor.submit(self._render, results, filename, output_dir)
+
+    def _render(self, results, filename, output_dir):
+        try:
+            render_production_plot(results, filename, self.dpi)
+        except Exception as e:
+            log.error("Plot rendering failed: %s", e)
+            return None
+        log.info("\nPlot saved as: %s", filename)
+        self.prune(output_dir)
+        return filename
+
+    def prune(self, output_dir=None):
+        """Delete all but the newest `keep_last` plot images"""
+        if self.keep_last is None:
+            return 0
+        images = sorted(glob.glob(os.path.join(output_dir or self.output_dir, f"{PLOT_PREFIX}*.png")),
+                        key=lambda path: (os.path.getmtime(path), path), reverse=True)
+        removed = 0
+        for path in images[max(self.keep_last, 0):]:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def close(self, wait=True):
+        """Wait for queued plots (if asked) and stop the worker"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_default_sink = None
+
+
+def default_sink():
+    """Process-wide sink, configured from FALLSHEL_PLOT_MODE / FALLSHEL_PLOT_KEEP (async, keep 5)"""
+    global _default_sink
+    if _default_sink is None:
+        mode = os.environ.get(PLOT_MODE_ENV, 'async').strip().lower()
+        if mode not in ProductionPlotSink.MODES:
+            mode = 'async'
+        try:
+            keep = int(os.environ.get(PLOT_KEEP_ENV, 5))
+        except ValueError:
+            keep = 5
+        _default_sink = ProductionPlotSink(mode, keep_last=keep)
+    return _default_sink
@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import math
+import time
+import bisect
+import argparse
+import statistics
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from headless import HeadlessWorkspace
+from snapshot_archive import SnapshotArchive
+
+# A recorded cycle this many seconds after a snapshot was archived is the one that ran on it
+MATCH_SECONDS = 180
+
+# Chunks per worker, so a slow chunk at the end does not leave the other workers idle
+CHUNKS_PER_WORKER = 4
+
+
+def replay_chunk(task):
+    """
+    Run the cycle pipeline on several archived saves (in a worker process).
+
+    task: (archive root, [hash, ...], optimizer params)
+    Returns [(hash, {'initial_avg', 'with_outfits_avg', 'phase_timings', 'wall_time'} or None), ...].
+    """
+    root, hashes, params = task
+    archive = SnapshotArchive(root)
+    results = []
+    with HeadlessWorkspace() as ws:
+        save_path = os.path.join(ws.path, "snapshot.json")
+        for digest in hashes:
+            archive.extract(digest, save_path)
+            start = time.perf_counter()
+            outfitlist = ws.ingest(save_path)
+            run = ws.optimize(save_path, outfitlist, "replay", params)
+            elapsed = time.perf_counter() - start
+            if run is None:
+                results.append((digest, None))
+                continue
+            results.append((digest, {
+                'initial_avg': run['performance']['initial_avg'],
+                'with_outfits_avg': run['performance']['with_outfits_avg'],
+                'phase_timings': run.get('phase_timings', {}),
+                'wall_time': round(elapsed, 6),
+            }))
+    return results
+
+
+class RecordedHistory:
+    """The vault's performance history, looked up by snapshot time"""
+
+    def __init__(self, vault_name):
+        from performance_store import PerformanceStore
+        store = PerformanceStore(vault_name)
+        raw = store.history()
+        self.raw = list(zip(raw['timestamps'], raw['initial'], raw['with_outfits']))
+        self.raw_times = [datetime.fromisoformat(t) for t, _, _ in self.raw]
+        # Hourly / daily means cover the cycles older than the raw retention
+        timeline = store.timeline(max_points=math.inf)
+        self.buckets = {t: (i, w) for t, i, w in zip(timeline['timestamps'], timeline['initial'],
+                                                      timeline['with_outfits'])}
+
+    def lookup(self, timestamp):
+        """(source, initial_avg, with_outfits_avg) of the cycle that ran on a snapshot, or None"""
+        when = datetime.fromisoformat(timestamp)
+        i = bisect.bisect_left(self.raw_times, when)
+        if i < len(self.raw) and (self.raw_times[i] - when).total_seconds() <= MATCH_SECONDS:
+            return ('cycle', self.raw[i][1], self.raw[i][2])
+        for source, key in (('hourly', timestamp[:13] + ":00:00"), ('daily', timestamp[:10] + "T00:00:00")):
+            if key in self.buckets:
+                return (source,) + self.buckets[key]
+        return None
+
+
+def replay(vault_name, snapshots, params, workers=None, progress=print):
+    """
+    Replay archived snapshots (dicts from SnapshotArchive.snapshots) through placementCalc with
+    `params` and pair every result with the recorded history. Each distinct save runs once.
+    Returns the list of per-snapshot report entries, oldest first.
+    """
+    archive = SnapshotArchive()
+    hashes = list(dict.fromkeys(s['hash'] for s in snapshots))
+    workers = workers or os.cpu_count() or 1
+    per_chunk = max(1, math.ceil(len(hashes) / (workers * CHUNKS_PER_WORKER)))
+    tasks = [(archive.root, hashes[k:k + per_chunk], params) for k in range(0, len(hashes), per_chunk)]
+
+    runs = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_results in pool.map(replay_chunk, tasks):
+            runs.update(chunk_results)
+            progress(f"  {len(runs):5d}/{len(hashes)} saves replayed ({time.perf_counter() - start:.1f}s)")
+
+    recorded = RecordedHistory(vault_name)
+    entries = []
+    for snapshot in snapshots:
+        entry = {'timestamp': snapshot['timestamp'], 'hash': snapshot['hash'], 'replay': runs.get(snapshot['hash'])}
+        match = recorded.lookup(snapshot['timestamp'])
+        if match:
+            entry['recorded'] = {'source': match[0], 'initial_avg': match[1], 'with_outfits_avg': match[2]}
+        entries.append(entry)
+    return entries
+
+
+def summarize(entries):
+    """Means of the replayed and recorded averages and median phase timings"""
+    replayed = [e for e in entries if e['replay']]
+    matched = [e for e in replayed if e.get('recorded')]
+    summary = {
+        'snapshots': len(entries),
+        'replayed': len(replayed),
+        'failed': len(entries) - len(replayed),
+        'matched': len(matched),
+    }
+    if replayed:
+        summary['initial_avg'] = round(statistics.mean(e['replay']['initial_avg'] for e in replayed), 3)
+        summary['with_outfits_avg'] = round(statistics.mean(e['replay']['with_outfits_avg'] for e in replayed), 3)
+        phases = {name for e in replayed for name in e['replay']['phase_timings']}
+        summary['phase_timings'] = {name: round(statistics.median(e['replay']['phase_timings'].get(name, 0.0)
+                                                                  for e in replayed), 6) for name in sorted(phases)}
+        summary['wall_time'] = round(statistics.median(e['replay']['wall_time'] for e in replayed), 6)
+    if matched:
+        deltas = [e['replay']['with_outfits_avg'] - e['recorded']['with_outfits_avg'] for e in matched]
+        summary['recorded_with_outfits_avg'] = round(statistics.mean(e['recorded']['with_outfits_avg'] for e in matched), 3)
+        summary['with_outfits_delta'] = round(statistics.mean(deltas), 3)
+        summary['faster_than_recorded'] = sum(d < 0 for d in deltas)
+        summary['slower_than_recorded'] = sum(d > 0 for d in deltas)
+    return summary
+
+
+def compare_to_baseline(entries, baseline_entries, threshold=0.25, min_delta=0.05):
+    """
+    Compare with a previous replay report on the saves both replayed: mean with-outfits change and
+    the phases whose median got slower by more than `threshold` (fraction) and `min_delta` seconds.
+    """
+    baseline = {e['hash']: e['replay'] for e in baseline_entries if e.get('replay')}
+    pairs = [(e['replay'], baseline[e['hash']]) for e in entries if e['replay'] and e['hash'] in baseline]
+    if not pairs:
+        return None
+    comparison = {
+        'common': len(pairs),
+        'with_outfits_delta': round(statistics.mean(c['with_outfits_avg'] - b['with_outfits_avg'] for c, b in pairs), 3),
+        'regressions': [],
+    }
+    phases = {name for c, _ in pairs for name in c['phase_timings']} | {'wall_time'}
+    for phase in sorted(phases):
+        def median(side):
+            values = [(p[side]['wall_time'] if phase == 'wall_time' else p[side]['phase_timings'].get(phase))
+                      for p in pairs]
+            values = [v for v in values if v is not None]
+            return statistics.median(values) if values else None
+
+        current, previous = median(0), median(1)
+        if current is None or previous is None:
+            continue
+        delta = current - previous
+        if delta > min_delta and previous > 0 and delta / previous > threshold:
+            comparison['regressions'].append({
+                'phase': phase,
+                'baseline': round(previous, 6),
+                'current': round(current, 6),
+                'slowdown': round(delta / previous, 3),
+            })
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay archived saves through the optimizer and compare with history")
+    parser.add_argument("vault", help="Vault whose archived saves and history are replayed (e.g. Vault1)")
+    parser.add_argument("--since", help="ISO timestamp of the earliest snapshot")
+    parser.add_argument("--until", help="ISO timestamp of the latest snapshot")
+    parser.add_argument("--last", type=int, help="Only the most recent N snapshots")
+    parser.add_argument("--stride", type=int, default=1, help="Replay every Nth snapshot")
+    parser.add_argument("--params", help="Optimizer params JSON (default: the vault's current adaptive config)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--output", default="replay_report.json", help="Where to write the report JSON")
+    parser.add_argument("--baseline", help="Previous replay report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown fraction per phase")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="Ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args(argv)
+
+    if args.params:
+        with open(args.params, "r") as f:
+            params = json.load(f)
+    else:
+        from AdaptiveVaultOptimizer import AdaptiveVaultOptimizer
+        params = AdaptiveVaultOptimizer(args.vault).get_optimization_params()
+
+    snapshots = SnapshotArchive().snapshots(args.vault, args.since, args.until, args.last)[::max(1, args.stride)]
+    if not snapshots:
+        print(f"No archived snapshots of {args.vault} in that range")
+        return 1
+
+    print(f"Replaying {len(snapshots)} snapshot(s) of {args.vault} "
+          f"({snapshots[0]['timestamp']} .. {snapshots[-1]['timestamp']})")
+    start = time.perf_counter()
+    entries = replay(args.vault, snapshots, params, args.workers)
+    summary = summarize(entries)
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'vault': args.vault,
+        'params': params,
+        'summary': summary,
+        'snapshots': entries,
+    }
+
+    print(f"\n{summary['replayed']} replayed ({summary['failed']} failed) in {summary['seconds']}s")
+    if summary['replayed']:
+        print(f"  with outfits avg {summary['with_outfits_avg']:.2f}s (initial {summary['initial_avg']:.2f}s), "
+              f"median cycle {summary['wall_time']:.3f}s")
+    if summary['matched']:
+        print(f"  vs. recorded history on {summary['matched']} snapshot(s): {summary['with_outfits_delta']:+.2f}s "
+              f"({summary['faster_than_recorded']} faster, {summary['slower_than_recorded']} slower)")
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        comparison = compare_to_baseline(entries, baseline.get('snapshots', []), args.threshold, args.min_delta)
+        report['baseline'] = comparison
+        if comparison is None:
+            print(f"\n⚠ No snapshots in common with {args.baseline}")
+        else:
+            print(f"\n  vs. {args.baseline} on {comparison['common']} save(s): "
+                  f"with outfits {comparison['with_outfits_delta']:+.2f}s")
+            if comparison['regressions']:
+                exit_code = 1
+                print(f"❌ {len(comparison['regressions'])} phase regression(s):")
+                for r in comparison['regressions']:
+                    print(f"   {r['phase']:20s} {r['baseline']:.3f}s -> {r['current']:.3f}s (+{r['slowdown']:.0%})")
+            else:
+                print("✓ No phase regressions")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
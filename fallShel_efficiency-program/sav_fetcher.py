@@ -6,6 +6,9 @@ import urllib.request
 import sys
 import tempfile
 
+# Keep every distinct decrypted save in the snapshot archive (see snapshot_archive.py)
+ARCHIVE_SNAPSHOTS = True
+
 def resource_path(relative_path: str):
     """
     Return absolute path to resource, works for dev and for PyInstaller onefile.
@@ -36,9 +39,22 @@ def download_commons_codec(dest_dir: str):
         raise RuntimeError(f"Failed to download commons-codec library: {e}\n"
                            f"Please manually download from {url} and place in {dest_dir}")
 
-def run(vault_name):
+def archive_snapshot(vault_name, decrypted):
+    """Add a decrypted save to the snapshot archive; a failure here never fails the fetch"""
+    try:
+        from snapshot_archive import SnapshotArchive
+        digest, added = SnapshotArchive().add(vault_name, decrypted)
+        if added:
+            print(f"✓ Save archived as snapshot {digest[:12]}")
+    except Exception as e:
+        print(f"⚠ Could not archive the save: {e}")
+
+
+def run(vault_name, archive=None):
     """
     Decrypt a Fallout Shelter vault save file using Java and save it as JSON.
+    Each distinct save is also added to the snapshot archive unless `archive` is False
+    (default: ARCHIVE_SNAPSHOTS).
     """
     # Check if Java is installed
     java_path = shutil.which("java")
@@ -139,6 +155,10 @@ def run(vault_name):
             f.write(decrypted)
 
         print(f"✓ Save decrypted to JSON: {json_path}")
+        if archive is None:
+            archive = ARCHIVE_SNAPSHOTS
+        if archive:
+            archive_snapshot(vault_name, decrypted)
         return json_path
 
     finally:
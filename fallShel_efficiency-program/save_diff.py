@@ -0,0 +1,166 @@
+import os
+import json
+import hashlib
+from collections import Counter
+
+import vault_log
+
+log = vault_log.get_logger(__name__)
+
+# Room fields that decide the vault layout (occupants do not)
+LAYOUT_FIELDS = ("type", "class", "row", "col", "level", "mergeLevel")
+
+
+def parse_save(data):
+    """
+    The parts of a decoded save the pipeline reads, keyed for diffing:
+    {'dwellers': {id: record}, 'rooms': {deserializeID: record}, 'inventory': [[type, id], ...]}
+    Ids are strings (JSON keys); dwellers and rooms keep the save's order.
+    """
+    rooms = {}
+    room_of = {}
+    for room in data["vault"]["rooms"]:
+        members = list(room.get("dwellers", []))
+        rooms[str(room.get("deserializeID"))] = {
+            'id': room.get("deserializeID"),
+            'type': room.get("type"),
+            'class': room.get("class"),
+            'row': room.get("row"),
+            'col': room.get("col"),
+            'level': room.get("level"),
+            'mergeLevel': room.get("mergeLevel"),
+            'dwellers': members,
+        }
+        for dweller_id in members:
+            # TableSorter assigns a dweller to the first room that lists it
+            room_of.setdefault(dweller_id, room.get("type"))
+
+    dwellers = {}
+    for d in data["dwellers"]["dwellers"]:
+        serialize_id = d.get("serializeId")
+        health = d.get("health", {})
+        dwellers[str(serialize_id)] = {
+            'id': serialize_id,
+            'name': d.get("name", "") + " " + d.get("lastName", ""),
+            'health': health.get("healthValue"),
+            'maxHealth': health.get("maxHealth"),
+            'level': d.get("experience", {}).get("currentLevel"),
+            'gender': d.get("gender"),
+            'happiness': d.get("happiness", {}).get("happinessValue", 0),
+            'outfit': d.get("equipedOutfit", {}).get("id"),
+            'weapon': d.get("equipedWeapon", {}).get("id"),
+            'stats': [[s["value"], s["mod"], s["exp"]] for s in d.get("stats", {}).get("stats", [])],
+            'room': room_of.get(serialize_id),
+        }
+
+    inventory = [[item.get("type"), item.get("id")] for item in data["vault"]["inventory"]["items"]]
+    return {'dwellers': dwellers, 'rooms': rooms, 'inventory': inventory}
+
+
+def digest(parsed):
+    return hashlib.sha256(json.dumps(parsed, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _diff_records(old, new):
+    return {
+        'added': {key: record for key, record in new.items() if key not in old},
+        'removed': {key: record for key, record in old.items() if key not in new},
+        'modified': {key: record for key, record in new.items() if key in old and old[key] != record},
+    }
+
+
+class ChangeSet:
+    """
+    What changed between two consecutive saves of a vault.
+
+    dwellers / rooms - {'added': {id: record}, 'removed': {id: old record}, 'modified': {id: new record}}
+    inventory        - {'added': Counter of (type, id), 'removed': Counter of (type, id)}
+    previous         - the parsed save it was diffed against (None: no previous save, everything is added)
+    parsed, data     - the new save, parsed and as decoded from the JSON file, so later stages need not
+                       read the file again
+    base, digest     - digests of the previous and the new parsed save; a stage that kept the digest it
+                       last consumed applies the change set only when it equals `base`
+    """
+
+    def __init__(self, previous, parsed, data, base=None):
+        self.previous = previous
+        self.parsed = parsed
+        self.data = data
+        if base is None and previous is not None:
+            base = digest(previous)
+        self.base = base
+        self.digest = digest(parsed)
+        old = previous or {'dwellers': {}, 'rooms': {}, 'inventory': []}
+        self.dwellers = _diff_records(old['dwellers'], parsed['dwellers'])
+        self.rooms = _diff_records(old['rooms'], parsed['rooms'])
+        old_items = Counter(map(tuple, old['inventory']))
+        new_items = Counter(map(tuple, parsed['inventory']))
+        self.inventory = {'added': new_items - old_items, 'removed': old_items - new_items}
+
+    @property
+    def full(self):
+        return self.previous is None
+
+    @property
+    def is_empty(self):
+        return self.base == self.digest
+
+    @property
+    def layout_changed(self):
+        """True when rooms were built, destroyed, moved, merged or upgraded"""
+        if self.full or self.rooms['added'] or self.rooms['removed']:
+            return True
+        old_rooms = self.previous['rooms']
+        return any(old_rooms[key][field] != room[field]
+                   for key, room in self.rooms['modified'].items() for field in LAYOUT_FIELDS)
+
+    def summary(self):
+        if self.full:
+            return f"new save ({len(self.parsed['dwellers'])} dwellers, {len(self.parsed['rooms'])} rooms)"
+        if self.is_empty:
+            return "no changes"
+        parts = []
+        for name, changes in (("dweller", self.dwellers), ("room", self.rooms)):
+            for kind in ('added', 'removed', 'modified'):
+                if changes[kind]:
+                    parts.append(f"{len(changes[kind])} {name}(s) {kind}")
+        added, removed = sum(self.inventory['added'].values()), sum(self.inventory['removed'].values())
+        if added or removed:
+            parts.append(f"inventory +{added}/-{removed}")
+        return ", ".join(parts)
+
+    def to_dict(self):
+        """The change set without the full saves (for logs and reports)"""
+        def items(counter):
+            return [[item_type, item_id, count] for (item_type, item_id), count in sorted(counter.items(), key=str)]
+
+        return {
+            'base': self.base,
+            'digest': self.digest,
+            'dwellers': {kind: sorted(records, key=str) for kind, records in self.dwellers.items()},
+            'rooms': {kind: sorted(records, key=str) for kind, records in self.rooms.items()},
+            'inventory': {kind: items(counter) for kind, counter in self.inventory.items()},
+        }
+
+
+class SaveDiffer:
+    """Remembers the last save it parsed and turns each new one into a ChangeSet"""
+
+    def __init__(self):
+        self.previous = None
+        self.previous_digest = None
+
+    def update(self, json_path):
+        downloads_folder = os.path.expanduser(r"~\Downloads")
+        file_path = os.path.join(downloads_folder, json_path)
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return self.update_data(data)
+
+    def update_data(self, data):
+        parsed = parse_save(data)
+        changes = ChangeSet(self.previous, parsed, data, self.previous_digest)
+        self.previous = parsed
+        self.previous_digest = changes.digest
+        log.info("✓ Save changes: %s", changes.summary())
+        return changes
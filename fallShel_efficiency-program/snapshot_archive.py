@@ -0,0 +1,247 @@
+import os
+import sys
+import lzma
+import zlib
+import sqlite3
+import hashlib
+import argparse
+from contextlib import closing
+from datetime import datetime
+
+import vault_log
+
+log = vault_log.get_logger(__name__)
+
+# Seconds a writer waits for another process / thread to release the index
+BUSY_TIMEOUT = 30
+
+# Compressed bytes the archive may hold before the oldest snapshots are dropped
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Codec -> (file suffix, compress, decompress)
+CODECS = {
+    'lzma': (".json.xz", lambda data: lzma.compress(data, preset=6), lzma.decompress),
+    'zlib': (".json.z", lambda data: zlib.compress(data, 9), zlib.decompress),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    vault TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    hash TEXT NOT NULL REFERENCES blobs (hash)
+);
+CREATE INDEX IF NOT EXISTS snapshots_vault_timestamp ON snapshots (vault, timestamp);
+CREATE INDEX IF NOT EXISTS snapshots_hash ON snapshots (hash);
+"""
+
+
+def default_root():
+    """Per-user archive directory, next to the runtime outfit database"""
+    appdata = os.environ.get("APPDATA") or os.path.expanduser("~")
+    return os.path.join(appdata, "fallShel_efficiency_program", "snapshots")
+
+
+class SnapshotArchive:
+    """
+    Content-addressed archive of decrypted saves.
+
+    Every save is stored once, compressed, as objects/<hash[:2]>/<sha256><suffix>; index.db maps
+    (vault, timestamp) to the hash, so a vault that sits idle adds no new files and replay or tuning
+    tools can ask for a vault's snapshots by time. A new snapshot is only indexed when it differs
+    from the vault's latest one. When the compressed objects outgrow max_bytes the oldest snapshots
+    are dropped (never a vault's latest) and objects nothing points at any more are deleted.
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES, codec='lzma'):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r} (expected one of {', '.join(CODECS)})")
+        self.root = root or default_root()
+        self.max_bytes = max_bytes
+        self.codec = codec
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+        self.index_path = os.path.join(self.root, "index.db")
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=BUSY_TIMEOUT)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT * 1000}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def object_path(self, digest, codec):
+        return os.path.join(self.root, "objects", digest[:2], digest + CODECS[codec][0])
+
+    def add(self, vault, data, timestamp=None):
+        """
+        Archive one decrypted save (str or bytes) for a vault.
+        Returns (hash, True if a new snapshot was indexed).
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        timestamp = timestamp or datetime.now().isoformat(timespec="seconds")
+
+        with closing(self._connect()) as conn:
+            latest = conn.execute("SELECT hash FROM snapshots WHERE vault = ? ORDER BY timestamp DESC, id DESC LIMIT 1",
+                                  (vault,)).fetchone()
+            if latest and latest[0] == digest:
+                return digest, False
+
+            stored = conn.execute("SELECT codec FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            if stored is None or not os.path.exists(self.object_path(digest, stored[0])):
+                # Written outside the transaction: compressing a few MB takes a while, and a
+                # concurrent writer of the same save writes identical bytes
+                compressed = CODECS[self.codec][1](data)
+                path = self.object_path(digest, self.codec)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(compressed)
+                os.replace(tmp_path, path)
+                stored = None
+                blob = (digest, self.codec, len(data), len(compressed))
+
+            with conn:
+                if stored is None:
+                    conn.execute("INSERT OR REPLACE INTO blobs (hash, codec, size, stored) VALUES (?, ?, ?, ?)", blob)
+                conn.execute("INSERT INTO snapshots (vault, timestamp, hash) VALUES (?, ?, ?)",
+                             (vault, timestamp, digest))
+            self._enforce_budget(conn)
+        return digest, True
+
+    def _enforce_budget(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(stored), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        removed = []
+        with conn:
+            # Oldest first, skipping each vault's latest snapshot
+            candidates = conn.execute("""
+                SELECT id, hash FROM snapshots s
+                WHERE id != (SELECT id FROM snapshots l WHERE l.vault = s.vault ORDER BY timestamp DESC, id DESC LIMIT 1)
+                ORDER BY timestamp, id
+            """).fetchall()
+            for snapshot_id, digest in candidates:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM snapshots WHERE id = ?", (snapshot_id,))
+                if conn.execute("SELECT 1 FROM snapshots WHERE hash = ? LIMIT 1", (digest,)).fetchone():
+                    continue
+                codec, stored = conn.execute("SELECT codec, stored FROM blobs WHERE hash = ?", (digest,)).fetchone()
+                conn.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+                removed.append((digest, codec))
+                total -= stored
+        for digest, codec in removed:
+            try:
+                os.remove(self.object_path(digest, codec))
+            except FileNotFoundError:
+                pass
+        if removed:
+            log.info("🗑  Snapshot archive over budget - dropped %d old save(s)", len(removed))
+
+    def snapshots(self, vault=None, since=None, until=None, limit=None):
+        """
+        Indexed snapshots, oldest first, as dicts (id, vault, timestamp, hash, size, stored).
+        `limit` keeps only the most recent ones.
+        """
+        query = ("SELECT s.id, s.vault, s.timestamp, s.hash, b.size, b.stored "
+                 "FROM snapshots s JOIN blobs b ON b.hash = s.hash WHERE 1 = 1")
+        args = []
+        if vault:
+            query += " AND s.vault = ?"
+            args.append(vault)
+        if since:
+            query += " AND s.timestamp >= ?"
+            args.append(since)
+        if until:
+            query += " AND s.timestamp <= ?"
+            args.append(until)
+        query += " ORDER BY s.timestamp DESC, s.id DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query, args).fetchall()
+        keys = ('id', 'vault', 'timestamp', 'hash', 'size', 'stored')
+        return [dict(zip(keys, row)) for row in reversed(rows)]
+
+    def load(self, digest):
+        """The decrypted save (bytes) stored under a hash"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT codec FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        if row is None:
+            raise KeyError(f"No archived save with hash {digest}")
+        with open(self.object_path(digest, row[0]), "rb") as f:
+            return CODECS[row[0]][2](f.read())
+
+    def extract(self, digest, dest):
+        """Write an archived save to `dest` as plain JSON (what placementCalc & co. read); returns dest"""
+        data = self.load(digest)
+        with open(dest, "wb") as f:
+            f.write(data)
+        return dest
+
+    def export(self, vault, dest_dir, limit=None, since=None, until=None):
+        """Extract a vault's snapshots into dest_dir as <vault>_<timestamp>.json; returns the paths"""
+        os.makedirs(dest_dir, exist_ok=True)
+        paths = []
+        for snapshot in self.snapshots(vault, since, until, limit):
+            name = f"{vault}_{snapshot['timestamp'].replace(':', '-')}_{snapshot['id']}.json"
+            paths.append(self.extract(snapshot['hash'], os.path.join(dest_dir, name)))
+        return paths
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            snapshots = conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+            blobs, size, stored = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored), 0) FROM blobs").fetchone()
+        return {'snapshots': snapshots, 'distinct_saves': blobs, 'raw_bytes': size, 'stored_bytes': stored,
+                'max_bytes': self.max_bytes}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and export the archive of decrypted vault saves")
+    parser.add_argument("--root", help="Archive directory (default: %s)" % default_root())
+    sub = parser.add_subparsers(dest="command", required=True)
+    list_cmd = sub.add_parser("list", help="List archived snapshots")
+    list_cmd.add_argument("vault", nargs="?")
+    list_cmd.add_argument("--last", type=int, help="Only the most recent N")
+    export_cmd = sub.add_parser("export", help="Extract a vault's snapshots as JSON files")
+    export_cmd.add_argument("vault")
+    export_cmd.add_argument("dest", help="Directory to write the JSON files to")
+    export_cmd.add_argument("--last", type=int, help="Only the most recent N")
+    export_cmd.add_argument("--since", help="ISO timestamp of the earliest snapshot")
+    export_cmd.add_argument("--until", help="ISO timestamp of the latest snapshot")
+    extract_cmd = sub.add_parser("extract", help="Extract one snapshot by hash")
+    extract_cmd.add_argument("hash")
+    extract_cmd.add_argument("dest")
+    sub.add_parser("stats", help="Show archive size")
+    args = parser.parse_args(argv)
+
+    archive = SnapshotArchive(args.root)
+    if args.command == "list":
+        for s in archive.snapshots(args.vault, limit=args.last):
+            print(f"{s['timestamp']}  {s['vault']:<10} {s['hash'][:12]}  {s['size'] / 1e6:6.2f} MB -> {s['stored'] / 1e6:6.2f} MB")
+    elif args.command == "export":
+        paths = archive.export(args.vault, args.dest, args.last, args.since, args.until)
+        print(f"✓ Exported {len(paths)} snapshot(s) to {args.dest}")
+    elif args.command == "extract":
+        print(f"✓ Extracted to {archive.extract(args.hash, args.dest)}")
+    else:
+        stats = archive.stats()
+        print(f"{stats['snapshots']} snapshot(s) of {stats['distinct_saves']} distinct save(s): "
+              f"{stats['raw_bytes'] / 1e6:.1f} MB stored as {stats['stored_bytes'] / 1e6:.1f} MB "
+              f"(budget {stats['max_bytes'] / 1e6:.0f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3 @@
+# SPECIAL stat names in save-file order: a dweller's stats list and the StatHistory stat column index into this.
+# TableSorter stores the names in vault.db as spelled here ("Chrisma" included), so do not correct them.
+SPECIAL = ["Luck", "Strength", "Perception", "Endurance", "Chrisma", "Intelligence", "Agility"]
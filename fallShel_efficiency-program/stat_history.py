@@ -0,0 +1,206 @@
+import sys
+import time
+import sqlite3
+import argparse
+from contextlib import closing
+
+import vault_log
+from special_stats import SPECIAL
+
+log = vault_log.get_logger(__name__)
+
+# A stat whose value and mod are unchanged is only re-recorded for its Exp this often (seconds)
+MIN_EXP_INTERVAL = 600
+
+DAY = 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS StatHistory (
+    vault TEXT NOT NULL,
+    dweller_id INTEGER NOT NULL,
+    stat INTEGER NOT NULL,  -- index into special_stats.SPECIAL
+    ts INTEGER NOT NULL,    -- unix seconds
+    value INTEGER,
+    mod INTEGER,
+    exp REAL,
+    rise INTEGER NOT NULL DEFAULT 0,  -- 1 where the value went up (a level-up)
+    PRIMARY KEY (vault, dweller_id, stat, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS StatHistory_rises ON StatHistory (vault, dweller_id, stat, ts) WHERE rise = 1;
+CREATE TABLE IF NOT EXISTS StatLatest (
+    vault TEXT NOT NULL,
+    dweller_id INTEGER NOT NULL,
+    stat INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    value INTEGER,
+    mod INTEGER,
+    exp REAL,
+    PRIMARY KEY (vault, dweller_id, stat)
+) WITHOUT ROWID;
+"""
+
+
+def create_schema(conn):
+    conn.executescript(SCHEMA)
+
+
+def stat_index(stat):
+    """Index of a stat given by name (as in SPECIAL, case-insensitive) or index"""
+    if isinstance(stat, int):
+        return stat
+    names = [name.lower() for name in SPECIAL]
+    if stat.lower() not in names:
+        raise ValueError(f"Unknown stat {stat!r} (expected one of {', '.join(SPECIAL)})")
+    return names.index(stat.lower())
+
+
+def record(conn, vault, dwellers, ts=None):
+    """
+    Append the stats of these dwellers (save_diff dweller records) that changed since they were last
+    recorded. Value or mod changes are always kept; Exp-only changes at most every MIN_EXP_INTERVAL.
+    Runs in the caller's transaction. Returns the number of rows appended.
+    """
+    ts = int(ts if ts is not None else time.time())
+    dwellers = list(dwellers)
+    if not dwellers:
+        return 0
+    latest = {}
+    if len(dwellers) > 50:
+        rows = conn.execute("SELECT dweller_id, stat, ts, value, mod, exp FROM StatLatest WHERE vault = ?", (vault,))
+    else:
+        marks = ", ".join("?" * len(dwellers))
+        rows = conn.execute(f"SELECT dweller_id, stat, ts, value, mod, exp FROM StatLatest "
+                            f"WHERE vault = ? AND dweller_id IN ({marks})", [vault] + [d['id'] for d in dwellers])
+    for dweller_id, stat, last_ts, value, mod, exp in rows:
+        latest[(dweller_id, stat)] = (last_ts, value, mod, exp)
+
+    appended = []
+    for d in dwellers:
+        for stat, (value, mod, exp) in enumerate(d['stats'][:len(SPECIAL)]):
+            last = latest.get((d['id'], stat))
+            if last is not None:
+                last_ts, last_value, last_mod, last_exp = last
+                if (value, mod) == (last_value, last_mod):
+                    if exp == last_exp or ts - last_ts < MIN_EXP_INTERVAL:
+                        continue
+                if ts <= last_ts:
+                    continue
+            rise = int(last is not None and value > last[1])
+            appended.append((vault, d['id'], stat, ts, value, mod, exp, rise))
+
+    conn.executemany("INSERT OR REPLACE INTO StatHistory (vault, dweller_id, stat, ts, value, mod, exp, rise) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", appended)
+    conn.executemany("INSERT OR REPLACE INTO StatLatest (vault, dweller_id, stat, ts, value, mod, exp) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?)", [row[:7] for row in appended])
+    return len(appended)
+
+
+def series(conn, vault, dweller_id, stat, since=None):
+    """[(ts, value, mod, exp), ...] of one dweller's stat, oldest first"""
+    return conn.execute("SELECT ts, value, mod, exp FROM StatHistory WHERE vault = ? AND dweller_id = ? AND stat = ? "
+                        "AND ts >= ? ORDER BY ts", (vault, dweller_id, stat_index(stat), since or 0)).fetchall()
+
+
+def eta(conn, vault, dweller_id, stat, target=10, days=14, now=None):
+    """
+    Seconds until a dweller's stat reaches `target` at the pace of its level-ups over the last `days`
+    (0 if it is there or overdue, None without two level-ups to measure the pace from).
+    """
+    now = int(now if now is not None else time.time())
+    args = (vault, dweller_id, stat_index(stat))
+    latest = conn.execute("SELECT value FROM StatLatest WHERE vault = ? AND dweller_id = ? AND stat = ?", args).fetchone()
+    if latest is None:
+        return None
+    if latest[0] >= target:
+        return 0
+    rises = [ts for ts, in conn.execute("SELECT ts FROM StatHistory WHERE vault = ? AND dweller_id = ? AND stat = ? "
+                                        "AND ts >= ? AND rise = 1 ORDER BY ts", args + (now - days * DAY,))]
+    if len(rises) < 2:
+        return None
+    per_point = (rises[-1] - rises[0]) / (len(rises) - 1)
+    return max(0, round((target - latest[0]) * per_point - (now - rises[-1])))
+
+
+def fastest_growing(conn, vault, days=7, stat=None, limit=10, now=None):
+    """
+    Dweller stats that gained the most points per day over the last `days`:
+    [{'dweller_id', 'name', 'stat', 'value', 'gained', 'per_day'}, ...], fastest first.
+    """
+    now = int(now if now is not None else time.time())
+    start = now - days * DAY
+    query = """
+        SELECT l.dweller_id, l.stat, l.value, d.Fullname,
+            (SELECT h.value FROM StatHistory h WHERE h.vault = l.vault AND h.dweller_id = l.dweller_id
+                AND h.stat = l.stat AND h.ts <= :start ORDER BY h.ts DESC LIMIT 1),
+            (SELECT h.ts || ' ' || h.value FROM StatHistory h WHERE h.vault = l.vault AND h.dweller_id = l.dweller_id
+                AND h.stat = l.stat AND h.ts > :start ORDER BY h.ts LIMIT 1)
+        FROM StatLatest l LEFT JOIN dwellers d ON d.dweller_id = l.dweller_id
+        WHERE l.vault = :vault AND l.ts > :start
+    """
+    args = {'vault': vault, 'start': start}
+    if stat is not None:
+        query += " AND l.stat = :stat"
+        args['stat'] = stat_index(stat)
+
+    growth = []
+    for dweller_id, index, value, name, start_value, first in conn.execute(query, args):
+        if start_value is not None:
+            since = start
+        elif first is not None:
+            # First recorded inside the window: measure from there
+            first_ts, start_value = map(int, first.split())
+            since = first_ts
+        else:
+            continue
+        gained = value - start_value
+        elapsed = max(now - since, 1)
+        if gained > 0:
+            growth.append({'dweller_id': dweller_id, 'name': name, 'stat': SPECIAL[index],
+                           'value': value, 'gained': gained, 'per_day': round(gained * DAY / elapsed, 3)})
+    growth.sort(key=lambda g: (-g['per_day'], g['dweller_id']))
+    return growth[:limit]
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "unknown"
+    hours, rest = divmod(int(seconds), 3600)
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h {rest // 60}m" if days else f"{hours}h {rest // 60}m"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dweller stat growth from the stat history in vault.db")
+    parser.add_argument("--db", default="vault.db", help="Database TableSorter writes to (default: ./vault.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fastest_cmd = sub.add_parser("fastest", help="Fastest-growing dweller stats")
+    fastest_cmd.add_argument("vault")
+    fastest_cmd.add_argument("--days", type=float, default=7)
+    fastest_cmd.add_argument("--stat")
+    fastest_cmd.add_argument("--top", type=int, default=10)
+    eta_cmd = sub.add_parser("eta", help="Time until a dweller's stat reaches a target")
+    eta_cmd.add_argument("vault")
+    eta_cmd.add_argument("dweller_id", type=int)
+    eta_cmd.add_argument("stat")
+    eta_cmd.add_argument("--target", type=int, default=10)
+    eta_cmd.add_argument("--days", type=float, default=14, help="Window the pace is measured over")
+    args = parser.parse_args(argv)
+    try:
+        stat = stat_index(args.stat) if args.stat is not None else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    with closing(sqlite3.connect(args.db)) as conn:
+        create_schema(conn)
+        if args.command == "fastest":
+            for g in fastest_growing(conn, args.vault, args.days, stat, args.top):
+                print(f"{g['name'] or g['dweller_id']:<30} {g['stat']:<12} {g['value']:3d} "
+                      f"(+{g['gained']}, {g['per_day']:.2f}/day)")
+        else:
+            seconds = eta(conn, args.vault, args.dweller_id, stat, args.target, args.days)
+            print(f"{SPECIAL[stat]} {args.target} in {format_duration(seconds)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
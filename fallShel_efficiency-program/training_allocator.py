@@ -0,0 +1,108 @@
+import numpy as np
+
+# Training room code -> the stat it trains; columns of the value / exp arrays follow TRAINING_STATS
+TRAINING_STATS = ("Strength", "Perception", "Agility", "Intelligence")
+ROOM_STAT = {"Gym": "Strength", "Armory": "Perception", "Dojo": "Agility", "Classroom": "Intelligence"}
+
+# Exp a stat needs for its next point is POINT_EXP * current value; a level 1 single room
+# adds one Exp per second (so 9 -> 10 takes 4.5 hours there)
+POINT_EXP = 1800
+MAX_STAT = 10
+
+# Training speed by room level, and by size for the group bonus of a full room (2% per extra trainee)
+LEVEL_SPEED = {'lvl1': 1.0, 'lvl2': 1.15, 'lvl3': 1.35}
+SIZE_SPEED = {'size3': 1.02, 'size6': 1.06, 'size9': 1.10}
+
+
+def room_speed(room_key):
+    """Exp per second a dweller gains in a training room (room keys are (type, lvlX, sizeY, room_id))"""
+    return LEVEL_SPEED.get(room_key[1], 1.0) * SIZE_SPEED.get(room_key[2], 1.0)
+
+
+def time_to_next_point(values, exps, rooms):
+    """
+    Seconds each dweller needs for its next point of each room's stat, in one pass.
+
+    values, exps - (dwellers, len(TRAINING_STATS)) arrays of base stat values (no outfit) and Exp
+    rooms        - training room keys
+    Returns a (dwellers, rooms) float array; inf where the stat is already at MAX_STAT.
+    """
+    columns = np.array([TRAINING_STATS.index(ROOM_STAT[room[0]]) for room in rooms], dtype=np.intp)
+    speeds = np.array([room_speed(room) for room in rooms], dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)[:, columns]
+    exps = np.asarray(exps, dtype=np.float64)[:, columns]
+    remaining = np.maximum(values * POINT_EXP - exps, 0.0)
+    times = remaining / speeds
+    times[values >= MAX_STAT] = np.inf
+    return times
+
+
+def min_cost_assignment(cost):
+    """
+    Rows and columns of a minimum-cost matching of every row of `cost` (rows <= columns) to a
+    distinct column: shortest augmenting paths with potentials, each step vectorised over columns.
+    """
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=np.intp)  # row (1-based) matched to each column, 0 = none
+    way = np.zeros(m + 1, dtype=np.intp)
+    for row in range(1, n + 1):
+        match[0] = row
+        col = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[col] = True
+            current = match[col]
+            reduced = cost[current - 1] - u[current] - v[1:]
+            free = ~used[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = col
+            candidates = np.where(free, minv[1:], np.inf)
+            nxt = int(np.argmin(candidates)) + 1
+            delta = candidates[nxt - 1]
+            u[match[used]] += delta
+            v[used] -= delta
+            minv[~used] -= delta
+            col = nxt
+            if match[col] == 0:
+                break
+        while col:
+            previous = way[col]
+            match[col] = match[previous]
+            col = previous
+    cols = np.flatnonzero(match[1:])
+    return match[1:][cols] - 1, cols
+
+
+def allocate(rooms, free_slots, values, exps):
+    """
+    Place dwellers in training rooms so the summed time to everyone's next point is smallest.
+
+    rooms      - training room keys
+    free_slots - places left in each room
+    values     - (dwellers, len(TRAINING_STATS)) base stat values of the dwellers to place
+    exps       - matching Exp
+    Every slot is filled while there are dwellers with something left to train; when there are
+    more dwellers than slots, the ones closest to their next point get them.
+    Returns ([(dweller index, room index), ...], summed seconds).
+    """
+    slot_room = np.repeat(np.arange(len(rooms)), np.maximum(np.asarray(free_slots, dtype=np.intp), 0))
+    if not len(slot_room) or not len(values):
+        return [], 0.0
+    times = time_to_next_point(values, exps, rooms)[:, slot_room]
+    trainable = np.isfinite(times)
+    # Maxed stats get a cost no real pairing reaches, so they are only used to pad the matching
+    cost = np.where(trainable, times, (np.nanmax(np.where(trainable, times, 0.0)) + 1.0) * times.size)
+
+    if cost.shape[0] <= cost.shape[1]:
+        dwellers, slots = min_cost_assignment(cost)
+    else:
+        slots, dwellers = min_cost_assignment(cost.T)
+    keep = trainable[dwellers, slots]
+    dwellers, slots = dwellers[keep], slots[keep]
+    order = np.lexsort((dwellers, slot_room[slots]))
+    pairs = [(int(dwellers[k]), int(slot_room[slots[k]])) for k in order]
+    return pairs, float(times[dwellers, slots].sum())
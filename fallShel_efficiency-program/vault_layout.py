@@ -0,0 +1,247 @@
+import json
+import hashlib
+
+import numpy as np
+
+LAYOUT_FILE = "vault_layout.json"
+LAYOUT_VERSION = 1
+
+ROWS = 25  # floors
+COLUMNS = 26  # width
+
+# Order of the per-room fields in the compact on-disk format
+FIELDS = ("type", "class", "level", "mergeLevel", "row", "col", "width", "deserializeID")
+
+SIZE_BY_MERGE = {1: "size3", 2: "size6", 3: "size9"}
+
+
+def room_width(room_type, merge_level):
+    """Number of grid cells a room covers"""
+    if room_type == "Elevator":
+        return 1
+    return 3 * (merge_level or 0)
+
+
+def build_layout(rooms):
+    """
+    Turn the save's vault.rooms list into the structured layout: one dict per room
+    with type, class, level, mergeLevel, row, col, width and deserializeID,
+    in grid scan order (top floor first, left to right).
+    """
+    layout = []
+    for room in rooms:
+        room_type = room.get("type")
+        merge_level = room.get("mergeLevel")
+        layout.append({
+            "type": room_type,
+            "class": room.get("class"),
+            "level": room.get("level"),
+            "mergeLevel": merge_level,
+            "row": room.get("row"),
+            "col": room.get("col"),
+            "width": room_width(room_type, merge_level),
+            "deserializeID": room.get("deserializeID"),
+        })
+    layout.sort(key=lambda r: (r["row"] if r["row"] is not None else -1, r["col"] if r["col"] is not None else -1))
+    return layout
+
+
+def save_layout(layout, path=LAYOUT_FILE):
+    """Write the layout as one row of values per room (see FIELDS)"""
+    payload = {
+        "version": LAYOUT_VERSION,
+        "fields": list(FIELDS),
+        "rooms": [[room.get(f) for f in FIELDS] for room in layout],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    return path
+
+
+def load_layout(path=LAYOUT_FILE):
+    """Read a layout written by save_layout back into a list of room dicts"""
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    fields = payload.get("fields", FIELDS)
+    return [dict(zip(fields, values)) for values in payload.get("rooms", [])]
+
+
+def level_str(room):
+    """'lvl1'..'lvl3' as used in placementCalc room keys (anything else counts as level 1)"""
+    level = room.get("level")
+    return f"lvl{level if level in (2, 3) else 1}"
+
+
+def size_str(room):
+    """'size3' / 'size6' / 'size9' as used in placementCalc room keys"""
+    return SIZE_BY_MERGE.get(room.get("mergeLevel"), "size3")
+
+
+def room_id(room):
+    """Stable room identity: the save's deserializeID as a string (survives moves in the room list)"""
+    return str(room.get("deserializeID"))
+
+
+def room_key(room):
+    """placementCalc room key: (type, lvlX, sizeY, room_id)"""
+    return (room.get("type"), level_str(room), size_str(room), room_id(room))
+
+
+def describe_room(info):
+    """
+    Readable label for a room entry from the optimization results
+    (room_assignments value, or a dweller's assigned_room / previous_room).
+    """
+    if not info:
+        return "?"
+    level = info.get("room_level", info.get("level", "?"))
+    size = info.get("room_size", info.get("size", "?"))
+    level = level.replace("lvl", "Lv.") if isinstance(level, str) else f"Lv.{level}"
+    size = size.replace("size", "×") if isinstance(size, str) else f"×{size}"
+    return f"{info.get('room_type', '?')} {level} {size} #{info.get('room_id', '?')}"
+
+
+def layout_fingerprint(layout):
+    """
+    Hash of everything that changes how the map looks (room type, level, merge and position).
+    Stays the same across cycles until rooms are built, merged, upgraded or destroyed.
+    """
+    h = hashlib.sha1()
+    for room in sorted(layout, key=lambda r: (r.get("row") or 0, r.get("col") or 0, r.get("type") or "")):
+        h.update(f"{room.get('type')}|{room.get('level')}|{room.get('mergeLevel')}|"
+                 f"{room.get('row')}|{room.get('col')}|{room.get('width')};".encode("utf-8"))
+    return h.hexdigest()
+
+
+def palette_color(label):
+    """Deterministic '#rrggbb' colour for a room label, identical on every run"""
+    digest = hashlib.md5(label.lower().encode("utf-8")).digest()
+    # Keep channels in 48..239 so colours are neither black nor white against the grid
+    r, g, b = (48 + digest[i] % 192 for i in range(3))
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+class VaultLayout:
+    """
+    Room table plus a ROWS x COLUMNS occupancy grid.
+
+    grid[row, col] holds the index of the room covering that cell in `rooms`
+    (EMPTY for no room), so cell lookups and neighbour queries are plain array
+    indexing instead of re-scanning the room list. Iterating a VaultLayout yields
+    the room dicts in grid scan order, like the list from build_layout.
+    """
+    EMPTY = -1
+
+    def __init__(self, rooms=(), rows=ROWS, columns=COLUMNS):
+        self.rooms = list(rooms)
+        self.rows = rows
+        self.columns = columns
+        self.grid = np.full((rows, columns), self.EMPTY, dtype=np.int16)
+        for index, room in enumerate(self.rooms):
+            row, col = room.get("row"), room.get("col")
+            if row is None or col is None or not 0 <= row < rows:
+                continue
+            start, end = max(0, col), min(columns, col + (room.get("width") or 0))
+            if start < end:
+                self.grid[row, start:end] = index
+
+    @classmethod
+    def from_save(cls, rooms):
+        """Layout for the save's vault.rooms list"""
+        return cls(build_layout(rooms))
+
+    @classmethod
+    def load(cls, path=LAYOUT_FILE):
+        return cls(load_layout(path))
+
+    @classmethod
+    def coerce(cls, layout):
+        """Accept a VaultLayout or a plain list of room dicts"""
+        if isinstance(layout, cls):
+            return layout
+        return cls(layout or ())
+
+    def save(self, path=LAYOUT_FILE):
+        return save_layout(self.rooms, path)
+
+    def __iter__(self):
+        return iter(self.rooms)
+
+    def __len__(self):
+        return len(self.rooms)
+
+    def __getitem__(self, index):
+        return self.rooms[index]
+
+    def index_at(self, row, col):
+        """Index of the room covering (row, col), or EMPTY"""
+        if not (0 <= row < self.rows and 0 <= col < self.columns):
+            return self.EMPTY
+        return int(self.grid[row, col])
+
+    def room_at(self, row, col):
+        """Room dict covering (row, col), or None"""
+        index = self.index_at(row, col)
+        return None if index == self.EMPTY else self.rooms[index]
+
+    def cells(self, index):
+        """(row, start_col, end_col) of the cells a room actually occupies on the grid, or None"""
+        row = self.rooms[index].get("row")
+        if row is None or not 0 <= row < self.rows:
+            return None
+        cols = np.flatnonzero(self.grid[row] == index)
+        if not cols.size:
+            return None
+        return row, int(cols[0]), int(cols[-1]) + 1
+
+    def neighbours(self, index):
+        """Indices of the rooms sharing an edge with room `index` (left/right and above/below)"""
+        span = self.cells(index)
+        if span is None:
+            return []
+        row, start, end = span
+        found = set()
+        for c in (start - 1, end):
+            found.add(self.index_at(row, c))
+        for r in (row - 1, row + 1):
+            if 0 <= r < self.rows:
+                found.update(self.grid[r, start:end].tolist())
+        found.discard(self.EMPTY)
+        found.discard(index)
+        return sorted(found)
+
+    def merge_neighbours(self, index):
+        """
+        Side neighbours the room could merge with: same type and level, and the
+        merged room would still be at most 3 wide (mergeLevel 1+1, 1+2 or 2+1).
+        """
+        span = self.cells(index)
+        if span is None:
+            return []
+        room = self.rooms[index]
+        row, start, end = span
+        result = []
+        for c in (start - 1, end):
+            other_index = self.index_at(row, c)
+            if other_index == self.EMPTY:
+                continue
+            other = self.rooms[other_index]
+            if (other.get("type") == room.get("type") and other.get("level") == room.get("level")
+                    and (other.get("mergeLevel") or 0) + (room.get("mergeLevel") or 0) <= 3):
+                result.append(other_index)
+        return result
+
+    def colour_image(self, colours, cell_w, cell_h, empty=(255, 255, 255), outline=(0, 0, 0)):
+        """
+        RGB uint8 array of the grid: each room's cells filled with colours[index]
+        (an (r, g, b) tuple per room), cell borders drawn in `outline`.
+        The array is rows*cell_h + 1 pixels high so the bottom border is included.
+        """
+        palette = np.array([empty] + list(colours), dtype=np.uint8).reshape(-1, 3)
+        height, width = self.rows * cell_h + 1, self.columns * cell_w
+        row_of = np.minimum(np.arange(height) // cell_h, self.rows - 1)
+        col_of = np.arange(width) // cell_w
+        image = palette[self.grid[row_of][:, col_of].astype(np.intp) + 1]
+        image[::cell_h, :] = outline
+        image[:, ::cell_w] = outline
+        return image
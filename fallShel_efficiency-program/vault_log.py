@@ -0,0 +1,84 @@
+import os
+import sys
+import logging
+import logging.handlers
+
+ROOT_LOGGER = "fallShel"
+LEVEL_ENV = "FALLSHEL_LOG_LEVEL"
+DEFAULT_LEVEL = logging.INFO
+BUFFER_CAPACITY = 200
+
+_configured = False
+
+
+class _StdoutHandler(logging.Handler):
+    """Writes bare messages to whatever sys.stdout is at emit time (so redirects keep working)"""
+
+    def emit(self, record):
+        try:
+            sys.stdout.write(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        try:
+            sys.stdout.flush()
+        except Exception:
+            pass
+
+
+def _resolve_level(level):
+    if level is None:
+        level = os.environ.get(LEVEL_ENV, DEFAULT_LEVEL)
+    if isinstance(level, str):
+        level = logging.getLevelName(level.strip().upper())
+        if not isinstance(level, int):
+            level = DEFAULT_LEVEL
+    return level
+
+
+def configure(level=None, capacity=BUFFER_CAPACITY):
+    """
+    Set up the program's log output.
+
+    Messages go through a MemoryHandler that holds up to `capacity` records and
+    writes them to stdout in one go (immediately for warnings and errors).
+    `level` may be a logging level or name; it defaults to $FALLSHEL_LOG_LEVEL or INFO.
+    Use DEBUG to get the per-dweller / per-room / per-swap output back.
+    """
+    global _configured
+    root = logging.getLogger(ROOT_LOGGER)
+    for handler in list(root.handlers):
+        handler.flush()
+        root.removeHandler(handler)
+        handler.close()
+
+    target = _StdoutHandler()
+    target.setFormatter(logging.Formatter("%(message)s"))
+    buffered = logging.handlers.MemoryHandler(capacity, flushLevel=logging.WARNING, target=target)
+
+    root.addHandler(buffered)
+    root.setLevel(_resolve_level(level))
+    root.propagate = False
+    _configured = True
+    return root
+
+
+def set_level(level):
+    """Change the verbosity at runtime"""
+    get_logger().setLevel(_resolve_level(level))
+
+
+def get_logger(name=None):
+    """Logger under the program's root logger, configured with defaults on first use"""
+    if not _configured:
+        configure()
+    if not name:
+        return logging.getLogger(ROOT_LOGGER)
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def flush():
+    """Push any buffered records to stdout (call at the end of a stage or before exiting)"""
+    for handler in logging.getLogger(ROOT_LOGGER).handlers:
+        handler.flush()
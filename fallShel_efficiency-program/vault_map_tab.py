@@ -2,6 +2,7 @@ import json
 import os
 from typing import Self
 import virtualvaultmap
+import vault_layout
 
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QScrollArea,
@@ -200,7 +201,7 @@ class VaultGridWidget(QWidget):
 
 
     def set_vault_design(self, design):
-        self.vault_design = design
+        self.vault_design = vault_layout.VaultLayout.coerce(design) if design is not None else None
         self.rebuild()
     # ─────────────────────────────────────────
     def _build_base_grid(self):
@@ -222,31 +223,9 @@ class VaultGridWidget(QWidget):
 
     # ─────────────────────────────────────────
 
-    @staticmethod
-    def _size_str(width_cols: int) -> str:
-        """Convert vault_design grid width (columns) to size string used by placementCalc."""
-        if width_cols >= 9:
-            return "size9"
-        if width_cols >= 6:
-            return "size6"
-        return "size3"
-
-    @staticmethod
-    def _lvl_str(room_level) -> str:
-        """Normalise a room level value to 'lvlX'."""
-        if isinstance(room_level, str) and room_level.startswith("lvl"):
-            return room_level
-        try:
-            v = int(room_level)
-            if v in (1, 2, 3):
-                return f"lvl{v}"
-        except (TypeError, ValueError):
-            pass
-        return "lvl1"
-
     def rebuild(self, room_assignments=None, dweller_assignments=None):
-        """Rebuild the grid, matching vault_design rooms to optimization data using
-        the same (type, level, size, ordinal-number) key scheme as placementCalc."""
+        """Rebuild the grid, matching vault_design rooms to optimization data by
+        room id (the save's deserializeID), the same key placementCalc uses."""
 
         # ── Remove old room cells ────────────────────────────────────────────
         for cell in self._cells:
@@ -257,84 +236,52 @@ class VaultGridWidget(QWidget):
             print("WARNING: No vault_design available")
             return
 
-        # ── Build a fast lookup: canonical_room_key -> room_assignment dict ──
-        # room_assignments keys look like "Geothermal_lvl3_size3_1"
-        opt_by_key = {}
-        if room_assignments:
-            for ra_key, ra_data in room_assignments.items():
-                opt_by_key[ra_key] = ra_data
+        # room_assignments is keyed by room id already
+        opt_by_id = room_assignments or {}
 
-        # ── Build a fast lookup: canonical_room_key -> [full dweller dicts] ──
-        # Each dweller's assigned_room has {room_type, room_level, room_size, room_number}
-        dwellers_by_room = {}   # canonical_key -> [dweller_entry, ...]
+        # ── Build a fast lookup: room_id -> [full dweller dicts] ─────────────
+        dwellers_by_room = {}
         if dweller_assignments:
             for dw in dweller_assignments:
                 ar = dw.get("assigned_room")
-                if not ar:
-                    continue
-                key = (
-                    f"{ar['room_type']}"
-                    f"_{self._lvl_str(ar['room_level'])}"
-                    f"_{ar['room_size']}"
-                    f"_{ar['room_number']}"
-                )
-                dwellers_by_room.setdefault(key, []).append(dw)
-
-        # ── Assign ordinal numbers to vault_design rooms ─────────────────────
-        # placementCalc numbers rooms with the same (type, level, size) in the
-        # order they are encountered scanning left-to-right, top-to-bottom.
-        # vault_design is already in that order, so we just count.
-        ordinal_counter = {}   # (type, lvl_str, size_str) -> running count
+                if ar:
+                    dwellers_by_room.setdefault(ar.get("room_id"), []).append(dw)
 
-        # Sort vault_design by (row, col) to guarantee scan order
-        sorted_design = sorted(self.vault_design, key=lambda r: (r.get("row", 0), r.get("col", 0)))
+        for index, room in enumerate(self.vault_design):
+            # Where the room actually sits on the occupancy grid (clipped to the map)
+            span = self.vault_design.cells(index)
+            if span is None:
+                continue
+            row, col, end_col = span
 
-        for room in sorted_design:
             raw_type  = room.get("type", "Unknown")
             room_type = ROOM_CODE_REMAP.get(raw_type, raw_type)
-            row       = room.get("row", 0)
-            col       = room.get("col", 0)
-            width     = room.get("width", 1)
-
-            # Skip non-optimizable rooms (Elevator, Living, etc.)
-            lvl_str  = self._lvl_str(room.get("level", 1))
-            size_str = self._size_str(width)
-
-            base = (room_type, lvl_str, size_str)
-            ordinal_counter[base] = ordinal_counter.get(base, 0) + 1
-            ordinal = str(ordinal_counter[base])
-
-            # e.g. "Geothermal_lvl3_size3_1"
-            canonical_key = f"{room_type}_{lvl_str}_{size_str}_{ordinal}"
+            room_id   = vault_layout.room_id(room)
 
             # ── Fetch matching optimization data ─────────────────────────────
-            opt_data = opt_by_key.get(canonical_key)
-            full_dwellers = dwellers_by_room.get(canonical_key, [])
+            opt_data = opt_by_id.get(room_id)
+            full_dwellers = dwellers_by_room.get(room_id, [])
 
             if opt_data:
                 room_data = opt_data.copy()
                 room_data["row"]          = row
                 room_data["col"]          = col
-                room_data["canonical_key"] = canonical_key
                 room_data["dwellers_full"] = full_dwellers
-                if "size" not in room_data:
-                    room_data["size"] = size_str
             else:
                 room_data = {
+                    "room_id":      room_id,
                     "room_type":    room_type,
                     "row":          row,
                     "col":          col,
-                    "size":         size_str,
-                    "level":        lvl_str,
-                    "number":       ordinal,
-                    "canonical_key": canonical_key,
+                    "size":         vault_layout.size_str(room),
+                    "level":        vault_layout.level_str(room),
                     "dwellers":     [],
                     "dwellers_full": full_dwellers,
                 }
 
             cell = RoomCell(room_data)
             cell.clicked.connect(self._on_room_clicked)
-            self.grid.addWidget(cell, row, col, 1, width)
+            self.grid.addWidget(cell, row, col, 1, end_col - col)
             self._cells.append(cell)
 
         print(f"DEBUG: Created {len(self._cells)} room cells")
@@ -345,14 +292,14 @@ class VaultGridWidget(QWidget):
             return {}
         
         assignments = {}
-        for i, room in enumerate(self.vault_design):
-            room_key = f"room_{i}"
-            assignments[room_key] = {
+        for room in self.vault_design:
+            room_id = vault_layout.room_id(room)
+            assignments[room_id] = {
+                "room_id": room_id,
                 "room_type": room.get("type", "Unknown"),
                 "row": room.get("row", 0),
                 "col": room.get("col", 0),
-                "size": room.get("width", 1),
-                "number": i
+                "size": vault_layout.size_str(room),
             }
         return assignments
 
@@ -435,18 +382,8 @@ class RoomDetailPanel(QWidget):
 
     @staticmethod
     def _fmt_room_key(room_info: dict) -> str:
-        """Turn a previous_room / assigned_room dict into a readable label.
-        Keys: room_type, room_level, room_size, room_number."""
-        if not room_info:
-            return "?"
-        rt  = room_info.get("room_type", "?")
-        lvl = room_info.get("room_level", "?")
-        sz  = room_info.get("room_size", "?")
-        num = room_info.get("room_number", "?")
-        # Normalise "lvl3" → "Lv.3", "size6" → "×6"
-        lvl_disp = lvl.replace("lvl", "Lv.") if isinstance(lvl, str) else f"Lv.{lvl}"
-        sz_disp  = sz.replace("size", "×")   if isinstance(sz, str)  else f"×{sz}"
-        return f"{rt} {lvl_disp} {sz_disp} #{num}"
+        """Turn a previous_room / assigned_room dict into a readable label."""
+        return vault_layout.describe_room(room_info)
 
     # ── public API ────────────────────────────────────────────────────────────
 
@@ -455,7 +392,7 @@ class RoomDetailPanel(QWidget):
         disp_type = ROOM_CODE_REMAP.get(raw_type, raw_type)
         level     = room_data.get("level", "?")
         size      = room_data.get("size", "?")
-        number    = room_data.get("number", "?")
+        number    = room_data.get("room_id", "?")
         colours   = ROOM_COLOURS.get(disp_type, FALLBACK_COLOUR)
         accent    = colours[1]
         icon      = ROOM_ICON.get(disp_type, "🏠")
@@ -547,8 +484,8 @@ class RoomDetailPanel(QWidget):
                 name      = dw.get("name", "Unknown")
                 dw_id     = dw.get("id", "?")
                 all_stats = dw.get("all_stats", {})
-                moved     = dw.get("dweller_moved")       # {"from": "...", "to": "..."}
-                prev_rm   = dw.get("previous_room")       # {room_type, room_level, room_size, room_number}
+                moved     = dw.get("dweller_moved")       # {"from": room_id, "to": room_id}
+                prev_rm   = dw.get("previous_room")       # {room_id, room_type, room_level, room_size}
                 cur_rm    = dw.get("assigned_room", {})
                 outfit    = dw.get("outfit")
 
@@ -584,19 +521,8 @@ class RoomDetailPanel(QWidget):
 
                 # ── Movement row ─────────────────────────────────────────────
                 if moved:
-                    from_key = moved.get("from", "?")
-                    to_key   = moved.get("to",   "?")
-
-                    # Parse the raw "Type_lvlX_sizeY_N" string into a friendlier label
-                    def _parse_key(k):
-                        parts = k.split("_") if k != "?" else []
-                        if len(parts) == 4:
-                            rt, lvl, sz, num = parts
-                            return f"{rt} {lvl.replace('lvl','Lv.')} {sz.replace('size','×')} #{num}"
-                        return k
-
-                    from_lbl = _parse_key(from_key)
-                    to_lbl   = _parse_key(to_key)
+                    from_lbl = self._fmt_room_key(prev_rm)
+                    to_lbl   = self._fmt_room_key(cur_rm)
 
                     html += (
                         f"<div style='background:#1a1008; border-left:3px solid #ff6b6b;"
@@ -1,64 +1,105 @@
 import json
 import os
-import random
-
-def run(json_path):
-    ROWS = 25  #floors
-    COLUMNS = 26  #width
-    vault = [[None for _ in range(COLUMNS)] for _ in range(ROWS)]
-
-    downloads_folder = os.path.expanduser(r"~\Downloads")
-    file_path = os.path.join(downloads_folder, json_path)
-
-    with open(file_path, "r", encoding="utf-8") as file:
-        data = json.load(file)
-
-    vault_file = "vault_map.txt"
-
-    rooms = data["vault"]["rooms"]
-
-    for room in rooms:
-        Roomtype = room.get("type")
-        Row = room.get("row")
-        Column = room.get("col")
-        MergeLevel = room.get("mergeLevel")
-        Roomlevel = room.get("level")
-
-        def get_room_width( Roomtype,MergeLevel):
-            if Roomtype == "Elevator":
-                return 1
-
-            return 3 * MergeLevel
-
-        def place_room(vault, Roomtype, Row, Column, MergeLevel, RoomLevel):
-            width = get_room_width(Roomtype, MergeLevel)
-            if Row < 0 or Row >= ROWS:
-                return  # or log and continue
-            start = max(0, Column)
-            end = min(COLUMNS, Column + width)
-            if start >= end:
-                print("\n")
-                return  # nothing fits
-            for c in range(start, end):
-                vault[Row][c] = Roomtype + " at level= " + str(RoomLevel)+ f" (MergeLevel: {MergeLevel})"
-
-        place_room(vault, Roomtype, Row, Column, MergeLevel, Roomlevel)
-    
-    def print_vault_map_terminal(vault):
-        """Print a nicely formatted vault map to terminal"""
-        print("\n" + "="*80)
-        print("VAULT MAP")
-        print("="*80)
+import logging
+
+import numpy as np
+
+import vault_log
+import vault_layout
+
+log = vault_log.get_logger(__name__)
+
+RENDER_FINGERPRINT_FILE = "vault_render.json"
+RENDER_VERSION = 1  # bump when the drawing code or palette changes
+
+
+IMAGES = ("vault.png", "legend.png")
+
+
+def load_render_fingerprint():
+    try:
+        with open(RENDER_FINGERPRINT_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def is_render_current(fingerprint, images):
+    """True when the images on disk were drawn from a layout with this fingerprint"""
+    if not all(os.path.exists(img) for img in images):
+        return False
+    saved = load_render_fingerprint()
+    return saved.get("fingerprint") == fingerprint and saved.get("version") == RENDER_VERSION
+
+
+def save_render_fingerprint(fingerprint, save=None):
+    """`save` is the save_diff digest of the save the layout file and images were made from"""
+    with open(RENDER_FINGERPRINT_FILE, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "version": RENDER_VERSION, "save": save}, f)
+
+
+def reusable_layout(changes):
+    """
+    The layout file from the previous cycle when a save_diff.ChangeSet shows no room was built,
+    moved, merged or upgraded since the save it and the images were made from; otherwise None.
+    """
+    if changes is None or changes.layout_changed:
+        return None
+    if not os.path.exists(vault_layout.LAYOUT_FILE) or not all(os.path.exists(img) for img in IMAGES):
+        return None
+    saved = load_render_fingerprint()
+    if saved.get("save") != changes.base or saved.get("version") != RENDER_VERSION:
+        return None
+    try:
+        layout = vault_layout.VaultLayout.load()
+    except (OSError, ValueError):
+        return None
+    save_render_fingerprint(saved.get("fingerprint"), changes.digest)
+    return layout
+
+
+def room_label(room):
+    """Text used for a room on the terminal map and in the PNG legend"""
+    return f"{room['type']} at level= {room['level']} (MergeLevel: {room['mergeLevel']})"
+
+
+def hex_to_rgb(colour):
+    return tuple(int(colour[i:i + 2], 16) for i in (1, 3, 5))
+
+
+def run(json_path, changes=None):
+    """
+    Build the vault layout from a save, write vault_layout.json and (re)draw vault.png.
+    With a save_diff.ChangeSet the save is not read again, and when no room changed shape the
+    previous layout and images are reused as they are.
+    """
+    layout = reusable_layout(changes)
+    if layout is not None:
+        log.info("✓ Rooms unchanged since the last save - reusing %s (%d rooms)", vault_layout.LAYOUT_FILE, len(layout))
+        vault_log.flush()
+        return layout
+
+    if changes is not None:
+        data = changes.data
+    else:
+        downloads_folder = os.path.expanduser(r"~\Downloads")
+        file_path = os.path.join(downloads_folder, json_path)
+
+        with open(file_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+
+    layout = vault_layout.VaultLayout.from_save(data["vault"]["rooms"])
+    labels = [room_label(room) for room in layout]
+
+    def format_vault_map_terminal(layout):
+        """Build a nicely formatted, colour-coded vault map for the terminal"""
+        out = ["\n" + "="*80, "VAULT MAP", "="*80]
         
         # Get unique room types for color coding
         room_types = {}
-        for row in vault:
-            for cell in row:
-                if cell is not None and "Empty" not in cell:
-                    # Extract room type (before " at level=")
-                    room_type = cell.split(" at level=")[0]
-                    if room_type not in room_types:
-                        room_types[room_type] = len(room_types)
+        for room in layout:
+            if "Empty" not in room["type"] and room["type"] not in room_types:
+                room_types[room["type"]] = len(room_types)
         
         # ANSI color codes for terminal
         colors = [
@@ -72,31 +113,28 @@ def run(json_path):
         ]
         reset = '\033[0m'
         
-        # Print each row
-        for row_idx, row in enumerate(vault):
+        # One line per floor
+        for row_idx, row in enumerate(layout.grid.tolist()):
             # Skip completely empty rows for cleaner display
-            if all(cell is None for cell in row):
+            if all(index == layout.EMPTY for index in row):
                 continue
             
-            print(f"\nFloor {row_idx:2d}: ", end="")
+            line = [f"\nFloor {row_idx:2d}:"]
             
-            # Group consecutive same rooms
+            # Group consecutive cells of the same room
             i = 0
             while i < len(row):
-                cell = row[i]
+                index = row[i]
                 
-                if cell is None:
-                    print("[ Empty ]", end=" ")
+                if index == layout.EMPTY:
+                    line.append("[ Empty ]")
                     i += 1
                 else:
-                    # Extract room info
-                    room_type = cell.split(" at level=")[0]
-                    level = cell.split("level= ")[1].split(" ")[0]
-                    merge = cell.split("MergeLevel: ")[1].rstrip(")")
+                    room = layout[index]
+                    room_type = room["type"]
                     
-                    # Count consecutive cells with same room
                     count = 1
-                    while i + count < len(row) and row[i + count] == cell:
+                    while i + count < len(row) and row[i + count] == index:
                         count += 1
                     
                     # Color code by room type
@@ -104,46 +142,42 @@ def run(json_path):
                     color = colors[color_idx]
                     
                     # Format: [RoomType Lv.X M:Y]
-                    room_display = f"{color}[{room_type[:8]:8s} Lv.{level} M:{merge}]{reset}"
-                    print(room_display, end=" ")
+                    line.append(f"{color}[{room_type[:8]:8s} Lv.{room['level']} M:{room['mergeLevel']}]{reset}")
                     
                     i += count
+            out.append(" ".join(line))
             
-        print("\n\n" + "-"*80)
-        print("LEGEND:")
-        print("-"*80)
+        out.append("\n" + "-"*80)
+        out.append("LEGEND:")
+        out.append("-"*80)
         for room_type, idx in sorted(room_types.items(), key=lambda x: x[1]):
             color = colors[idx % len(colors)]
-            print(f"{color}█{reset} {room_type}")
-        print("="*80 + "\n")
-
-    def print_vault_map(vault):
-        """Original format for txt file"""
-        for row in vault:
-            print(" | ".join([cell if cell is not None else "Empty" for cell in row]) + "\n")
+            out.append(f"{color}█{reset} {room_type}")
+        out.append("="*80 + "\n")
+        return "\n".join(out)
 
-    # Print nicely to terminal
-    print_vault_map_terminal(vault)
+    # Print nicely to terminal (verbose only)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(format_vault_map_terminal(layout))
 
-    # Save in original format to txt file
-    with open(vault_file, "w", encoding="utf-8") as f:
-        for row in vault:
-            f.write(" | ".join([cell if cell is not None else "Empty" for cell in row]) + "\n")
-        print(f"✓ Vault map saved to {vault_file}")
+    # Structured layout for placementCalc (replaces the old vault_map.txt text grid)
+    layout.save()
+    log.info("✓ Vault layout saved to %s (%d rooms)", vault_layout.LAYOUT_FILE, len(layout))
 
 
-    from PIL import Image, ImageDraw, ImageFont
-
     CELL = 40
     CELL_H = 60  # height of each grid square
 
-    def draw_vault(vault, filename="vault.png", legendfile="legend.png"):
-        ROWS = len(vault)
-        COLUMNS = len(vault[0])
+    def draw_vault(layout, filename="vault.png", legendfile="legend.png"):
+        from PIL import Image, ImageDraw, ImageFont
+
+        ROWS = layout.rows
+        COLUMNS = layout.columns
 
         # Compute unique rooms and colors first (so they are available for legend sizing)
-        unique_rooms = set(room.lower() for row in vault for room in row if room is not None)
-        room_colors = {room: f'#{random.randint(0, 0xFFFFFF):06x}' for room in unique_rooms}
+        placed = {labels[i].lower() for i in np.unique(layout.grid) if i != layout.EMPTY}
+        unique_rooms = sorted(placed)
+        room_colors = {room: vault_layout.palette_color(room) for room in unique_rooms}
 
         LEGEND_HEIGHT = 2 * max(1, len(unique_rooms))
         img_height = ROWS * CELL_H + 212
@@ -159,20 +193,9 @@ def run(json_path):
         except OSError:
             font = ImageFont.load_default()
 
-        for r in range(ROWS):
-            for c in range(COLUMNS):
-                x1 = c * CELL
-                y1 = r * CELL_H
-                x2 = x1 + CELL
-                y2 = y1 + CELL_H
-
-                room = vault[r][c]
-                if room is None:
-                    color = "white"
-                else:
-                    color = room_colors.get(room.lower(), "green")
-             
-                draw.rectangle([x1, y1, x2, y2], fill=color, outline="black")
+        # Paint the whole grid in one go from the occupancy array
+        colours = [hex_to_rgb(vault_layout.palette_color(label)) for label in labels]
+        img.paste(Image.fromarray(layout.colour_image(colours, CELL, CELL_H), "RGB"), (0, 0))
 
 
         legend_top = ROWS * CELL_H + 20
@@ -222,17 +245,13 @@ def run(json_path):
         legend_img.save(legendfile)
 
 
-    draw_vault(vault)
-
-    room_objects = []
-    for room in rooms:
-        room_objects.append({
-            "type": room.get("type"),
-            "row": room.get("row"),
-            "col": room.get("col"),
-            "mergeLevel": room.get("mergeLevel"),
-            "level": room.get("level"),
-            "width": get_room_width(room.get("type"), room.get("mergeLevel"))
-        })
+    # Only redraw when the layout actually changed since the last render
+    fingerprint = vault_layout.layout_fingerprint(layout)
+    if is_render_current(fingerprint, IMAGES):
+        log.info("✓ Vault map unchanged - reusing vault.png")
+    else:
+        draw_vault(layout)
+    save_render_fingerprint(fingerprint, changes.digest if changes is not None else None)
 
-    return room_objects
+    vault_log.flush()
+    return layout
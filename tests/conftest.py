@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The program's modules are flat files that import each other by name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "fallShel_efficiency-program"))
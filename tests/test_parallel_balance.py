@@ -0,0 +1,51 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import benchmark
+import parallel_balance
+from headless import HeadlessWorkspace
+
+
+def placements(results):
+    """Room -> sorted dweller ids, dweller -> outfit, and the swap journal of one run"""
+    rooms = {room_id: sorted(d['id'] for d in room['dwellers'])
+             for room_id, room in results['room_assignments'].items()}
+    outfits = {d['id']: d.get('outfit') for d in results['dweller_assignments']}
+    return rooms, outfits, results['swap_history']
+
+
+@pytest.fixture(autouse=True)
+def worker_pool():
+    yield
+    parallel_balance.shutdown()
+
+
+@pytest.mark.parametrize("size, seed", [(60, 0), (150, 1)])
+def test_parallel_workers_match_serial(size, seed, monkeypatch):
+    submitted = []
+    submit = parallel_balance.ParallelSwapEvaluator.submit
+
+    def counting_submit(self, *args):
+        submitted.append(len(args[1]))
+        return submit(self, *args)
+
+    monkeypatch.setattr(parallel_balance.ParallelSwapEvaluator, "submit", counting_submit)
+    with HeadlessWorkspace() as ws:
+        save_path = os.path.join(ws.path, f"bench_{size}.json")
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump(benchmark.generate_save(size, seed), f)
+        outfitlist = ws.ingest(save_path)
+
+        params = {'OUTFIT_STRATEGY': 'deficit_first', 'ENABLE_CROSS_STAT_BALANCING': True}
+        serial = ws.optimize(save_path, outfitlist, "serial", dict(params, PARALLEL_WORKERS=0))
+        parallel = ws.optimize(save_path, outfitlist, "parallel", dict(params, PARALLEL_WORKERS=2))
+
+    assert serial is not None and parallel is not None
+    assert submitted, "PARALLEL_WORKERS=2 should score slow rooms in the worker pool"
+    assert serial['swap_history'], "the save should need balancing for the comparison to mean anything"
+    assert placements(parallel) == placements(serial)
+    assert parallel['performance'] == serial['performance']
@@ -0,0 +1,52 @@
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import pytest
+
+from performance_store import PerformanceStore
+
+
+@pytest.fixture
+def aged_store(tmp_path):
+    """400 days of history (one or two cycles a day, now only in the daily tier) plus 5 recent raw cycles"""
+    store = PerformanceStore("Vault1", path=str(tmp_path / "history.db"))
+    now = datetime.now()
+    rows = []
+    for day in range(400, 0, -1):
+        for repeat in range(1 + day % 2):
+            value = float(day * 10 + repeat)
+            rows.append(((now - timedelta(days=day, hours=repeat)).isoformat(), value, value, value, value))
+    for minute in range(5, 0, -1):
+        rows.append(((now - timedelta(minutes=minute)).isoformat(), 1.0, 1.0, 1.0, 1.0))
+    # One transaction instead of an append per cycle
+    with closing(store._connect()) as conn, conn:
+        store._insert(conn, rows)
+    return store, [row[4] for row in rows]
+
+
+def test_timeline_keeps_everything_within_budget(aged_store):
+    store, _ = aged_store
+    timeline = store.timeline(1000)
+    # Daily means, hourly means for the last 90 days and the raw cycles all fit
+    assert len(timeline['timestamps']) <= 1000
+    assert not any(ts.endswith(":00:00") for ts in timeline['timestamps'][-5:]), "the raw tail comes last"
+    assert timeline['initial'][-5:] == [1.0] * 5
+
+
+@pytest.mark.parametrize("max_points", [100, 37, 10, 2, 1])
+def test_timeline_merges_daily_buckets_over_budget(aged_store, max_points):
+    store, cycles = aged_store
+    timeline = store.timeline(max_points)
+    timestamps = timeline['timestamps']
+
+    assert 0 < len(timestamps) <= max_points
+    assert timestamps == sorted(timestamps)
+    assert all(len(series) == len(timestamps) for series in timeline.values())
+    if max_points == 1:
+        # One span over every day: the count-weighted mean of all cycles
+        assert timeline['with_outfits'][0] == pytest.approx(sum(cycles) / len(cycles))
+
+
+def test_timeline_with_no_budget_is_empty(aged_store):
+    store, _ = aged_store
+    assert store.timeline(0)['timestamps'] == []
@@ -0,0 +1,61 @@
+import itertools
+import math
+import random
+
+import pytest
+
+import production_bound
+
+
+def exhaustive_average(pools, slots, values, time_scale, bonuses):
+    """
+    Best average rounded production time over every placement of the dwellers (each in at most
+    one room, every room staffed) and of the outfits (at most one per placed dweller).
+    """
+    rooms = range(len(pools))
+    best = math.inf
+    for placed in itertools.product([None, *rooms], repeat=len(values)):
+        members = [[values[d] for d, room in enumerate(placed) if room == r] for r in rooms]
+        if any(not m or len(m) > s for m, s in zip(members, slots)):
+            continue
+        for worn in itertools.product([None, *rooms], repeat=len(bonuses)):
+            totals = [sum(m) for m in members]
+            for outfit, room in enumerate(worn):
+                if room is not None:
+                    totals[room] += bonuses[outfit]
+            if any(worn.count(r) > len(members[r]) for r in rooms) or not all(totals):
+                continue
+            times = [round(pool / (total * time_scale), 1) for pool, total in zip(pools, totals)]
+            best = min(best, sum(times) / len(times))
+    return best
+
+
+def random_group(rng):
+    rooms = rng.randint(1, 3)
+    pools = [rng.choice([30, 60, 90]) * rng.choice([1, 2.3, 3.6]) for _ in range(rooms)]
+    slots = [rng.randint(1, 2) for _ in range(rooms)]
+    values = [rng.randint(0, 10) for _ in range(rng.randint(rooms, 5))]
+    bonuses = [rng.randint(0, 5) for _ in range(rng.randint(0, 2))]
+    time_scale = 1 + rng.choice([0.5, 0.75, 1.0])
+    return pools, slots, values, time_scale, bonuses
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_bound_never_beats_the_exhaustive_optimum(seed):
+    pools, slots, values, time_scale, bonuses = random_group(random.Random(seed))
+    bound = production_bound.group_bound(pools, slots, values, time_scale, bonuses)
+    optimum = exhaustive_average(pools, slots, values, time_scale, bonuses)
+
+    if bound is None:
+        # Only a group nobody can staff has no bound
+        assert optimum == math.inf
+        return
+    assert bound >= 0.0
+    if optimum < math.inf:
+        assert bound <= optimum + 1e-9
+
+
+def test_bound_is_never_negative_for_tiny_times():
+    # Huge stat totals push the relaxed time under the rounding slack
+    assert production_bound.group_bound([1.0], [3], [1000, 1000, 1000], 2.0, [500]) == 0.0
+    assert production_bound.group_bound([], [], [5], 1.0) is None
@@ -0,0 +1,83 @@
+import itertools
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import training_allocator
+from training_allocator import MAX_STAT, TRAINING_STATS, allocate, min_cost_assignment
+
+ROOMS = [("Gym", "lvl1", "size3", 1), ("Armory", "lvl2", "size6", 2), ("Dojo", "lvl3", "size9", 3),
+         ("Classroom", "lvl1", "size3", 4)]
+
+
+def brute_force_cost(cost):
+    n, m = cost.shape
+    return min(cost[np.arange(n), list(cols)].sum() for cols in itertools.permutations(range(m), n))
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_min_cost_assignment_matches_permutations(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 6))
+    m = int(rng.integers(n, 7))
+    # Small integer costs give plenty of ties
+    cost = rng.integers(0, 10, size=(n, m)).astype(float) if seed % 2 else rng.uniform(0, 1000, size=(n, m))
+
+    rows, cols = min_cost_assignment(cost)
+
+    assert sorted(rows) == list(range(n))
+    assert len(set(cols)) == n
+    assert cost[rows, cols].sum() == pytest.approx(brute_force_cost(cost))
+
+
+def brute_force_allocation(times, slot_room, k):
+    """(untrainable pairs, summed time of the rest) of the best matching of k dwellers to k slots"""
+    best = None
+    for dwellers in itertools.permutations(range(times.shape[0]), k):
+        for slots in itertools.combinations(range(len(slot_room)), k):
+            pair_times = [times[d, slot_room[s]] for d, s in zip(dwellers, slots)]
+            score = (sum(1 for t in pair_times if np.isinf(t)), sum(t for t in pair_times if np.isfinite(t)))
+            best = score if best is None else min(best, score)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_allocate_matches_brute_force(seed):
+    rng = np.random.default_rng(100 + seed)
+    dwellers = int(rng.integers(1, 6))
+    # High values, so some stats are already maxed
+    values = rng.integers(6, MAX_STAT + 1, size=(dwellers, len(TRAINING_STATS)))
+    exps = rng.uniform(0, 1, size=values.shape) * values * training_allocator.POINT_EXP
+    free_slots = [int(s) for s in rng.integers(0, 2, size=len(ROOMS))]
+
+    pairs, total = allocate(ROOMS, free_slots, values, exps)
+
+    times = training_allocator.time_to_next_point(values, exps, ROOMS)
+    slot_room = [r for r, slots in enumerate(free_slots) for _ in range(slots)]
+    k = min(dwellers, len(slot_room))
+    best = brute_force_allocation(times, slot_room, k)
+    assert len(pairs) == k - best[0]
+    assert total == pytest.approx(best[1])
+    assert len({d for d, _ in pairs}) == len(pairs)
+    for r, slots in enumerate(free_slots):
+        assert sum(1 for _, room in pairs if room == r) <= slots
+    assert total == pytest.approx(sum(times[d, r] for d, r in pairs))
+
+
+def test_allocate_places_nobody_when_every_stat_is_maxed():
+    values = np.full((4, len(TRAINING_STATS)), MAX_STAT)
+    exps = np.zeros(values.shape)
+
+    assert np.isinf(training_allocator.time_to_next_point(values, exps, ROOMS)).all()
+    assert allocate(ROOMS, [3, 3, 3, 3], values, exps) == ([], 0.0)
+
+
+def test_allocate_skips_maxed_dwellers_only():
+    values = np.array([[MAX_STAT] * 4, [5, MAX_STAT, MAX_STAT, MAX_STAT]])
+    exps = np.zeros(values.shape)
+
+    pairs, total = allocate(ROOMS, [1, 1, 1, 1], values, exps)
+
+    assert pairs == [(1, 0)]
+    assert total == pytest.approx(5 * training_allocator.POINT_EXP / training_allocator.room_speed(ROOMS[0]))
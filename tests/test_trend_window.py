@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from AdaptiveVaultOptimizer import AdaptiveVaultOptimizer, TrendWindow
+from performance_store import PerformanceStore, SERIES
+
+
+def random_samples(rng, count):
+    return [{name: float(rng.uniform(20, 200)) for name in SERIES} for _ in range(count)]
+
+
+@pytest.mark.parametrize("size", [2, 5, 10])
+def test_slope_and_mean_match_polyfit(size):
+    rng = np.random.default_rng(size)
+    window = TrendWindow(size)
+    pushed = []
+    for sample in random_samples(rng, 3 * size + 7):
+        window.push(sample)
+        pushed.append(sample)
+        recent = pushed[-size:]
+        assert window.count == len(recent)
+        for name in SERIES:
+            ys = [s[name] for s in recent]
+            assert window.mean(name) == pytest.approx(np.mean(ys))
+            if len(ys) >= 2:
+                assert window.slope(name) == pytest.approx(np.polyfit(range(len(ys)), ys, 1)[0], abs=1e-9)
+
+
+def test_round_trip_keeps_the_window():
+    rng = np.random.default_rng(1)
+    window = TrendWindow(4)
+    for sample in random_samples(rng, 9):
+        window.push(sample)
+    restored = TrendWindow.from_dict(json.loads(json.dumps(window.to_dict())))
+    sample = random_samples(rng, 1)[0]
+    window.push(sample)
+    restored.push(sample)
+    for name in SERIES:
+        assert restored.mean(name) == pytest.approx(window.mean(name))
+        assert restored.slope(name) == pytest.approx(window.slope(name))
+
+
+def test_observe_cycle_reseeds_from_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(2)
+    history = random_samples(rng, 12)
+    store = PerformanceStore("Vault1")
+    for sample in history:
+        store.append(*(sample[name] for name in SERIES))
+
+    optimizer = AdaptiveVaultOptimizer("Vault1")
+    size = optimizer.config['performance_window']
+    # No trend_stats yet: the window is seeded from the last `size` cycles before this one
+    new = random_samples(rng, 1)[0]
+    optimizer.observe_cycle(*(new[name] for name in SERIES))
+    stored = json.loads((tmp_path / "Vault1_optimizer_config.json").read_text())['trend_stats']
+    expected = (history + [new])[-size:]
+    assert stored['size'] == size
+    for name in SERIES:
+        assert stored['values'][name] == pytest.approx([s[name] for s in expected])
+
+    # A different window size throws the stored window away and reseeds it from the history
+    store.append(*(new[name] for name in SERIES))
+    optimizer.config['performance_window'] = 4
+    newer = random_samples(rng, 1)[0]
+    optimizer.observe_cycle(*(newer[name] for name in SERIES))
+    window = optimizer._trend_window()
+    recent = (history + [new, newer])[-4:]
+    assert window.size == 4
+    for name in SERIES:
+        ys = [s[name] for s in recent]
+        assert window.values[name] == pytest.approx(ys)
+        assert window.slope(name) == pytest.approx(np.polyfit(range(4), ys, 1)[0], abs=1e-9)